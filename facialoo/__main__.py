@@ -0,0 +1,7 @@
+import sys
+
+from cli import main
+
+# `python facialoo <comando>` desde la raíz del repositorio
+if __name__ == "__main__":
+    sys.exit(main())
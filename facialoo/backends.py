@@ -0,0 +1,181 @@
+import os
+
+import cv2 as cv
+import numpy as np
+
+from eigen import EigenFaceEngine, build_index_for
+from manifest import read_manifest
+from modelfile import binary_path_for, resolve_model_path
+from pca import DEFAULT_CHUNK, DEFAULT_COMPONENTS, train_pca
+from vision import DATA_DIR, MODEL_PATH
+
+# Backends de reconocimiento. Todos cumplen el mismo contrato:
+#   backend.train(rostros, ids, nombres) -> modelo
+#   backend.update(modelo, rostros, ids, nombres)   (si supports_update)
+#   backend.save(modelo, ruta) / backend.load(ruta) -> modelo
+#   modelo.predict_batch(rostros) -> (ids, distancias), modelo.label_names
+# En todos menor distancia es mejor, pero cada uno mide en su propia escala:
+# el umbral de desconocido es por backend (VisionConfig.recognition_threshold).
+
+
+class EigenBackend:
+    # PCA (cv.face o el entrenador NumPy de pca.py); inferencia vectorizada
+    # con EigenFaceEngine. Modelo en XML + binario + índice de galería.
+    name = "eigen"
+    model_name = "EntrenamientoEigenFaceRecognizer.xml"
+    # Sin update(): las altas de EigenFaces las proyecta train_incremental
+    # sobre la base ya entrenada (Fisher reentrena siempre)
+    supports_update = False
+
+    def __init__(self, trainer="opencv", components=DEFAULT_COMPONENTS, chunk_size=DEFAULT_CHUNK):
+        self.trainer = trainer
+        self.components = components
+        self.chunk_size = chunk_size
+
+    def train(self, faces, ids, label_names):
+        if self.trainer == "numpy":
+            # Base truncada en float32 por bloques, sin la lista de copias
+            # float64 que hace cv.face
+            arrays = train_pca(faces, ids, self.components, self.chunk_size)
+            return EigenFaceEngine(arrays["mean"], arrays["eigenvectors"], arrays["projections"],
+                                   arrays["labels"], eigenvalues=arrays["eigenvalues"], label_names=label_names)
+        recognizer = cv.face.EigenFaceRecognizer_create()
+        recognizer.train(faces, np.asarray(ids))
+        engine = EigenFaceEngine.from_recognizer(recognizer)
+        engine.label_names = list(label_names)
+        return engine
+
+    def save(self, engine, path):
+        # XML (temporal + rename) y después el binario, para que
+        # resolve_model_path lo prefiera; el índice al final
+        engine.save(path)
+        engine.save(binary_path_for(path))
+        build_index_for(path, engine)
+
+    def load(self, path, exact=False, mmap=True):
+        return EigenFaceEngine.load(resolve_model_path(path), exact=exact, mmap=mmap)
+
+
+class FisherBackend(EigenBackend):
+    # LDA sobre PCA (cv.face.FisherFaceRecognizer): como mucho C-1
+    # componentes, galería diminuta y muy rápida. La proyección tiene la
+    # misma forma que EigenFaces, así que la inferencia es EigenFaceEngine.
+    # Se guarda solo el binario: el XML de EigenFaces no describiría el modelo.
+    name = "fisher"
+    model_name = "EntrenamientoFisherFaceRecognizer.xml"
+
+    def train(self, faces, ids, label_names):
+        if len(np.unique(ids)) < 2:
+            raise ValueError("FisherFaces necesita al menos dos personas.")
+        recognizer = cv.face.FisherFaceRecognizer_create()
+        recognizer.train(faces, np.asarray(ids))
+        engine = EigenFaceEngine.from_recognizer(recognizer)
+        engine.label_names = list(label_names)
+        return engine
+
+    def save(self, engine, path):
+        engine.save(binary_path_for(path))
+        build_index_for(path, engine)
+
+
+class LBPHEngine:
+    # cv.face.LBPHFaceRecognizer: histogramas locales por imagen, distancia
+    # chi-cuadrado. No hay forma vectorizada: predict rostro a rostro.
+    def __init__(self, recognizer, label_names=()):
+        self.recognizer = recognizer
+        self.label_names = list(label_names)
+
+    @classmethod
+    def load(cls, path):
+        recognizer = cv.face.LBPHFaceRecognizer_create()
+        recognizer.read(path)
+        labels = recognizer.getLabels().ravel()
+        label_names = [recognizer.getLabelInfo(int(l)) for l in range(labels.max() + 1)] if len(labels) else []
+        return cls(recognizer, label_names if any(label_names) else [])
+
+    @property
+    def labels(self):
+        return self.recognizer.getLabels().ravel()
+
+    def predict_batch(self, faces):
+        labels = np.empty(len(faces), dtype=np.int32)
+        distances = np.empty(len(faces))
+        for i, face in enumerate(faces):
+            labels[i], distances[i] = self.recognizer.predict(face)
+        return labels, distances
+
+    def predict(self, face):
+        label, distance = self.recognizer.predict(face)
+        return int(label), float(distance)
+
+    def save(self, path):
+        for label, name in enumerate(self.label_names):
+            self.recognizer.setLabelInfo(label, name)
+        tmp_path = path + ".tmp.xml"
+        self.recognizer.write(tmp_path)
+        os.replace(tmp_path, path)
+
+
+class LBPHBackend:
+    # Sin base común que recalcular: las altas se añaden con update() y el
+    # modelo crece con cada imagen (un histograma por rostro)
+    name = "lbph"
+    model_name = "EntrenamientoLBPHFaceRecognizer.xml"
+    supports_update = True
+
+    def train(self, faces, ids, label_names):
+        recognizer = cv.face.LBPHFaceRecognizer_create()
+        recognizer.train(faces, np.asarray(ids))
+        return LBPHEngine(recognizer, label_names)
+
+    def update(self, engine, faces, ids, label_names):
+        engine.recognizer.update(faces, np.asarray(ids))
+        engine.label_names = list(label_names)
+        return engine
+
+    def save(self, engine, path):
+        engine.save(path)
+
+    def load(self, path, exact=False, mmap=True):
+        return LBPHEngine.load(path)
+
+
+BACKENDS = {backend.name: backend for backend in (EigenBackend, FisherBackend, LBPHBackend)}
+
+
+def get_backend(name, trainer="opencv", components=DEFAULT_COMPONENTS, chunk_size=DEFAULT_CHUNK):
+    if name not in BACKENDS:
+        raise ValueError(f"Backend desconocido: {name} (disponibles: {', '.join(BACKENDS)})")
+    backend = BACKENDS[name]
+    if issubclass(backend, EigenBackend):
+        return backend(trainer, components, chunk_size)
+    return backend()
+
+
+def backend_for(config):
+    return get_backend(config.backend, config.trainer, config.pca_components, config.pca_chunk)
+
+
+def model_path_for(name, model_path=MODEL_PATH):
+    # Cada backend guarda su modelo aparte (mismo directorio) para poder
+    # alternar entre ellos sin reentrenar
+    if name == EigenBackend.name:
+        return model_path
+    return os.path.join(os.path.dirname(model_path), BACKENDS[name].model_name)
+
+
+def load_model(config, model_path=None, data_dir=DATA_DIR, mmap=True):
+    # -> (modelo, nombres) del backend configurado
+    from training import list_people
+
+    model_path = model_path or model_path_for(config.backend)
+    model = backend_for(config).load(model_path, exact=config.exact_search, mmap=mmap)
+    label_names = model.label_names
+    if not label_names:
+        # Sin nombres dentro del modelo: el mapa del manifiesto de
+        # entrenamiento, y solo en último caso el orden de Data/
+        manifest = read_manifest(model_path)
+        label_names = manifest["label_names"] if manifest else []
+    if not label_names and os.path.isdir(data_dir):
+        label_names = list_people(data_dir)
+    return model, label_names
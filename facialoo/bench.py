@@ -0,0 +1,155 @@
+import argparse
+import json
+import sys
+from time import perf_counter, process_time
+
+import numpy as np
+
+from config import load_config
+from backends import load_model, model_path_for
+from metrics import Metrics
+from modelfile import model_exists
+from pipeline import FacePipeline
+from sources import open_source
+from vision import DATA_DIR, load_cascade
+
+STAGE_ORDER = ("flip", "resize", "grayscale", "motion", "detect", "predict", "frame")
+
+
+def load_recognizer(config, model_path=None, data_dir=DATA_DIR):
+    model_path = model_path or model_path_for(config.backend)
+    if not model_exists(model_path):
+        return None, []
+    return load_model(config, model_path, data_dir)
+
+
+def run_benchmark(source, cascade, config, recognizer=None, label_names=(), max_frames=None, warmup=5):
+    # Mismas etapas que la GUI: preparar -> detectar/seguir -> recortar -> predecir.
+    # La lectura/decodificación de la fuente queda fuera de la medida.
+    latencies = []
+    faces_total = 0
+    metrics = Metrics()
+    pipeline = FacePipeline(config, cascade, recognizer, label_names, metrics)
+    cpu = wall = 0.0
+    for index, frame in enumerate(source):
+        started = perf_counter()
+        _, faces = pipeline.process(frame, draw=False)
+        elapsed = perf_counter() - started
+
+        if index < warmup:
+            if index == warmup - 1:
+                metrics.reset()
+                cpu, wall = process_time(), perf_counter()
+            continue
+        latencies.append(elapsed)
+        faces_total += len(faces)
+        if max_frames and len(latencies) >= max_frames:
+            break
+    detector = pipeline.detector
+    stats = summarize(latencies, faces_total)
+    # CPU de todo el proceso (incluida la lectura) por segundo de reloj: con
+    # --fps es la carga sostenida de una fuente en tiempo real
+    wall = perf_counter() - wall
+    stats["cpu_percent"] = 100 * (process_time() - cpu) / wall if wall > 0 else 0.0
+    stats["detector_calls"] = pipeline.tracker.detections
+    stats["predict_calls"] = pipeline.predictions
+    stats["idle_frames"] = pipeline.motion.idle_frames if pipeline.motion is not None else 0
+    stats["predicts_per_sec"] = stats["predict_calls"] / (stats["frames"] / stats["fps"]) if stats["fps"] else 0.0
+    stats["detect_scale"] = detector.scale
+    stats["scale_factor"] = detector.scale_factor
+    stats["min_size"] = detector.min_size
+    # Desglose por etapa (flip, resize, grayscale, detect, predict)
+    stats["stages"] = metrics.snapshot()["stages"]
+    return stats
+
+
+def summarize(latencies, faces_total):
+    if not latencies:
+        return {"frames": 0, "faces": 0, "fps": 0.0, "faces_per_sec": 0.0,
+                "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0}
+    samples = np.asarray(latencies) * 1000
+    total = samples.sum() / 1000
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+    return {
+        "frames": len(samples),
+        "faces": faces_total,
+        "fps": len(samples) / total,
+        "faces_per_sec": faces_total / total,
+        "mean_ms": float(samples.mean()),
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark headless del pipeline de visión")
+    parser.add_argument("--source", default="synthetic", help="vídeo, directorio, índice de webcam o synthetic[:WxH[:N]]")
+    parser.add_argument("--model", default=None, help="por defecto el del backend configurado")
+    parser.add_argument("--data", default=DATA_DIR)
+    parser.add_argument("--frames", type=int, default=None, help="máximo de frames medidos")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--fps", type=float, default=None, help="entregar los frames a este ritmo, como una cámara")
+    parser.add_argument("--width", type=int, default=None, help="ancho de trabajo (por defecto el de la configuración)")
+    parser.add_argument("--detect-every", type=int, default=None,
+                        help="ejecutar el cascade cada N frames (por defecto el de la configuración)")
+    parser.add_argument("--no-cache", action="store_true", help="predecir todos los rostros en cada frame")
+    parser.add_argument("--fixed", action="store_true", help="desactivar la resolución de detección adaptativa")
+    parser.add_argument("--target-ms", type=float, default=None, help="presupuesto por frame del detector adaptativo")
+    parser.add_argument("--detect-only", action="store_true", help="no ejecutar predict aunque exista modelo")
+    parser.add_argument("--motion-gate", action="store_true", help="detectar solo con movimiento (latido si no)")
+    parser.add_argument("--json", help="guardar resultados en este fichero")
+    parser.add_argument("--min-fps", type=float, help="falla (exit 1) por debajo de este FPS")
+    parser.add_argument("--max-p95", type=float, help="falla (exit 1) si p95 supera estos ms")
+    args = parser.parse_args(argv)
+
+    config = load_config()
+    if args.detect_every is not None:
+        config.detect_every = args.detect_every
+    config.adaptive = not args.fixed
+    config.identity_cache = not args.no_cache
+    config.motion_gate = config.motion_gate or args.motion_gate
+    if args.width:
+        config.display_width = args.width
+    if args.target_ms:
+        config.target_frame_ms = args.target_ms
+
+    recognizer, label_names = (None, []) if args.detect_only else load_recognizer(config, args.model, args.data)
+    cascade = load_cascade()
+    with open_source(args.source, fps=args.fps, data_dir=args.data) as source:
+        if not source.isOpened():
+            print(f"No se pudo abrir la fuente: {args.source}", file=sys.stderr)
+            return 2
+        stats = run_benchmark(source, cascade, config, recognizer, label_names,
+                              max_frames=args.frames, warmup=args.warmup)
+    stats["source"] = str(args.source)
+    stats["recognize"] = recognizer is not None
+
+    print(f"Frames: {stats['frames']}  Rostros: {stats['faces']}  Predict: {'sí' if stats['recognize'] else 'no'}"
+          f"  Detecciones: {stats['detector_calls']}  Frames en reposo: {stats['idle_frames']}")
+    print(f"FPS: {stats['fps']:.1f}  Rostros/s: {stats['faces_per_sec']:.1f}  Predict/s: {stats['predicts_per_sec']:.1f}"
+          f"  CPU: {stats['cpu_percent']:.0f}%")
+    print(f"Latencia ms  p50: {stats['p50_ms']:.2f}  p95: {stats['p95_ms']:.2f}  p99: {stats['p99_ms']:.2f}")
+    print(f"Detector final  escala: {stats['detect_scale']:.2f}  scaleFactor: {stats['scale_factor']:.2f}"
+          f"  minSize: {stats['min_size']}")
+    for name in STAGE_ORDER:
+        stage = stats["stages"].get(name)
+        if stage and "p50_ms" in stage:
+            print(f"  {name:<10} media: {stage['mean_ms']:.2f}  p50: {stage['p50_ms']:.2f}  p95: {stage['p95_ms']:.2f} ms")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(stats, f, indent=2)
+
+    failed = False
+    if args.min_fps is not None and stats["fps"] < args.min_fps:
+        print(f"REGRESIÓN: FPS {stats['fps']:.1f} < {args.min_fps}", file=sys.stderr)
+        failed = True
+    if args.max_p95 is not None and stats["p95_ms"] > args.max_p95:
+        print(f"REGRESIÓN: p95 {stats['p95_ms']:.2f} ms > {args.max_p95} ms", file=sys.stderr)
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,37 +1,56 @@
 import cv2 as cv
 import os
+import sys
 import imutils
 
+from capture_writer import BackgroundWriter, DiversityFilter
+from config import load_config
+from detector import AdaptiveDetector
+from facestore import FaceStore
+from sources import open_source
+from vision import load_cascade
+
+config = load_config()
+
 ruta_completa = 'Data/Usuario'
 if not os.path.exists(ruta_completa):
     os.makedirs(ruta_completa)
+almacen = FaceStore(ruta_completa)
+almacen.reset()
+filtro = DiversityFilter(config.capture_min_sharpness, config.capture_min_hash_distance)
+escritor = BackgroundWriter(almacen)
+escritor.start()
 
 
-camara = cv.VideoCapture(0)
-ruidos = cv.CascadeClassifier('haarcascade_frontalface_default.xml')
+# Fuente opcional: índice de webcam, vídeo, directorio o "synthetic"
+camara = open_source(sys.argv[1] if len(sys.argv) > 1 else config.source)
+ruidos = AdaptiveDetector(load_cascade(), config)
 id = 0
 while True:
     respuesta, captura = camara.read()
     if respuesta == False:
         break
-    captura = imutils.resize(captura, width=640)
+    captura = imutils.resize(captura, width=config.capture_width)
 
     grises = cv.cvtColor(captura, cv.COLOR_BGR2GRAY)
-    id_captura = captura.copy()
+    id_captura = grises.copy()
 
-    cara = ruidos.detectMultiScale(grises, 1.3, 5)
+    cara = ruidos(grises)
 
     for (x, y, e1, e2) in cara:
         cv.rectangle(captura, (x, y), (x+e1, y+e2), (0, 255, 0), 2)
         rostro_capturado = id_captura[y:y+e2, x:x+e1]
         rostro_capturado = cv.resize(
             rostro_capturado, (160, 160), interpolation=cv.INTER_CUBIC)
-        cv.imwrite(ruta_completa+'/imagen_{}.jpg'.format(id), rostro_capturado)
-        id = id+1
+        huella = filtro.check(rostro_capturado)
+        if huella is not None and escritor.put(rostro_capturado):
+            filtro.remember(huella)
+            id = id+1
 
     cv.imshow("Resultado rostro", captura)
 
-    if id == 351:
+    if id == 351 or escritor.error is not None:
         break
 camara.release()
+escritor.close()
 cv.destroyAllWindows()
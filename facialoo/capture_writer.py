@@ -0,0 +1,117 @@
+import queue
+import threading
+
+import cv2 as cv
+import numpy as np
+
+_STOP = object()
+
+
+class DiversityFilter:
+    # Filtro rápido antes de guardar: descarta ROIs borrosos (varianza del
+    # Laplaciano) y casi duplicados (dHash de 64 bits a menos de
+    # `min_hash_distance` bits de alguno ya aceptado). check() no recuerda
+    # el hash: se registra con remember() solo si el ROI llegó a encolarse,
+    # para que uno descartado no bloquee a los parecidos que vengan después.
+    def __init__(self, min_sharpness=30.0, min_hash_distance=6):
+        self.min_sharpness = min_sharpness
+        self.min_hash_distance = min_hash_distance
+        self.rejected_blur = 0
+        self.rejected_duplicate = 0
+        self._hashes = np.empty((0, 8), dtype=np.uint8)
+
+    @staticmethod
+    def sharpness(roi):
+        return cv.Laplacian(roi, cv.CV_64F).var()
+
+    @staticmethod
+    def dhash(roi):
+        small = cv.resize(roi, (9, 8), interpolation=cv.INTER_AREA)
+        return np.packbits(small[:, 1:] > small[:, :-1])
+
+    def check(self, roi):
+        # -> dHash del ROI si es aceptable, None si se descarta
+        if self.sharpness(roi) < self.min_sharpness:
+            self.rejected_blur += 1
+            return None
+        digest = self.dhash(roi)
+        if len(self._hashes):
+            distances = np.unpackbits(self._hashes ^ digest, axis=1).sum(axis=1)
+            if distances.min() < self.min_hash_distance:
+                self.rejected_duplicate += 1
+                return None
+        return digest
+
+    def remember(self, digest):
+        self._hashes = np.vstack([self._hashes, digest])
+
+
+class BackgroundWriter(threading.Thread):
+    # Escritura diferida: el bucle de cámara solo encola (sin bloquear) y este
+    # hilo agrupa los ROIs y los añade al FaceStore en lotes. Si la cola se
+    # llena se descarta el ROI en lugar de frenar la cámara.
+    def __init__(self, store, max_queue=64, batch_size=16):
+        super().__init__(daemon=True)
+        self.store = store
+        self.batch_size = batch_size
+        self.written = 0
+        self.dropped = 0
+        self.error = None
+        self._queue = queue.Queue(maxsize=max_queue)
+
+    def put(self, roi):
+        if self.error is not None:
+            return False
+        try:
+            self._queue.put_nowait(roi)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            # Vaciar lo que ya esté en cola hasta completar el lote
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            try:
+                self.store.append(np.stack(batch))
+                self.written += len(batch)
+            except Exception as e:
+                self.error = e
+                self._discard_pending()
+                break
+
+    def _discard_pending(self):
+        # Tras un error nadie consume la cola: se vacía para que close() y
+        # put() no se queden esperando sitio
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not _STOP:
+                self.dropped += 1
+
+    def close(self, timeout=None):
+        # Encola el fin y espera a que se vacíe. Si el hilo ya terminó (por
+        # un error) no se encola nada: la cola podría estar llena.
+        while self.is_alive():
+            try:
+                self._queue.put(_STOP, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        self.join(timeout)
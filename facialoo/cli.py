@@ -0,0 +1,344 @@
+import argparse
+import dataclasses
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2 as cv
+
+from backends import BACKENDS, model_path_for
+from config import load_config
+from sources import IMAGE_EXTENSIONS, open_source
+from vision import DATA_DIR
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mkv", ".mov", ".m4v", ".mpg", ".mpeg", ".webm")
+MAX_CAPTURES = 351
+
+# Estado de cada proceso del pool de `recognize` (se carga una vez por proceso)
+_worker = {}
+
+
+# ------------------------------------------------------------------ capture
+def cmd_capture(args):
+    from capture_writer import BackgroundWriter, DiversityFilter
+    from detector import AdaptiveDetector
+    from facestore import FaceStore
+    from vision import crop_face, load_cascade, prepare_frame
+
+    config = load_config()
+    person_dir = os.path.join(args.data, args.name)
+    os.makedirs(person_dir, exist_ok=True)
+    with open_source(args.source or config.source, data_dir=args.data) as source:
+        if not source.isOpened():
+            print(f"No se pudo abrir la fuente: {args.source or config.source}", file=sys.stderr)
+            return 2
+        # Igual que la GUI: la captura sustituye a la anterior de la persona
+        store = FaceStore(person_dir)
+        store.reset()
+        filtro = DiversityFilter(config.capture_min_sharpness, config.capture_min_hash_distance)
+        writer = BackgroundWriter(store)
+        writer.start()
+        detector = AdaptiveDetector(load_cascade(), config)
+        accepted = 0
+        for frame in source:
+            _, gray = prepare_frame(frame, config.capture_width)
+            for box in detector(gray):
+                roi = crop_face(gray, box)
+                digest = filtro.check(roi)
+                if digest is not None and writer.put(roi):
+                    filtro.remember(digest)
+                    accepted += 1
+            if accepted >= args.max or writer.error is not None:
+                break
+        writer.close()
+    if writer.error is not None:
+        print(f"Error al guardar: {writer.error}", file=sys.stderr)
+        return 1
+    skipped = filtro.rejected_blur + filtro.rejected_duplicate
+    print(f"{args.name}: {writer.written} rostros guardados, {skipped} descartados por borrosos o repetidos")
+    return 0
+
+
+# -------------------------------------------------------------------- train
+def cmd_train(args):
+    from metrics import Metrics
+    from training import train_full, train_incremental
+
+    config = load_config()
+    metrics = Metrics()
+    backend = args.backend or config.backend
+    model_path = args.model or model_path_for(backend)
+    options = {
+        "trainer": "numpy" if args.numpy else config.trainer,
+        "components": args.components or config.pca_components,
+        "chunk_size": args.chunk or config.pca_chunk,
+        "backend": backend,
+    }
+
+    def progress(done, total):
+        print(f"\rLeyendo imágenes {done}/{total}", end="", flush=True)
+
+    if args.full:
+        result = train_full(args.data, model_path, args.workers, progress, metrics, **options)
+    else:
+        result = train_incremental(args.data, model_path, workers=args.workers, progress=progress,
+                                   metrics=metrics, **options)
+    print()
+    if result["mode"] == "unchanged":
+        print("El modelo ya está al día")
+    else:
+        print(f"Entrenamiento {result['mode']}: {len(result['people'])} personas, "
+              f"nuevas: {', '.join(result['added']) or '-'}, imágenes leídas: {result['images']}")
+    stages = metrics.snapshot()["stages"]
+    print("  ".join(f"{name}: {stages[name]['total_ms'] / 1000:.2f} s" for name in ("load", "train", "write")
+                    if name in stages))
+    return 0
+
+
+# ---------------------------------------------------------------- recognize
+def _positive_int(value):
+    # Tipo de argparse: entero >= 1 (un error de uso, no una traza del pool)
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"debe ser >= 1 (recibido {value})")
+    return number
+
+
+def _is_video(path):
+    return path.lower().endswith(VIDEO_EXTENSIONS) or "://" in path
+
+
+def collect_jobs(paths, chunk_images=256, segment_frames=0):
+    # Reparte el trabajo en unidades independientes para el pool:
+    # ("images", [rutas]) en bloques de `chunk_images` por directorio y
+    # ("video", ruta, primer frame, último frame) por tramos de `segment_frames`
+    jobs = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                files = sorted(files)
+                images = [os.path.join(root, f) for f in files if f.lower().endswith(IMAGE_EXTENSIONS)]
+                for start in range(0, len(images), chunk_images):
+                    jobs.append(("images", images[start:start + chunk_images]))
+                for f in files:
+                    if _is_video(f):
+                        jobs.extend(_video_jobs(os.path.join(root, f), segment_frames))
+        elif path.lower().endswith(IMAGE_EXTENSIONS):
+            jobs.append(("images", [path]))
+        else:
+            jobs.extend(_video_jobs(path, segment_frames))
+    return jobs
+
+
+def _video_jobs(path, segment_frames):
+    total = 0
+    if segment_frames and "://" not in path:
+        cap = cv.VideoCapture(path)
+        total = int(cap.get(cv.CAP_PROP_FRAME_COUNT)) if cap.isOpened() else 0
+        cap.release()
+    if total <= 0 or total <= segment_frames:
+        return [("video", path, 0, None)]
+    return [("video", path, start, min(start + segment_frames, total))
+            for start in range(0, total, segment_frames)]
+
+
+def _init_worker(model_path, data_dir, config, detect_only):
+    from backends import load_model
+    from modelfile import model_exists
+
+    # Un hilo de OpenCV por proceso: el paralelismo lo da el pool
+    cv.setNumThreads(1)
+    engine, label_names = None, []
+    model_path = model_path or model_path_for(config.backend)
+    if not detect_only and model_exists(model_path):
+        engine, label_names = load_model(config, model_path, data_dir)
+    _worker.update(config=config, engine=engine, label_names=label_names)
+
+
+def _records(source, index, frame, pipeline):
+    # Cajas devueltas en coordenadas del frame original (el pipeline trabaja
+    # sobre una copia redimensionada a display_width)
+    work, faces = pipeline.process(frame, draw=False, flip=False)
+    scale = frame.shape[1] / work.shape[1]
+    return [{
+        "source": source,
+        "frame": index,
+        "box": [int(round(v * scale)) for v in face["box"]],
+        "label": face["label"],
+        "distance": face["distance"],
+    } for face in faces]
+
+
+def recognize_job(job, every=1):
+    from pipeline import FacePipeline
+
+    config, engine, label_names = _worker["config"], _worker["engine"], _worker["label_names"]
+    # La puerta de movimiento cuenta segundos de reloj (fuentes en directo);
+    # en lote los frames llegan más rápido que en tiempo real
+    config = dataclasses.replace(config, motion_gate=False)
+    records = []
+    if job[0] == "images":
+        # Imágenes independientes: detectar en todas y sin caché por track
+        config = dataclasses.replace(config, detect_every=1, identity_cache=False)
+        pipeline = FacePipeline(config, engine=engine, label_names=label_names)
+        for path in job[1]:
+            frame = cv.imread(path)
+            if frame is not None:
+                pipeline.tracker.reset()
+                records.extend(_records(path, 0, frame, pipeline))
+        return records
+
+    _, path, start, end = job
+    pipeline = FacePipeline(config, engine=engine, label_names=label_names)
+    cap = cv.VideoCapture(path)
+    if not cap.isOpened():
+        return [{"source": path, "error": "No se pudo abrir"}]
+    if start:
+        cap.set(cv.CAP_PROP_POS_FRAMES, start)
+    index = start
+    try:
+        while end is None or index < end:
+            if (index - start) % every:
+                # Frames saltados: grab() no decodifica la imagen
+                if not cap.grab():
+                    break
+                index += 1
+                continue
+            ret, frame = cap.read()
+            if not ret:
+                break
+            records.extend(_records(path, index, frame, pipeline))
+            index += 1
+    finally:
+        cap.release()
+    return records
+
+
+def cmd_recognize(args):
+    config = load_config()
+    if args.backend:
+        config = dataclasses.replace(config, backend=args.backend)
+    jobs = collect_jobs(args.inputs, args.chunk, args.segment)
+    if not jobs:
+        print("No hay imágenes ni vídeos que procesar", file=sys.stderr)
+        return 2
+    out = open(args.output, "w") if args.output else sys.stdout
+    faces = errors = 0
+    try:
+        with ProcessPoolExecutor(args.workers, initializer=_init_worker,
+                                 initargs=(args.model, args.data, config, args.detect_only)) as pool:
+            # map conserva el orden de los trabajos en la salida
+            for done, records in enumerate(pool.map(recognize_job, jobs, [args.every] * len(jobs)), 1):
+                for record in records:
+                    if "error" in record:
+                        errors += 1
+                    else:
+                        faces += 1
+                    out.write(json.dumps(record) + "\n")
+                if args.output:
+                    print(f"\r{done}/{len(jobs)} trabajos, {faces} rostros", end="", file=sys.stderr, flush=True)
+    finally:
+        if args.output:
+            out.close()
+            print(file=sys.stderr)
+    return 1 if errors else 0
+
+
+# -------------------------------------------------------------------- bench
+def cmd_bench(argv):
+    import bench
+
+    return bench.main(argv)
+
+
+def cmd_serve(argv):
+    import service
+
+    return service.main(argv)
+
+
+def cmd_evaluate(argv):
+    import evaluate
+
+    return evaluate.main(argv)
+
+
+def cmd_compare(argv):
+    import compare_backends
+
+    return compare_backends.main(argv)
+
+
+def cmd_shards(argv):
+    import shards
+
+    return shards.main(argv)
+
+
+def cmd_startup(argv):
+    import startup
+
+    return startup.main(argv)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    # argparse no reenvía bien opciones a un subcomando con REMAINDER:
+    # `bench`, `serve`, `evaluate`, `compare`, `startup` y `shards` pasan el
+    # resto de argumentos tal cual a su script
+    passthrough = {"bench": cmd_bench, "serve": cmd_serve, "evaluate": cmd_evaluate, "compare": cmd_compare,
+                   "startup": cmd_startup, "shards": cmd_shards}
+    if argv and argv[0] in passthrough:
+        return passthrough[argv[0]](argv[1:])
+
+    parser = argparse.ArgumentParser(prog="facialoo", description="Facialoo sin interfaz gráfica")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    capture = sub.add_parser("capture", help="capturar rostros de una persona")
+    capture.add_argument("name", help="nombre de la persona (carpeta en Data/)")
+    capture.add_argument("--source", help="vídeo, directorio, índice de webcam o synthetic (por defecto el de la configuración)")
+    capture.add_argument("--data", default=DATA_DIR)
+    capture.add_argument("--max", type=int, default=MAX_CAPTURES, help="rostros a guardar")
+    capture.set_defaults(func=cmd_capture)
+
+    train = sub.add_parser("train", help="entrenar el modelo (incremental si es posible)")
+    train.add_argument("--data", default=DATA_DIR)
+    train.add_argument("--model", default=None, help="por defecto el del backend")
+    train.add_argument("--backend", choices=list(BACKENDS), default=None,
+                       help="backend de reconocimiento (por defecto el de la configuración)")
+    train.add_argument("--full", action="store_true", help="reentrenar desde cero")
+    train.add_argument("--workers", type=int, default=None, help="hilos de lectura de imágenes")
+    train.add_argument("--numpy", action="store_true", help="entrenador NumPy de memoria acotada")
+    train.add_argument("--components", type=int, default=None, help="componentes a conservar (entrenador NumPy)")
+    train.add_argument("--chunk", type=int, default=None, help="imágenes por bloque (entrenador NumPy)")
+    train.set_defaults(func=cmd_train)
+
+    recognize = sub.add_parser("recognize", help="reconocer en lote sobre imágenes y vídeos")
+    recognize.add_argument("inputs", nargs="+", help="ficheros de vídeo, imágenes o directorios (recursivo)")
+    recognize.add_argument("--model", default=None, help="por defecto el del backend")
+    recognize.add_argument("--backend", choices=list(BACKENDS), default=None)
+    recognize.add_argument("--data", default=DATA_DIR)
+    recognize.add_argument("--output", "-o", help="fichero JSON Lines (por defecto stdout)")
+    recognize.add_argument("--workers", type=int, default=os.cpu_count(), help="procesos del pool")
+    recognize.add_argument("--every", type=_positive_int, default=1, help="procesar uno de cada N frames de vídeo")
+    recognize.add_argument("--chunk", type=int, default=256, help="imágenes por trabajo")
+    recognize.add_argument("--segment", type=int, default=3000,
+                           help="frames por trabajo al partir vídeos largos (0 = un trabajo por vídeo)")
+    recognize.add_argument("--detect-only", action="store_true", help="solo detectar, sin modelo")
+    recognize.set_defaults(func=cmd_recognize)
+
+    sub.add_parser("bench", help="benchmark headless (mismas opciones que bench.py)")
+    sub.add_parser("serve", help="servicio HTTP local de reconocimiento (mismas opciones que service.py)")
+    sub.add_parser("evaluate", help="evaluación offline de precisión y umbral (mismas opciones que evaluate.py)")
+    sub.add_parser("compare", help="comparar backends de reconocimiento (mismas opciones que compare_backends.py)")
+    sub.add_parser("startup", help="benchmark de arranque (mismas opciones que startup.py)")
+    sub.add_parser("shards", help="galería repartida en shards: split, serve y harness local (shards.py)")
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+from time import perf_counter
+
+import numpy as np
+
+from backends import BACKENDS, get_backend
+from config import load_config, threshold_field
+from evaluate import error_curve, make_splits, probe_latency, recommend_threshold, score_probes
+from training import load_dataset
+from vision import DATA_DIR
+
+
+def _files_size(directory):
+    return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+
+def compare_backends(data_dir, names, config, holdout=0.3, unknown_fraction=0.2, seed=0):
+    # Entrena cada backend sobre la misma partición de Data/ y mide
+    # entrenamiento, tamaño en disco, carga, latencia por rostro y acierto
+    faces, ids, people = load_dataset(data_dir)
+    if not faces:
+        raise ValueError("Directorio Data vacío o sin imágenes válidas.")
+    ids = np.asarray(ids, dtype=np.int32)
+    gallery, probes, impostors = make_splits(ids, holdout=holdout, unknown_fraction=unknown_fraction, seed=seed)[0]
+    if not len(gallery) or not len(probes):
+        raise ValueError("No hay imágenes suficientes para separar galería y sondas.")
+    gallery_faces = [faces[i] for i in gallery]
+
+    results = []
+    for name in names:
+        backend = get_backend(name, config.trainer, config.pca_components, config.pca_chunk)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, backend.model_name)
+            started = perf_counter()
+            model = backend.train(gallery_faces, ids[gallery], people)
+            train_s = perf_counter() - started
+            backend.save(model, path)
+            size = _files_size(directory)
+            started = perf_counter()
+            model = backend.load(path)
+            load_s = perf_counter() - started
+
+            labels, distances, batch_s = score_probes(model, faces, np.concatenate([probes, impostors]))
+            latencies = np.asarray(probe_latency(model, faces, probes)) * 1000
+
+        ok = labels[:len(probes)] == ids[probes]
+        wrong = np.concatenate([distances[:len(probes)][~ok], distances[len(probes):]])
+        thresholds, far, frr = error_curve(ok, distances[:len(probes)], wrong)
+        eer_threshold, eer_far, eer_frr = recommend_threshold(thresholds, far, frr)
+        threshold = getattr(config, threshold_field(name))
+        p50, p95 = np.percentile(latencies, [50, 95])
+        results.append({
+            "backend": name,
+            "train_s": train_s,
+            "model_bytes": size,
+            "load_s": load_s,
+            "p50_ms": float(p50),
+            "p95_ms": float(p95),
+            "batch_ms_per_face": batch_s * 1000 / len(labels),
+            "accuracy": float(ok.mean()),
+            "eer": (eer_far + eer_frr) / 2,
+            "eer_threshold": eer_threshold,
+            "threshold": threshold,
+            "far": float((wrong < threshold).mean()) if len(wrong) else 0.0,
+            "frr": 1.0 - float((ok & (distances[:len(probes)] < threshold)).mean()),
+        })
+    return {"people": len(people), "gallery": len(gallery), "probes": len(probes),
+            "impostors": len(impostors), "backends": results}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compara los backends de reconocimiento sobre Data/")
+    parser.add_argument("backends", nargs="*", help=f"backends a comparar (por defecto todos: {', '.join(BACKENDS)})")
+    parser.add_argument("--data", default=DATA_DIR)
+    parser.add_argument("--holdout", type=float, default=0.3, help="fracción de imágenes de prueba por persona")
+    parser.add_argument("--unknown", type=float, default=0.2, help="fracción de personas usadas como impostores")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="guardar resultados en este fichero")
+    args = parser.parse_args(argv)
+
+    config = load_config()
+    try:
+        report = compare_backends(args.data, args.backends or list(BACKENDS), config,
+                                  args.holdout, args.unknown, args.seed)
+    except (OSError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    print(f"Personas: {report['people']}  Galería: {report['gallery']}  Sondas: {report['probes']}  "
+          f"Impostores: {report['impostors']}")
+    print(f"{'backend':<8} {'entrenar s':>10} {'modelo MB':>10} {'cargar s':>9} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'lote ms':>8} {'rank-1':>7} {'EER':>6} {'umbral':>9} {'FAR':>6} {'FRR':>6}")
+    for r in report["backends"]:
+        print(f"{r['backend']:<8} {r['train_s']:>10.2f} {r['model_bytes'] / 2**20:>10.1f} {r['load_s']:>9.3f} "
+              f"{r['p50_ms']:>8.3f} {r['p95_ms']:>8.3f} {r['batch_ms_per_face']:>8.3f} "
+              f"{r['accuracy'] * 100:>6.1f}% {r['eer'] * 100:>5.1f}% {r['threshold']:>9.1f} "
+              f"{r['far'] * 100:>5.1f}% {r['frr'] * 100:>5.1f}%")
+    print("FAR/FRR con el umbral configurado de cada backend; EER con su umbral óptimo en esta partición.")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
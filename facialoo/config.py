@@ -0,0 +1,143 @@
+import json
+import os
+from dataclasses import dataclass, fields
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIG_PATH = os.path.join(BASE_DIR, "facialoo.json")
+ENV_PREFIX = "FACIALOO_"
+
+
+@dataclass
+class VisionConfig:
+    # Fuente de vídeo: índice de webcam, fichero, directorio o "synthetic"
+    source: str = "0"
+    # Anchos de trabajo de los frames en captura y en detectar/reconocer
+    capture_width: int = 640
+    display_width: int = 800
+    # Refresco máximo del visor (Hz), independiente del ritmo de procesamiento
+    display_fps: float = 60.0
+    # Parámetros iniciales del cascade Haar
+    scale_factor: float = 1.3
+    min_neighbors: int = 5
+    min_size: int = 30  # lado mínimo del rostro en píxeles del frame
+    # Resolución de detección: el cascade corre sobre una copia reducida
+    detect_scale: float = 1.0
+    min_detect_scale: float = 0.35
+    max_scale_factor: float = 1.5
+    max_min_size: int = 120
+    # Presupuesto por frame; el detector se adapta para gastar como mucho
+    # `detect_budget_share` de él
+    adaptive: bool = True
+    target_frame_ms: float = 33.0
+    detect_budget_share: float = 0.5
+    # Filtro de captura: nitidez mínima (varianza del Laplaciano) y distancia
+    # mínima de dHash (bits) respecto a las muestras ya guardadas
+    capture_min_sharpness: float = 30.0
+    capture_min_hash_distance: int = 6
+    # Backend de reconocimiento: "eigen", "fisher" o "lbph" (backends.py)
+    backend: str = "eigen"
+    # Entrenamiento: "opencv" (cv.face, todos los componentes) o "numpy"
+    # (memoria acotada, `pca_components` componentes, bloques de `pca_chunk`)
+    trainer: str = "opencv"
+    pca_components: int = 100
+    pca_chunk: int = 512
+    # Cada cuántos frames se ejecuta el cascade (seguimiento entre medias)
+    detect_every: int = 5
+    # Puerta de movimiento (motion.py): sin movimiento no se detecta ni se
+    # reconoce, salvo un frame de latido cada `motion_heartbeat` segundos.
+    # Sensibilidad: fracción de píxeles (`motion_threshold`) que deben
+    # cambiar más de `motion_delta` niveles sobre una copia de
+    # `motion_width` píxeles de ancho; sigue abierta `motion_hold` segundos
+    # tras el último movimiento o rostro visto
+    motion_gate: bool = False
+    motion_threshold: float = 0.01
+    motion_delta: int = 20
+    motion_hold: float = 2.0
+    motion_heartbeat: float = 1.0
+    motion_width: int = 80
+    # Reconocimiento: umbral de desconocido de cada backend (las distancias
+    # de EigenFaces, FisherFaces y LBPH no son comparables entre sí)
+    threshold: float = 8000.0
+    fisher_threshold: float = 500.0
+    lbph_threshold: float = 70.0
+    exact_search: bool = False
+    # Caché de identidad por track (re-predecir solo si caduca o cambia)
+    identity_cache: bool = True
+    identity_ttl: float = 2.0
+    identity_change: float = 12.0
+    identity_window: int = 7
+    identity_capacity: int = 64
+    # Instrumentación: overlay de FPS/latencia en el vídeo, endpoint HTTP
+    # local (/metrics, /stats.json; 0 = desactivado) y volcado JSON periódico
+    metrics_overlay: bool = False
+    metrics_port: int = 0
+    metrics_file: str = ""
+    metrics_interval: float = 5.0
+    # Servicio HTTP local de reconocimiento (service.py): micro-lotes de como
+    # mucho `service_max_batch` rostros o `service_max_wait_ms` de espera
+    service_port: int = 8750
+    service_max_batch: int = 32
+    service_max_wait_ms: float = 5.0
+    service_workers: int = 2
+    # Galería por shards (shards.py): candidatos que devuelve cada shard y
+    # plazo de cada consulta scatter-gather
+    shard_top_k: int = 5
+    shard_deadline_ms: float = 50.0
+
+    @property
+    def detect_budget_ms(self):
+        return self.target_frame_ms * self.detect_budget_share
+
+    @property
+    def recognition_threshold(self):
+        return getattr(self, threshold_field(self.backend))
+
+
+def threshold_field(backend):
+    # Opción de configuración con el umbral de `backend`
+    return "threshold" if backend == "eigen" else f"{backend}_threshold"
+
+
+def _coerce(value, kind):
+    if kind is bool:
+        if isinstance(value, str):
+            return value.strip().lower() in ("1", "true", "yes", "si", "sí", "on")
+        return bool(value)
+    return kind(value)
+
+
+def load_config(path=CONFIG_PATH, env=None):
+    # Valores por defecto <- facialoo.json (si existe) <- variables FACIALOO_*
+    env = os.environ if env is None else env
+    values = {}
+    if path and os.path.isfile(path):
+        with open(path) as f:
+            values.update(json.load(f))
+    types = {f.name: type(f.default) for f in fields(VisionConfig)}
+    for name in types:
+        env_value = env.get(ENV_PREFIX + name.upper())
+        if env_value is not None:
+            values[name] = env_value
+    unknown = set(values) - set(types)
+    if unknown:
+        raise ValueError(f"Opciones de configuración desconocidas: {', '.join(sorted(unknown))}")
+    return VisionConfig(**{name: _coerce(value, types[name]) for name, value in values.items()})
+
+
+def update_config_file(values, path=CONFIG_PATH):
+    # Cambia solo las opciones de `values` en facialoo.json: el resto del
+    # fichero se conserva y las que no están siguen los valores por defecto.
+    # Escritura atómica (temporal + rename).
+    unknown = set(values) - {f.name for f in fields(VisionConfig)}
+    if unknown:
+        raise ValueError(f"Opciones de configuración desconocidas: {', '.join(sorted(unknown))}")
+    stored = {}
+    if os.path.isfile(path):
+        with open(path) as f:
+            stored = json.load(f)
+    stored.update(values)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(stored, f, indent=2)
+    os.replace(tmp_path, path)
+    return stored
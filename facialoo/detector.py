@@ -0,0 +1,68 @@
+from time import perf_counter
+
+import cv2 as cv
+import numpy as np
+
+# Ventana mínima del haarcascade frontal
+CASCADE_WINDOW = 24
+
+
+class AdaptiveDetector:
+    # Ejecuta el cascade sobre una copia reducida del frame en gris y devuelve
+    # las cajas en coordenadas del frame original. Si el tiempo de detección
+    # (media móvil) supera el presupuesto, reduce trabajo en este orden:
+    # resolución de detección, minSize y scaleFactor; si sobra margen, lo
+    # deshace en orden inverso hasta volver a la configuración inicial.
+    def __init__(self, cascade, config, cooldown=5, alpha=0.3):
+        self.cascade = cascade
+        self.config = config
+        self.scale = config.detect_scale
+        self.scale_factor = config.scale_factor
+        self.min_size = config.min_size
+        self.cooldown = cooldown
+        self.alpha = alpha
+        self.detect_ms = None
+        self._since_adapt = 0
+
+    def __call__(self, gray):
+        started = perf_counter()
+        if self.scale < 1.0:
+            small = cv.resize(gray, None, fx=self.scale, fy=self.scale, interpolation=cv.INTER_AREA)
+        else:
+            small = gray
+        min_side = max(CASCADE_WINDOW, int(self.min_size * self.scale))
+        boxes = self.cascade.detectMultiScale(
+            small, self.scale_factor, self.config.min_neighbors, minSize=(min_side, min_side)
+        )
+        if len(boxes) and self.scale != 1.0:
+            boxes = np.round(np.asarray(boxes) / self.scale).astype(int)
+        if self.config.adaptive:
+            self._adapt((perf_counter() - started) * 1000)
+        return boxes
+
+    def _adapt(self, elapsed_ms):
+        if self.detect_ms is None:
+            self.detect_ms = elapsed_ms
+        else:
+            self.detect_ms += self.alpha * (elapsed_ms - self.detect_ms)
+        self._since_adapt += 1
+        if self._since_adapt < self.cooldown:
+            return
+        self._since_adapt = 0
+
+        cfg = self.config
+        budget = cfg.detect_budget_ms
+        if self.detect_ms > budget:
+            if self.scale > cfg.min_detect_scale:
+                self.scale = max(cfg.min_detect_scale, self.scale * 0.85)
+            elif self.min_size < cfg.max_min_size:
+                self.min_size = min(cfg.max_min_size, self.min_size + 10)
+            elif self.scale_factor < cfg.max_scale_factor:
+                self.scale_factor = min(cfg.max_scale_factor, self.scale_factor + 0.05)
+        elif self.detect_ms < budget * 0.5:
+            if self.scale_factor > cfg.scale_factor:
+                self.scale_factor = max(cfg.scale_factor, self.scale_factor - 0.05)
+            elif self.min_size > cfg.min_size:
+                self.min_size = max(cfg.min_size, self.min_size - 10)
+            elif self.scale < cfg.detect_scale:
+                self.scale = min(cfg.detect_scale, self.scale / 0.85)
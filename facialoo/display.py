@@ -0,0 +1,166 @@
+import argparse
+import sys
+from time import perf_counter
+
+import cv2 as cv
+import numpy as np
+from PIL import Image, ImageTk
+
+# Tamaño usado mientras Tk aún no ha informado del tamaño real del visor
+FALLBACK_VIEWPORT = (640, 480)
+# Modo de la PhotoImage y de la imagen intermedia: si coinciden y la imagen
+# está en un bloque contiguo, ImageTk.paste() la copia sin reservar memoria
+PHOTO_MODE = "RGB"
+
+
+def _block_image(size):
+    # Imagen PIL en un único bloque contiguo, reservada una vez por tamaño.
+    # Image.core.new_block no es API documentada (comprobado con Pillow 12.3):
+    # ante cualquier fallo se usa Image.new, que funciona igual pero hace que
+    # paste() reserve un bloque y convierta en cada frame.
+    try:
+        image = Image.new(PHOTO_MODE, size)._new(Image.core.new_block(PHOTO_MODE, size))
+        if image.im.isblock():
+            return image
+    except Exception:
+        pass
+    return Image.new(PHOTO_MODE, size)
+
+
+class FrameRenderer:
+    # Pinta frames BGR en un tk.Label sin reservar memoria por frame: el
+    # tamaño del visor se cachea (evento <Configure>), el redimensionado y la
+    # conversión a RGB escriben en buffers preasignados y la misma PhotoImage
+    # se actualiza con paste(). Solo se reasigna si cambia el tamaño del
+    # frame o del visor. Además limita el refresco a `max_fps`, aparte del
+    # ritmo al que llegan los resultados.
+    def __init__(self, label, blank, max_fps=60.0):
+        self.label = label
+        self.blank = blank
+        self.min_interval = 1.0 / max_fps if max_fps > 0 else 0.0
+        self.viewport = FALLBACK_VIEWPORT
+        self.drawn = 0
+        self.skipped = 0
+        self._key = None
+        self._size = None
+        self._resized = None
+        self._rgb = None
+        self._image = None
+        self._photo = None
+        self._attached = False
+        self._last_draw = None
+
+    def set_viewport(self, width, height):
+        if width >= 10 and height >= 10:
+            self.viewport = (width, height)
+
+    def on_configure(self, event):
+        self.set_viewport(event.width, event.height)
+
+    def wait_ms(self):
+        # Milisegundos hasta que se permita el siguiente dibujado
+        if self._last_draw is None:
+            return 0
+        remaining = self.min_interval - (perf_counter() - self._last_draw)
+        return max(0, int(remaining * 1000))
+
+    def _prepare(self, frame):
+        h, w = frame.shape[:2]
+        key = (w, h, self.viewport)
+        if key == self._key:
+            return
+        viewport_width, viewport_height = self.viewport
+        # Escala que ajusta al contenedor sin perder aspect ratio
+        scale = min(viewport_width / w, viewport_height / h)
+        size = (max(1, int(w * scale)), max(1, int(h * scale)))
+        if size != self._size:
+            new_w, new_h = size
+            self._resized = np.empty((new_h, new_w, 3), dtype=np.uint8)
+            self._rgb = np.empty((new_h, new_w, 3), dtype=np.uint8)
+            self._image = _block_image(size)
+            self._photo = ImageTk.PhotoImage(PHOTO_MODE, size)
+            self._attached = False
+            self._size = size
+        self._key = key
+
+    def show(self, frame, force=False):
+        if not force and self.wait_ms() > 0:
+            self.skipped += 1
+            return False
+        self._prepare(frame)
+        if self._rgb.shape[:2] == frame.shape[:2]:
+            cv.cvtColor(frame, cv.COLOR_BGR2RGB, dst=self._rgb)
+        else:
+            cv.resize(frame, self._size, dst=self._resized)
+            cv.cvtColor(self._resized, cv.COLOR_BGR2RGB, dst=self._rgb)
+        # frombytes desempaqueta sobre la memoria ya reservada del bloque
+        self._image.frombytes(self._rgb)
+        self._photo.paste(self._image)
+        if not self._attached:
+            self.label.config(image=self._photo)
+            self._attached = True
+        self._last_draw = perf_counter()
+        self.drawn += 1
+        return True
+
+    @property
+    def block_backed(self):
+        # ¿paste() copia sin reservar? (False si se usó el respaldo Image.new)
+        return self._image is not None and self._image.im.isblock() and self._image.mode == PHOTO_MODE
+
+    def clear(self):
+        self.label.config(image=self.blank)
+        self._attached = False
+
+
+# ------------------------------------------------------------------ check
+def check_allocations(frames=50, size=(640, 480)):
+    # Dibuja `frames` frames sin ventana (Tk sustituido por objetos vacíos;
+    # ImageTk.PhotoImage.paste es el real) y cuenta los new_block que se
+    # reservan después del primer frame. -> (reservas, block_backed)
+    class _Photo:
+        tk = None
+
+        def __init__(self, **kw):
+            pass
+
+    class _Label:
+        def config(self, **kw):
+            pass
+
+    real_photo, real_call, real_new_block = ImageTk.tkinter.PhotoImage, ImageTk._pyimagingtkcall, Image.core.new_block
+    calls = []
+
+    def new_block(mode, block_size):
+        calls.append(block_size)
+        return real_new_block(mode, block_size)
+
+    ImageTk.tkinter.PhotoImage = _Photo
+    ImageTk._pyimagingtkcall = lambda *args: None
+    Image.core.new_block = new_block
+    try:
+        renderer = FrameRenderer(_Label(), None, max_fps=0)
+        renderer.set_viewport(*size)
+        frame = np.zeros((size[1] // 2, size[0] // 2, 3), dtype=np.uint8)
+        renderer.show(frame)
+        calls.clear()
+        for i in range(frames):
+            frame[:] = i
+            renderer.show(frame)
+        return len(calls), renderer.block_backed
+    finally:
+        ImageTk.tkinter.PhotoImage, ImageTk._pyimagingtkcall = real_photo, real_call
+        Image.core.new_block = real_new_block
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Comprueba que el visor no reserva memoria por frame")
+    parser.add_argument("--frames", type=int, default=50)
+    args = parser.parse_args(argv)
+    allocations, block_backed = check_allocations(args.frames)
+    print(f"Frames: {args.frames}  Reservas new_block: {allocations}  Bloque contiguo: {block_backed}")
+    return 0 if allocations == 0 and block_backed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+import cv2 as cv
+import os
+
+import numpy as np
+
+from gallery_index import GalleryIndex, index_path_for
+from modelfile import BINARY_SUFFIX, read_binary, write_binary
+
+
+def project_faces(faces, mean, eigenvectors):
+    # faces: (F, 160, 160) o lista de ROIs -> (F, K). Resta sin modificar la
+    # entrada: si ya es float32, asarray/reshape devuelven una vista suya
+    data = np.asarray(faces, dtype=np.float32).reshape(len(faces), -1)
+    return (data - mean) @ eigenvectors
+
+
+class EigenFaceEngine:
+    # Inferencia EigenFace en NumPy con los parámetros del modelo entrenado
+    # por cv.face.EigenFaceRecognizer. Proyecta todos los rostros de un frame
+    # con una sola multiplicación y calcula las distancias a la galería en
+    # bloque, en lugar de una llamada a predict() por rostro.
+    def __init__(self, mean, eigenvectors, projections, labels, eigenvalues=None,
+                 label_names=None, index=None, exact=False, projection_sq=None):
+        self.mean = np.asarray(mean, dtype=np.float32).ravel()
+        self.eigenvectors = np.asarray(eigenvectors, dtype=np.float32)
+        self.projections = np.asarray(projections, dtype=np.float32)
+        self.labels = np.asarray(labels, dtype=np.int32).ravel()
+        if eigenvalues is None:
+            eigenvalues = np.zeros(self.eigenvectors.shape[1])
+        self.eigenvalues = np.asarray(eigenvalues, dtype=np.float64).ravel()
+        # Nombre de cada etiqueta (labelsInfo del modelo); vacío en modelos antiguos
+        self.label_names = list(label_names or [])
+        # ||p||^2 precalculado para la expansión ||q - p||^2 = ||q||^2 + ||p||^2 - 2 q·p
+        # (el modelo binario ya lo trae, así que cargarlo no recorre la galería)
+        if projection_sq is None:
+            projection_sq = np.einsum("ij,ij->i", self.projections, self.projections)
+        self._projection_sq = np.asarray(projection_sq, dtype=np.float32)
+        # Índice de galería opcional; `exact` fuerza la búsqueda exhaustiva
+        self.index = index
+        self.exact = exact
+
+    @classmethod
+    def from_recognizer(cls, recognizer):
+        projections = recognizer.getProjections()
+        labels = recognizer.getLabels().ravel()
+        label_names = [recognizer.getLabelInfo(int(l)) for l in range(labels.max() + 1)] if len(labels) else []
+        if not any(label_names):
+            label_names = []
+        return cls(
+            recognizer.getMean(),
+            recognizer.getEigenVectors(),
+            np.vstack(projections) if len(projections) else np.empty((0, 0)),
+            labels,
+            eigenvalues=recognizer.getEigenValues(),
+            label_names=label_names,
+        )
+
+    @classmethod
+    def from_binary(cls, path, mmap=True):
+        # Arrays memory-mapped: el SO carga las páginas bajo demanda
+        arrays, label_names = read_binary(path, mmap)
+        return cls(
+            arrays["mean"],
+            arrays["eigenvectors"],
+            arrays["projections"],
+            arrays["labels"],
+            eigenvalues=arrays["eigenvalues"],
+            label_names=label_names,
+            projection_sq=arrays["projection_sq"],
+        )
+
+    @classmethod
+    def load(cls, path, use_index=True, exact=False, mmap=True):
+        if path.endswith(BINARY_SUFFIX):
+            engine = cls.from_binary(path, mmap)
+        else:
+            recognizer = cv.face.EigenFaceRecognizer_create()
+            recognizer.read(path)
+            engine = cls.from_recognizer(recognizer)
+        engine.exact = exact
+        if use_index:
+            engine.index = load_index_for(path, engine)
+        return engine
+
+    @property
+    def num_components(self):
+        return self.eigenvectors.shape[1]
+
+    def add_samples(self, projections, labels):
+        # Añade proyecciones a la galería sin tocar la base (entrenamiento incremental)
+        self.projections = np.vstack([self.projections, np.asarray(projections, dtype=np.float32)])
+        self.labels = np.concatenate([self.labels, np.asarray(labels, dtype=np.int32).ravel()])
+        self._projection_sq = np.einsum("ij,ij->i", self.projections, self.projections)
+        self.index = None
+
+    def save(self, path):
+        if path.endswith(BINARY_SUFFIX):
+            write_binary(path, {
+                "mean": self.mean,
+                "eigenvalues": self.eigenvalues,
+                "eigenvectors": self.eigenvectors,
+                "projections": self.projections,
+                "projection_sq": self._projection_sq,
+                "labels": self.labels,
+            }, self.label_names)
+        else:
+            write_model(path, self.mean, self.eigenvalues, self.eigenvectors,
+                        self.projections, self.labels, self.label_names)
+
+    def project(self, faces):
+        return project_faces(faces, self.mean, self.eigenvectors)
+
+    def _exact_best(self, queries):
+        query_sq = np.einsum("ij,ij->i", queries, queries)
+        d2 = query_sq[:, None] + self._projection_sq[None, :] - 2.0 * (queries @ self.projections.T)
+        return np.argmin(d2, axis=1)
+
+    def _indexed_best(self, queries):
+        best = np.empty(len(queries), dtype=np.int64)
+        for i, (query, candidates) in enumerate(zip(queries, self.index.candidates(queries))):
+            diff = self.projections[candidates] - query
+            best[i] = candidates[np.argmin(np.einsum("ij,ij->i", diff, diff))]
+        return best
+
+    def nearest(self, queries, exact=None):
+        # Vecino más cercano de cada proyección en la galería -> (labels, distancias)
+        queries = np.asarray(queries, dtype=np.float32)
+        if exact is None:
+            exact = self.exact
+        if exact or self.index is None:
+            best = self._exact_best(queries)
+        else:
+            best = self._indexed_best(queries)
+        # La expansión en float32 pierde precisión; la distancia del ganador
+        # se recalcula exacta para que el umbral se compare igual que en OpenCV
+        diff = self.projections[best].astype(np.float64) - queries
+        return self.labels[best], np.sqrt(np.einsum("ij,ij->i", diff, diff))
+
+    def predict_batch(self, faces):
+        if len(faces) == 0:
+            return np.empty(0, dtype=np.int32), np.empty(0)
+        return self.nearest(self.project(faces))
+
+    def predict(self, face):
+        labels, distances = self.predict_batch([face])
+        return int(labels[0]), float(distances[0])
+
+
+def write_model(path, mean, eigenvalues, eigenvectors, projections, labels, label_names=()):
+    # Mismo XML que EigenFaceRecognizer.write(), legible por cv.face y por
+    # EigenFaceEngine.load(). Se escribe en un temporal y se renombra.
+    tmp_path = path + ".tmp.xml"
+    fs = cv.FileStorage(tmp_path, cv.FILE_STORAGE_WRITE)
+    fs.startWriteStruct("opencv_eigenfaces", cv.FileNode_MAP)
+    fs.write("threshold", float(np.finfo(np.float64).max))
+    fs.write("num_components", int(eigenvectors.shape[1]))
+    fs.write("mean", np.asarray(mean, dtype=np.float64).reshape(1, -1))
+    fs.write("eigenvalues", np.asarray(eigenvalues, dtype=np.float64).reshape(-1, 1))
+    fs.write("eigenvectors", np.asarray(eigenvectors, dtype=np.float64))
+    fs.startWriteStruct("projections", cv.FileNode_SEQ)
+    for projection in projections:
+        fs.write("", np.asarray(projection, dtype=np.float64).reshape(1, -1))
+    fs.endWriteStruct()
+    fs.write("labels", np.asarray(labels, dtype=np.int32).reshape(-1, 1))
+    fs.startWriteStruct("labelsInfo", cv.FileNode_SEQ)
+    for label, name in enumerate(label_names):
+        fs.startWriteStruct("", cv.FileNode_MAP)
+        fs.write("label", label)
+        fs.write("value", name)
+        fs.endWriteStruct()
+    fs.endWriteStruct()
+    fs.endWriteStruct()
+    fs.release()
+    os.replace(tmp_path, path)
+
+
+def load_index_for(model_path, engine):
+    # Índice guardado junto al modelo; se ignora si no corresponde a su
+    # galería (huella de proyecciones y etiquetas)
+    path = index_path_for(model_path)
+    if not os.path.isfile(path):
+        return None
+    index = GalleryIndex.load(path)
+    if not index.matches(engine._projection_sq, engine.labels):
+        return None
+    return index
+
+
+def build_index_for(model_path, engine):
+    index = GalleryIndex.build(engine.projections, engine.labels)
+    index.save(index_path_for(model_path))
+    return index
@@ -1,34 +1,38 @@
-import cv2 as cv
-import os
-import numpy as np
+import sys
 from time import time
 
-data = 'Data'
-lista_data = os.listdir(data)
-ids = []
-rostros_data = []
-id = 0
-tiempo_inicial = time()
-for fila in lista_data:
-    ruta_completa = data + '/' + fila
-    print('Iniciando lectura...')
-    for archivo in os.listdir(ruta_completa):
-
-        print('Imagenes: ', fila + '/'+archivo)
+from backends import model_path_for
+from config import load_config
+from metrics import Metrics
+from training import train_full, train_incremental
 
-        ids.append(id)
-        rostros_data.append(cv.imread(ruta_completa + '/' + archivo, 0))
+config = load_config()
+modelo = model_path_for(config.backend, 'EntrenamientoEigenFaceRecognizer.xml')
+# Mismas opciones que la GUI y la CLI: backend, entrenador y componentes PCA
+opciones = {
+    'trainer': config.trainer,
+    'components': config.pca_components,
+    'chunk_size': config.pca_chunk,
+    'backend': config.backend,
+}
 
-    id = id+1
-    tiempo_final_lectura = time()
-    tiempo_total_lectura = tiempo_final_lectura - tiempo_inicial
-    print('Tiempo total lectura: ', tiempo_total_lectura)
+# Alta rápida: python entrenamiento.py --incremental
+if '--incremental' in sys.argv:
+    resultado = train_incremental('Data', modelo, **opciones)
+    print('Modo:', resultado['mode'], '- añadidos:', resultado['added'])
+    sys.exit(0)
 
-entrenamiento_EigenFaceRecognizer = cv.face.EigenFaceRecognizer_create()
-print('Iniciando el entrenamiento...espere')
-entrenamiento_EigenFaceRecognizer.train(rostros_data, np.array(ids))
-Tiempo_final_entrenamiento = time()
-tiempo_total_entrenamiento = Tiempo_final_entrenamiento - tiempo_total_lectura
-print('Tiempo entrenamiento total: ', tiempo_total_entrenamiento)
-entrenamiento_EigenFaceRecognizer.write('EntrenamientoEigenFaceRecognizer.xml')
+tiempo_inicial = time()
+tiempos = Metrics()
+print('Iniciando lectura y entrenamiento...espere')
+# Lectura en paralelo (pack memory-mapped o JPEG sueltos), entrenamiento y
+# escritura atómica del modelo, su índice de galería y el manifiesto
+resultado = train_full('Data', modelo, progress=lambda hechas, total: print('Imagenes: ', hechas, '/', total),
+                       metrics=tiempos, **opciones)
+etapas = tiempos.snapshot()['stages']
+print('Backend:', config.backend, '- personas:', len(resultado['people']), '- imágenes:', resultado['images'])
+print('Tiempo total lectura: ', etapas['load']['total_ms'] / 1000)
+print('Tiempo entrenamiento total: ', etapas['train']['total_ms'] / 1000)
+print('Tiempo escritura: ', etapas['write']['total_ms'] / 1000)
+print('Tiempo total: ', time() - tiempo_inicial)
 print('Entrenamiento concluido')
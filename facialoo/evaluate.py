@@ -0,0 +1,274 @@
+import argparse
+import json
+import sys
+from time import perf_counter
+
+import numpy as np
+
+from backends import BACKENDS, get_backend
+from config import CONFIG_PATH, load_config, threshold_field, update_config_file
+from pca import DEFAULT_CHUNK, DEFAULT_COMPONENTS
+from training import load_dataset
+from vision import DATA_DIR
+
+DEFAULT_FOLDS = 5
+# Sondas por bloque de la matriz de distancias sonda×galería
+DEFAULT_PROBE_CHUNK = 256
+# Puntos de la curva FAR/FRR que se guardan en el informe
+THRESHOLD_STEPS = 200
+# Sondas medidas una a una para la latencia por rostro
+LATENCY_SAMPLES = 200
+
+
+def make_splits(ids, folds=DEFAULT_FOLDS, holdout=0.0, unknown_fraction=0.2, seed=0):
+    # -> lista de (galería, sondas, impostores) con índices del dataset.
+    # Las imágenes de cada persona se reparten en `folds` partes (o una
+    # fracción `holdout` de prueba); además, en cada ronda una fracción de
+    # las personas queda fuera de la galería y sus imágenes hacen de
+    # impostores, como un desconocido delante de la cámara.
+    ids = np.asarray(ids)
+    rng = np.random.default_rng(seed)
+    people = rng.permutation(np.unique(ids))
+    n_unknown = min(int(round(len(people) * unknown_fraction)), len(people) - 1) if len(people) > 1 else 0
+    per_person = {person: rng.permutation(np.flatnonzero(ids == person)) for person in people}
+
+    splits = []
+    for fold in range(1 if holdout else folds):
+        # Los desconocidos rotan entre rondas
+        unknown = set(np.roll(people, -fold * n_unknown)[:n_unknown].tolist())
+        gallery, probes, impostors = [], [], []
+        for person in people:
+            indices = per_person[person]
+            if person in unknown:
+                impostors.extend(indices)
+                continue
+            if holdout:
+                test = indices[:min(int(round(len(indices) * holdout)), len(indices) - 1)]
+            else:
+                test = np.array_split(indices, folds)[fold]
+            if len(test) == len(indices):
+                # Sin imágenes en la galería no hay nada que reconocer
+                test = indices[:0]
+            probes.extend(test)
+            gallery.extend(np.setdiff1d(indices, test, assume_unique=True))
+        splits.append(tuple(np.asarray(part, dtype=np.int64) for part in (gallery, probes, impostors)))
+    return splits
+
+
+def score_probes(engine, faces, indices, chunk_size=DEFAULT_PROBE_CHUNK):
+    # Vecino más cercano de cada sonda. La matriz de distancias completa no
+    # existe nunca: se calcula por bloques de `chunk_size` sondas frente a
+    # toda la galería (chunk × G en float32 con EigenFaceEngine, sin índice)
+    # y se reduce al mínimo por fila.
+    labels = np.empty(len(indices), dtype=np.int32)
+    distances = np.empty(len(indices))
+    started = perf_counter()
+    for start in range(0, len(indices), chunk_size):
+        part = indices[start:start + chunk_size]
+        labels[start:start + len(part)], distances[start:start + len(part)] = \
+            engine.predict_batch([faces[i] for i in part])
+    return labels, distances, perf_counter() - started
+
+
+def probe_latency(engine, faces, indices, samples=LATENCY_SAMPLES):
+    # Latencia de inferencia de un rostro aislado (proyectar + buscar), como
+    # en la GUI con una sola cara en el frame
+    latencies = []
+    for i in indices[:samples]:
+        started = perf_counter()
+        engine.predict_batch([faces[i]])
+        latencies.append(perf_counter() - started)
+    return latencies
+
+
+def error_curve(genuine_ok, genuine_dist, wrong_dist):
+    # Un intento se acepta si distancia < umbral (igual que el reconocimiento).
+    # FRR: sondas de personas conocidas que no salen con su nombre.
+    # FAR: intentos que darían un nombre equivocado si se aceptan: impostores
+    # y sondas cuyo vecino más cercano es otra persona.
+    # Umbrales: los puntos medios entre distancias distintas consecutivas
+    # (más los extremos) recorren todos los puntos de operación posibles y,
+    # si genuinas y erróneas se separan, caen dentro del hueco entre ambas.
+    scores = np.unique(np.concatenate([genuine_dist, wrong_dist]))
+    thresholds = np.concatenate([[0.0], (scores[:-1] + scores[1:]) / 2,
+                                 [np.nextafter(scores.max(), np.inf)]])
+    correct = np.sort(genuine_dist[genuine_ok])
+    wrong = np.sort(wrong_dist)
+    accepted_ok = np.searchsorted(correct, thresholds, side="left")
+    accepted_wrong = np.searchsorted(wrong, thresholds, side="left")
+    frr = 1.0 - accepted_ok / max(len(genuine_dist), 1)
+    far = accepted_wrong / len(wrong) if len(wrong) else np.zeros(len(thresholds))
+    return thresholds, far, frr
+
+
+def recommend_threshold(thresholds, far, frr, target_far=None):
+    # Con `target_far`: el umbral más alto cuya FAR no lo supera (menos
+    # rechazos). Sin él: el punto de igual error (EER); si hay una meseta de
+    # umbrales empatados se toma su centro, el más alejado de ambos errores.
+    if target_far is not None:
+        allowed = np.flatnonzero(far <= target_far)
+        best = allowed[-1] if len(allowed) else 0
+    else:
+        gap = np.abs(far - frr)
+        tied = np.flatnonzero(gap <= gap.min() + 1e-12)
+        best = tied[len(tied) // 2]
+    return float(thresholds[best]), float(far[best]), float(frr[best])
+
+
+def roc_points(thresholds, far, frr, steps=THRESHOLD_STEPS):
+    # Curva reducida a `steps` puntos para el informe JSON
+    keep = np.unique(np.linspace(0, len(thresholds) - 1, steps).round().astype(int))
+    return {"threshold": thresholds[keep].tolist(), "far": far[keep].tolist(), "frr": frr[keep].tolist()}
+
+
+def evaluate(data_dir, folds=DEFAULT_FOLDS, holdout=0.0, unknown_fraction=0.2, trainer="numpy",
+             components=DEFAULT_COMPONENTS, chunk_size=DEFAULT_CHUNK, probe_chunk=DEFAULT_PROBE_CHUNK, target_far=None,
+             current_threshold=None, seed=0, progress=None, backend="eigen"):
+    recognizer = get_backend(backend, trainer, components, chunk_size)
+    faces, ids, people = load_dataset(data_dir)
+    if len(people) < 1 or not faces:
+        raise ValueError("Directorio Data vacío o sin imágenes válidas.")
+    ids = np.asarray(ids, dtype=np.int32)
+
+    rounds = []
+    genuine_ok, genuine_dist, wrong_dist = [], [], []
+    latencies = []
+    batch_seconds = 0.0
+    batch_probes = 0
+    splits = make_splits(ids, folds, holdout, unknown_fraction, seed)
+    for number, (gallery, probes, impostors) in enumerate(splits, 1):
+        if not len(gallery) or not len(probes) + len(impostors):
+            continue
+        started = perf_counter()
+        engine = recognizer.train([faces[i] for i in gallery], ids[gallery], people)
+        train_seconds = perf_counter() - started
+
+        labels, distances, seconds = score_probes(engine, faces, np.concatenate([probes, impostors]), probe_chunk)
+        batch_seconds += seconds
+        batch_probes += len(labels)
+        ok = labels[:len(probes)] == ids[probes]
+        genuine_ok.append(ok)
+        genuine_dist.append(distances[:len(probes)])
+        wrong_dist.append(distances[:len(probes)][~ok])
+        wrong_dist.append(distances[len(probes):])
+        latencies.extend(probe_latency(engine, faces, probes if len(probes) else impostors))
+
+        rounds.append({
+            "gallery": len(gallery),
+            "probes": len(probes),
+            "impostors": len(impostors),
+            "accuracy": float(ok.mean()) if len(ok) else None,
+            "train_s": train_seconds,
+        })
+        if progress is not None:
+            progress(number, len(splits))
+    if not rounds:
+        raise ValueError("No hay imágenes suficientes para separar galería y sondas.")
+
+    genuine_ok = np.concatenate(genuine_ok)
+    genuine_dist = np.concatenate(genuine_dist)
+    wrong_dist = np.concatenate(wrong_dist)
+    thresholds, far, frr = error_curve(genuine_ok, genuine_dist, wrong_dist)
+    threshold, far_at, frr_at = recommend_threshold(thresholds, far, frr, target_far)
+    eer_threshold, eer_far, eer_frr = recommend_threshold(thresholds, far, frr)
+    samples = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+
+    report = {
+        "people": len(people),
+        "images": len(faces),
+        "backend": backend,
+        "trainer": trainer,
+        "mode": f"holdout {holdout:g}" if holdout else f"{folds}-fold",
+        "rounds": rounds,
+        "genuine": int(len(genuine_dist)),
+        "impostor_attempts": int(len(wrong_dist)),
+        # Rank-1 en conjunto cerrado: el vecino más cercano es la persona correcta
+        "accuracy": float(genuine_ok.mean()) if len(genuine_ok) else 0.0,
+        "eer": (eer_far + eer_frr) / 2,
+        "eer_threshold": eer_threshold,
+        "recommended_threshold": threshold,
+        "target_far": target_far,
+        "far": far_at,
+        "frr": frr_at,
+        "latency_ms": {"p50": float(p50), "p95": float(p95), "p99": float(p99), "mean": float(samples.mean())},
+        "batch_ms_per_probe": batch_seconds * 1000 / batch_probes if batch_probes else 0.0,
+        "roc": roc_points(thresholds, far, frr),
+    }
+    if current_threshold is not None:
+        report["current_threshold"] = current_threshold
+        report["current_far"] = float((wrong_dist < current_threshold).mean()) if len(wrong_dist) else 0.0
+        report["current_frr"] = 1.0 - float((genuine_ok & (genuine_dist < current_threshold)).mean())
+    return report
+
+
+def write_threshold(threshold, backend="eigen", path=CONFIG_PATH):
+    # Solo la opción de umbral del backend, en el fichero (sin variables
+    # FACIALOO_*): la GUI lo lee al arrancar. Sin redondear: el umbral
+    # recomendado puede estar en un hueco estrecho.
+    field = threshold_field(backend)
+    return update_config_file({field: float(threshold)}, path)[field]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluación offline de precisión, umbral y latencia")
+    parser.add_argument("--data", default=DATA_DIR)
+    parser.add_argument("--folds", type=int, default=DEFAULT_FOLDS, help="rondas de validación cruzada")
+    parser.add_argument("--holdout", type=float, default=0.0,
+                        help="fracción de prueba en una sola ronda (en lugar de k-fold)")
+    parser.add_argument("--unknown", type=float, default=0.2,
+                        help="fracción de personas fuera de la galería en cada ronda (impostores)")
+    parser.add_argument("--backend", choices=list(BACKENDS), default=None,
+                        help="backend a evaluar (por defecto el de la configuración)")
+    parser.add_argument("--trainer", choices=("numpy", "opencv"), default=None,
+                        help="entrenador (por defecto el de la configuración)")
+    parser.add_argument("--components", type=int, default=None)
+    parser.add_argument("--chunk", type=int, default=DEFAULT_PROBE_CHUNK, help="sondas por bloque de distancias")
+    parser.add_argument("--target-far", type=float, default=None,
+                        help="FAR máxima admitida para el umbral recomendado (por defecto el EER)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="guardar el informe (con la curva FAR/FRR) en este fichero")
+    parser.add_argument("--write-config", action="store_true",
+                        help="guardar el umbral recomendado en facialoo.json")
+    args = parser.parse_args(argv)
+
+    config = load_config()
+    backend = args.backend or config.backend
+
+    def progress(done, total):
+        print(f"\rRonda {done}/{total}", end="", file=sys.stderr, flush=True)
+
+    try:
+        report = evaluate(args.data, args.folds, args.holdout, args.unknown, args.trainer or config.trainer,
+                          args.components or config.pca_components, config.pca_chunk, args.chunk,
+                          args.target_far, getattr(config, threshold_field(backend)), args.seed, progress, backend)
+    except (OSError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 2
+    print(file=sys.stderr)
+
+    print(f"Personas: {report['people']}  Imágenes: {report['images']}  {report['mode']}  "
+          f"Backend: {report['backend']}" + (f" ({report['trainer']})" if backend == "eigen" else ""))
+    print(f"Sondas: {report['genuine']}  Intentos de impostor: {report['impostor_attempts']}  "
+          f"Acierto rank-1: {report['accuracy'] * 100:.1f}%")
+    print(f"EER: {report['eer'] * 100:.1f}% (umbral {report['eer_threshold']:.1f})")
+    if "current_threshold" in report:
+        print(f"Umbral actual {report['current_threshold']:.1f}  FAR: {report['current_far'] * 100:.1f}%  "
+              f"FRR: {report['current_frr'] * 100:.1f}%")
+    print(f"Umbral recomendado {report['recommended_threshold']:.1f}  FAR: {report['far'] * 100:.1f}%  "
+          f"FRR: {report['frr'] * 100:.1f}%")
+    latency = report["latency_ms"]
+    print(f"Latencia por rostro ms  p50: {latency['p50']:.3f}  p95: {latency['p95']:.3f}  "
+          f"p99: {latency['p99']:.3f}  en lote: {report['batch_ms_per_probe']:.3f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.write_config:
+        saved = write_threshold(report["recommended_threshold"], backend)
+        print(f"{threshold_field(backend)} = {saved:.1f} guardado en {CONFIG_PATH}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+import argparse
+import json
+import os
+import sys
+
+import cv2 as cv
+import numpy as np
+
+from sources import IMAGE_EXTENSIONS
+from vision import DATA_DIR, FACE_SIZE
+
+PACK_NAME = "faces.u8"
+PACK_INDEX = "faces.json"
+
+
+class FaceStore:
+    # Almacén empaquetado por persona: todos los ROIs en un único fichero
+    # contiguo (N, 160, 160) uint8 sin compresión y un índice JSON mínimo.
+    # El número de muestras se deduce del tamaño del fichero, así que añadir
+    # es un simple append sin reescribir el índice.
+    def __init__(self, person_dir, face_size=FACE_SIZE):
+        self.person_dir = person_dir
+        self.pack_path = os.path.join(person_dir, PACK_NAME)
+        self.index_path = os.path.join(person_dir, PACK_INDEX)
+        self.shape = (face_size[1], face_size[0])
+        self.frame_bytes = self.shape[0] * self.shape[1]
+
+    @staticmethod
+    def exists(person_dir):
+        return os.path.isfile(os.path.join(person_dir, PACK_NAME))
+
+    @property
+    def count(self):
+        if not os.path.isfile(self.pack_path):
+            return 0
+        return os.path.getsize(self.pack_path) // self.frame_bytes
+
+    def _write_index(self):
+        if os.path.isfile(self.index_path):
+            return
+        os.makedirs(self.person_dir, exist_ok=True)
+        with open(self.index_path, "w") as f:
+            json.dump({"shape": list(self.shape), "dtype": "uint8", "file": PACK_NAME}, f)
+
+    def reset(self):
+        os.makedirs(self.person_dir, exist_ok=True)
+        open(self.pack_path, "wb").close()
+        self._write_index()
+
+    def append(self, rois):
+        # rois: un ROI (160, 160) o una secuencia/array de ROIs
+        data = np.asarray(rois, dtype=np.uint8)
+        if data.shape == self.shape:
+            data = data[None]
+        if data.shape[1:] != self.shape:
+            raise ValueError(f"Tamaño de rostro inválido {data.shape[1:]}, se esperaba {self.shape}")
+        self._write_index()
+        with open(self.pack_path, "ab") as f:
+            f.write(np.ascontiguousarray(data).tobytes())
+        return self.count
+
+    def load(self):
+        # Vista memory-mapped de solo lectura: no se copia nada a RAM
+        count = self.count
+        if count == 0:
+            return np.empty((0,) + self.shape, dtype=np.uint8)
+        return np.memmap(self.pack_path, dtype=np.uint8, mode="r", shape=(count,) + self.shape)
+
+
+def _natural_key(filename):
+    # imagen_2.jpg antes que imagen_10.jpg
+    stem = os.path.splitext(filename)[0]
+    digits = "".join(c for c in stem if c.isdigit())
+    return (int(digits) if digits else -1, filename)
+
+
+def migrate_person(person_dir, remove_images=False):
+    store = FaceStore(person_dir)
+    files = sorted((f for f in os.listdir(person_dir) if f.lower().endswith(IMAGE_EXTENSIONS)), key=_natural_key)
+    if not files:
+        return 0
+    faces = []
+    for filename in files:
+        img = cv.imread(os.path.join(person_dir, filename), 0)
+        if img is None:
+            continue
+        if img.shape != store.shape:
+            img = cv.resize(img, FACE_SIZE, interpolation=cv.INTER_CUBIC)
+        faces.append(img)
+    # Migración en un temporal para no dejar un pack a medias si algo falla
+    tmp_path = store.pack_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(np.asarray(faces, dtype=np.uint8).tobytes())
+    os.replace(tmp_path, store.pack_path)
+    store._write_index()
+    if remove_images:
+        for filename in files:
+            os.remove(os.path.join(person_dir, filename))
+    return len(faces)
+
+
+def migrate(data_dir=DATA_DIR, remove_images=False, force=False):
+    migrated = {}
+    for person in sorted(os.listdir(data_dir)):
+        person_dir = os.path.join(data_dir, person)
+        if not os.path.isdir(person_dir):
+            continue
+        if FaceStore.exists(person_dir) and not force:
+            continue
+        migrated[person] = migrate_person(person_dir, remove_images)
+    return migrated
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Migra Data/<nombre>/*.jpg al almacén empaquetado")
+    parser.add_argument("--data", default=DATA_DIR)
+    parser.add_argument("--remove-jpg", action="store_true", help="borrar las imágenes sueltas tras migrar")
+    parser.add_argument("--force", action="store_true", help="rehacer el pack aunque ya exista")
+    args = parser.parse_args(argv)
+
+    migrated = migrate(args.data, args.remove_jpg, args.force)
+    for person, count in migrated.items():
+        print(f"{person}: {count} imágenes")
+    if not migrated:
+        print("Nada que migrar.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
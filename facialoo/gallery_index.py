@@ -0,0 +1,162 @@
+import argparse
+import os
+import sys
+import zlib
+from time import perf_counter
+
+import cv2 as cv
+import numpy as np
+
+INDEX_SUFFIX = ".index.npz"
+
+# Sub-centroides por persona: una misma identidad puede tener varias poses,
+# así que se agrupan sus proyecciones en unos pocos clusters (IVF por identidad)
+CLUSTERS_PER_IDENTITY = 4
+# Clusters más cercanos que se refinan con búsqueda exacta
+DEFAULT_NPROBE = 8
+
+
+def index_path_for(model_path):
+    return os.path.splitext(model_path)[0] + INDEX_SUFFIX
+
+
+def gallery_fingerprint(projection_sq, labels):
+    # Huella de la galería: normas al cuadrado de las proyecciones y
+    # etiquetas. Basta para detectar un índice de otro modelo con el mismo
+    # número de muestras y no obliga a leer todas las proyecciones (mmap).
+    projection_sq = np.ascontiguousarray(projection_sq, dtype=np.float32)
+    labels = np.ascontiguousarray(np.ravel(labels), dtype=np.int32)
+    return zlib.crc32(labels.tobytes(), zlib.crc32(projection_sq.tobytes()))
+
+
+class GalleryIndex:
+    # Cuantizador grueso sobre el espacio de proyecciones: se compara cada
+    # consulta con los centroides y solo se recorren exhaustivamente los
+    # miembros de los `nprobe` clusters más cercanos.
+    def __init__(self, centroids, offsets, members, num_projections, nprobe=DEFAULT_NPROBE, fingerprint=None):
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.members = np.asarray(members, dtype=np.int64)
+        self.num_projections = int(num_projections)
+        self.nprobe = nprobe
+        self.fingerprint = fingerprint
+        self._centroid_sq = np.einsum("ij,ij->i", self.centroids, self.centroids)
+
+    @classmethod
+    def build(cls, projections, labels, clusters_per_identity=CLUSTERS_PER_IDENTITY, nprobe=DEFAULT_NPROBE):
+        projections = np.asarray(projections, dtype=np.float32)
+        labels = np.asarray(labels).ravel()
+        centroids = []
+        groups = []
+        criteria = (cv.TERM_CRITERIA_EPS + cv.TERM_CRITERIA_MAX_ITER, 20, 1e-3)
+        for label in np.unique(labels):
+            idx = np.flatnonzero(labels == label)
+            k = min(clusters_per_identity, len(idx))
+            if k <= 1:
+                centroids.append(projections[idx].mean(axis=0))
+                groups.append(idx)
+                continue
+            _, assignment, centers = cv.kmeans(projections[idx], k, None, criteria, 2, cv.KMEANS_PP_CENTERS)
+            assignment = assignment.ravel()
+            for c in range(k):
+                group = idx[assignment == c]
+                if len(group):
+                    centroids.append(centers[c])
+                    groups.append(group)
+        offsets = np.zeros(len(groups) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(g) for g in groups])
+        members = np.concatenate(groups) if groups else np.empty(0, dtype=np.int64)
+        fingerprint = gallery_fingerprint(np.einsum("ij,ij->i", projections, projections), labels)
+        return cls(np.vstack(centroids), offsets, members, len(projections), nprobe, fingerprint)
+
+    def save(self, path):
+        # Escritura atómica: nunca dejar un índice a medias junto al modelo
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, centroids=self.centroids, offsets=self.offsets,
+                     members=self.members, num_projections=self.num_projections,
+                     fingerprint=-1 if self.fingerprint is None else self.fingerprint)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, nprobe=DEFAULT_NPROBE):
+        with np.load(path) as data:
+            # Índices anteriores a la huella: fingerprint None (no coinciden)
+            fingerprint = int(data["fingerprint"]) if "fingerprint" in data.files else -1
+            return cls(data["centroids"], data["offsets"], data["members"],
+                       int(data["num_projections"]), nprobe, None if fingerprint < 0 else fingerprint)
+
+    def matches(self, projection_sq, labels):
+        # ¿Se construyó sobre esta galería?
+        return (self.fingerprint is not None and self.num_projections == len(projection_sq)
+                and self.fingerprint == gallery_fingerprint(projection_sq, labels))
+
+    def candidates(self, queries):
+        # Para cada consulta, índices de la galería a refinar
+        queries = np.asarray(queries, dtype=np.float32)
+        n_clusters = len(self.centroids)
+        if n_clusters <= self.nprobe:
+            return [self.members] * len(queries)
+        query_sq = np.einsum("ij,ij->i", queries, queries)
+        d2 = query_sq[:, None] + self._centroid_sq[None, :] - 2.0 * (queries @ self.centroids.T)
+        probes = np.argpartition(d2, self.nprobe - 1, axis=1)[:, :self.nprobe]
+        return [
+            np.concatenate([self.members[self.offsets[c]:self.offsets[c + 1]] for c in row])
+            for row in probes
+        ]
+
+
+def measure_recall(engine, queries):
+    # Compara la búsqueda indexada con la exhaustiva sobre las mismas consultas
+    started = perf_counter()
+    exact_labels, exact_dist = engine.nearest(queries, exact=True)
+    exact_time = perf_counter() - started
+    started = perf_counter()
+    approx_labels, approx_dist = engine.nearest(queries, exact=False)
+    approx_time = perf_counter() - started
+    return {
+        "queries": len(queries),
+        "label_recall": float(np.mean(exact_labels == approx_labels)),
+        "nn_recall": float(np.mean(np.isclose(exact_dist, approx_dist))),
+        "exact_ms": exact_time * 1000,
+        "index_ms": approx_time * 1000,
+    }
+
+
+def main(argv=None):
+    from eigen import EigenFaceEngine
+    from modelfile import resolve_model_path
+    from vision import MODEL_PATH
+
+    parser = argparse.ArgumentParser(description="Construye o evalúa el índice de galería")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--build", action="store_true", help="(re)construir el índice junto al modelo")
+    parser.add_argument("--recall", action="store_true", help="comparar recall contra búsqueda exacta")
+    parser.add_argument("--nprobe", type=int, default=DEFAULT_NPROBE)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--noise", type=float, default=0.05, help="ruido relativo añadido a las consultas")
+    args = parser.parse_args(argv)
+
+    engine = EigenFaceEngine.load(resolve_model_path(args.model), use_index=False)
+    path = index_path_for(args.model)
+    stale = not os.path.isfile(path) or not GalleryIndex.load(path).matches(engine._projection_sq, engine.labels)
+    if args.build or stale:
+        GalleryIndex.build(engine.projections, engine.labels, nprobe=args.nprobe).save(path)
+        print(f"Índice guardado en {path}")
+    if args.recall:
+        engine.index = GalleryIndex.load(path, nprobe=args.nprobe)
+        # Consultas: proyecciones de la galería perturbadas con ruido gaussiano
+        rng = np.random.default_rng(0)
+        picks = rng.choice(len(engine.projections), size=min(args.queries, len(engine.projections)), replace=False)
+        queries = engine.projections[picks]
+        scale = args.noise * np.linalg.norm(queries, axis=1, keepdims=True) / np.sqrt(queries.shape[1])
+        queries = queries + rng.normal(size=queries.shape).astype(np.float32) * scale
+        stats = measure_recall(engine, queries)
+        print(f"Consultas: {stats['queries']}  nprobe: {args.nprobe}")
+        print(f"Recall etiqueta: {stats['label_recall']:.4f}  Recall vecino exacto: {stats['nn_recall']:.4f}")
+        print(f"Exacta: {stats['exact_ms']:.1f} ms  Índice: {stats['index_ms']:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
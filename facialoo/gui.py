@@ -1,21 +1,22 @@
-import cv2 as cv
 import os
 import threading
 import tkinter as tk
 from tkinter import messagebox
 
 import customtkinter as ctk
-import imutils
-import numpy as np
-from PIL import Image, ImageTk
 
-# --- Rutas basadas en la ubicación de este archivo ---
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DATA_DIR = os.path.join(BASE_DIR, "Data")
-MODEL_PATH = os.path.join(BASE_DIR, "EntrenamientoEigenFaceRecognizer.xml")
+from config import load_config
+from metrics import Metrics, draw_overlay, start_exporters
+from startup import DATA_DIR, load_recognition, load_vision
 
-# Haarcascade portátil (incluido con opencv)
-CASCADE_PATH = cv.data.haarcascades + "haarcascade_frontalface_default.xml"
+# OpenCV, NumPy, PIL y los módulos que dependen de ellos se importan dentro
+# de los métodos: la ventana se muestra primero y el prewarm (startup.py)
+# los carga en segundo plano
+
+# Configuración compartida con los scripts (facialoo.json + variables FACIALOO_*)
+CONFIG = load_config()
+# Tiempos por etapa de todos los bucles de la GUI (overlay y exportación)
+METRICS = Metrics()
 
 # Estados
 IDLE = "IDLE"
@@ -54,8 +55,21 @@ class FacialRecognitionApp(ctk.CTk):
         self.state_mode = IDLE
         self.cap = None
         self.running = False
+        self.capture_thread = None
+        self.worker = None
+        self.scheduler = None
         self.capture_count = 0
-        self.face_cascade = cv.CascadeClassifier(CASCADE_PATH)
+        # Entrenamiento en segundo plano (compatible con detectar/reconocer)
+        self.training = False
+        self.pipeline = None
+        # Prewarm: cascade (capturar/detectar) y modelo (reconocer) se cargan
+        # en segundo plano; los botones se habilitan según estén listos
+        self.face_cascade = None
+        self.renderer = None
+        self.model_path = None
+        self.model_loading = True
+        self.preloaded = None
+        self.exporters = start_exporters(METRICS, CONFIG)
 
         # Configurar Grid principal (1x2: Sidebar | Main)
         self.grid_columnconfigure(1, weight=1)
@@ -63,6 +77,47 @@ class FacialRecognitionApp(ctk.CTk):
 
         self._build_ui()
         self._update_buttons()
+        # Cerrar la ventana libera la cámara y detiene los exportadores
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+        threading.Thread(target=self._prewarm, daemon=True).start()
+
+    # ------------------------------------------------------------- Prewarm
+    def _prewarm(self):
+        try:
+            cascade = load_vision(METRICS)
+        except Exception as e:
+            self.after(0, self._on_prewarm_error, str(e))
+            return
+        from backends import model_path_for
+
+        self.after(0, self._on_vision_ready, cascade, model_path_for(CONFIG.backend))
+        try:
+            loaded = load_recognition(CONFIG, data_dir=DATA_DIR, mmap=os.name != "nt", metrics=METRICS)
+        except Exception:
+            # Un modelo ilegible se notifica al pulsar Reconocer, como antes
+            loaded = None
+        self.after(0, self._on_model_ready, loaded)
+
+    def _on_vision_ready(self, cascade, model_path):
+        from display import FrameRenderer
+
+        # Visor con buffers y PhotoImage persistentes; el tamaño se cachea
+        self.renderer = FrameRenderer(self.video_label, self._blank, CONFIG.display_fps)
+        self.renderer.set_viewport(self.video_inner.winfo_width(), self.video_inner.winfo_height())
+        self.video_inner.bind("<Configure>", self.renderer.on_configure)
+        self.face_cascade = cascade
+        self.model_path = model_path
+        self._update_buttons()
+
+    def _on_model_ready(self, loaded):
+        self.model_loading = False
+        self.preloaded = loaded
+        self._update_buttons()
+
+    def _on_prewarm_error(self, error):
+        self.model_loading = False
+        self._set_status("ERROR AL INICIAR")
+        messagebox.showerror("Error de Inicio", error)
 
     # ------------------------------------------------------------------ UI
     def _build_ui(self):
@@ -208,12 +263,21 @@ class FacialRecognitionApp(ctk.CTk):
 
     def _update_buttons(self):
         idle = self.state_mode == IDLE
+        ready = self.face_cascade is not None
         normal = "normal"
         disabled = "disabled"
         
         # Habilitar/Deshabilitar botones sidebar
-        for btn in [self.btn_capture, self.btn_train, self.btn_detect, self.btn_recognize]:
-            btn.configure(state=normal if idle else disabled)
+        for btn in [self.btn_capture, self.btn_detect]:
+            btn.configure(state=normal if idle and ready and not self.training else disabled)
+        can_recognize = idle and ready and not self.training and not self.model_loading
+        self.btn_recognize.configure(state=normal if can_recognize else disabled)
+        # Se puede entrenar con la cámara en marcha: el modelo nuevo se
+        # cambia en caliente al terminar (no durante la carga del prewarm,
+        # que podría quedarse con el modelo anterior)
+        can_train = (idle or self.state_mode in (DETECT, RECOGNIZE)) and ready and not self.model_loading \
+            and not self.training
+        self.btn_train.configure(state=normal if can_train else disabled)
         
         # Botón Stop
         self.btn_stop.configure(state=normal if not idle else disabled, fg_color=DANGER if not idle else BG_CARD)
@@ -227,6 +291,12 @@ class FacialRecognitionApp(ctk.CTk):
             TRAINING: ("ENTRENANDO IA...", "TRAINING", "#9C27B0"),
         }
         status_text, badge_text, badge_color = badge_map.get(self.state_mode, ("DESCONOCIDO", "ERROR", DANGER))
+        if not ready:
+            status_text, badge_text = "INICIANDO: CARGANDO MOTOR DE VISIÓN...", "LOADING"
+        elif self.model_loading and idle:
+            status_text += "  ·  CARGANDO MODELO"
+        if self.training and self.state_mode != TRAINING:
+            status_text += "  ·  ENTRENANDO EN SEGUNDO PLANO"
         
         self.status_label_header.configure(text=status_text)
         self.mode_badge.configure(text=badge_text, fg_color=badge_color)
@@ -237,7 +307,9 @@ class FacialRecognitionApp(ctk.CTk):
 
     # -------------------------------------------------------------- Camera
     def _open_camera(self):
-        self.cap = cv.VideoCapture(0)
+        from sources import open_source
+
+        self.cap = open_source(CONFIG.source)
         if not self.cap.isOpened():
             messagebox.showerror("Error de Cámara", "No se pudo acceder a la webcam.\nVerifique la conexión.")
             return False
@@ -246,39 +318,67 @@ class FacialRecognitionApp(ctk.CTk):
 
     def _release_camera(self):
         self.running = False
+        self._stop_stream()
         if self.cap is not None:
             self.cap.release()
             self.cap = None
 
-    # ------------------------------------------------------- Video refresh
-    def _show_frame(self, frame):
-        # Resize inteligente para ajustar al contenedor sin perder aspect ratio
-        viewport_width = self.video_inner.winfo_width()
-        viewport_height = self.video_inner.winfo_height()
-        
-        if viewport_width < 10 or viewport_height < 10:
-             viewport_width, viewport_height = 640, 480 # Fallback
+    # ------------------------------------------------------------- Stream
+    def _start_stream(self, process):
+        from stream import AdaptiveScheduler, CaptureThread, FrameRing, ProcessingWorker
+
+        # Cámara y procesamiento corren fuera del hilo de Tk; la UI solo
+        # recoge el último resultado disponible.
+        ring = FrameRing(capacity=2)
+        self.scheduler = AdaptiveScheduler()
+        self.capture_thread = CaptureThread(self.cap, ring, METRICS)
+        self.worker = ProcessingWorker(ring, process, self.scheduler)
+        self.capture_thread.start()
+        self.worker.start()
+        self._stream_tick()
+
+    def _stream_tick(self):
+        if not self.running or self.worker is None:
+            return
+        # Solo se recoge resultado cuando toca refrescar; si no, el worker
+        # lo sustituye por uno más reciente mientras tanto
+        frame = self.worker.take_result() if self.renderer.wait_ms() == 0 else None
+        if frame is not None:
+            self._show_frame(frame)
+        elif not self.worker.is_alive():
+            error = self.worker.error
+            self._stop()
+            if error is not None:
+                messagebox.showerror("Error de Procesamiento", str(error))
+            return
+        self.after(max(self.scheduler.next_delay(), self.renderer.wait_ms()), self._stream_tick)
+
+    def _stop_stream(self):
+        # Detener hilos antes de liberar la cámara para no leer de un cap cerrado
+        for thread in (self.capture_thread, self.worker):
+            if thread is not None:
+                thread.stop()
+        if self.capture_thread is not None:
+            self.capture_thread.ring.close()
+            self.capture_thread.join(timeout=1.0)
+        if self.worker is not None:
+            self.worker.join(timeout=1.0)
+        self.capture_thread = None
+        self.worker = None
 
-        h, w = frame.shape[:2]
-        
-        # Calcular escala manteniendo aspect ratio
-        scale = min(viewport_width/w, viewport_height/h)
-        new_w, new_h = int(w * scale), int(h * scale)
-        
-        resized = cv.resize(frame, (new_w, new_h))
-        frame_rgb = cv.cvtColor(resized, cv.COLOR_BGR2RGB)
-        
-        img = Image.fromarray(frame_rgb)
-        imgtk = ImageTk.PhotoImage(image=img)
-        self.video_label.imgtk = imgtk
-        self.video_label.config(image=imgtk)
+    # ------------------------------------------------------- Video refresh
+    def _show_frame(self, frame, force=False):
+        with METRICS.time("display"):
+            return self.renderer.show(frame, force)
 
     def _clear_video(self):
-        self.video_label.config(image=self._blank)
-        self.video_label.imgtk = None
+        self.renderer.clear()
 
     # ------------------------------------------------------------ Capture
     def _start_capture(self):
+        from capture_writer import BackgroundWriter, DiversityFilter
+        from facestore import FaceStore
+
         name = self.name_entry.get().strip()
         if not name:
             messagebox.showwarning("Falta Información", "Por favor ingrese un nombre para el usuario.")
@@ -286,10 +386,17 @@ class FacialRecognitionApp(ctk.CTk):
 
         person_dir = os.path.join(DATA_DIR, name)
         os.makedirs(person_dir, exist_ok=True)
-
         if not self._open_camera():
             return
 
+        # Una nueva captura sustituye a la anterior de la misma persona. Los
+        # ROIs pasan un filtro de diversidad y se escriben en segundo plano.
+        face_store = FaceStore(person_dir)
+        face_store.reset()
+        self.capture_filter = DiversityFilter(CONFIG.capture_min_sharpness, CONFIG.capture_min_hash_distance)
+        self.capture_writer = BackgroundWriter(face_store)
+        self.capture_writer.start()
+
         self.state_mode = CAPTURE
         self.capture_count = 0
         self._update_buttons()
@@ -302,19 +409,23 @@ class FacialRecognitionApp(ctk.CTk):
         threading.Thread(target=self._capture_loop, args=(person_dir,), daemon=True).start()
 
     def _capture_loop(self, person_dir):
+        import cv2 as cv
+        from detector import AdaptiveDetector
+        from vision import crop_face, prepare_frame
+
+        detector = AdaptiveDetector(self.face_cascade, CONFIG)
         # Frame delay para suavidad vs rendimiento
-        while self.running and self.capture_count < MAX_CAPTURES:
-            ret, frame = self.cap.read()
+        # Un error de escritura termina la captura: no se podría completar
+        while self.running and self.capture_count < MAX_CAPTURES and self.capture_writer.error is None:
+            with METRICS.time("read"):
+                ret, frame = self.cap.read()
             if not ret:
                 break
             
-            # Espejo (opcional, suele ser más natural)
-            frame = cv.flip(frame, 1)
-
-            # Proceso de detección
-            small_frame = imutils.resize(frame, width=640)
-            gray = cv.cvtColor(small_frame, cv.COLOR_BGR2GRAY)
-            faces = self.face_cascade.detectMultiScale(gray, 1.3, 5)
+            # Espejo (opcional, suele ser más natural) y detección
+            small_frame, gray = prepare_frame(frame, CONFIG.capture_width, metrics=METRICS)
+            with METRICS.time("detect"):
+                faces = detector(gray)
 
             # Dibujar en frame original (escalado)
             # Nota: Si redimensionamos `frame` para visualización en _show_frame, 
@@ -330,29 +441,38 @@ class FacialRecognitionApp(ctk.CTk):
                 # Visual feedback
                 cv.rectangle(display_frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
                 
-                # Guardar ROI
-                roi = gray[y:y + h, x:x + w]
-                roi = cv.resize(roi, (160, 160), interpolation=cv.INTER_CUBIC)
-                cv.imwrite(os.path.join(person_dir, f"imagen_{self.capture_count}.jpg"), roi)
-                
-                self.capture_count += 1
-                progress = self.capture_count / MAX_CAPTURES
-                self.after(0, self._update_capture_progress, progress)
+                # Guardar ROI (solo si aporta algo nuevo; el disco no bloquea)
+                roi = crop_face(gray, (x, y, w, h))
+                digest = self.capture_filter.check(roi)
+                if digest is not None and self.capture_writer.put(roi):
+                    self.capture_filter.remember(digest)
+                    self.capture_count += 1
 
-            self.after(0, self._show_frame, display_frame)
+            # Un único callback por frame para no saturar la cola de eventos de Tk
+            self.after(0, self._on_capture_frame, display_frame, self.capture_count / MAX_CAPTURES)
 
         self.after(0, self._on_capture_done)
 
-    def _update_capture_progress(self, progress):
+    def _on_capture_frame(self, display_frame, progress):
         self.progress_bar.set(progress)
-        
+        self._show_frame(display_frame)
+
     def _on_capture_done(self):
         self._release_camera()
         self._clear_video()
+        self.capture_writer.close()
         self.state_mode = IDLE
         self._update_buttons()
         self.progress_bar.grid_remove()
-        messagebox.showinfo("Captura Finalizada", f"Se han guardado {self.capture_count} imágenes para '{self.name_entry.get()}'.")
+        if self.capture_writer.error is not None:
+            messagebox.showerror("Error de Captura", str(self.capture_writer.error))
+            return
+        skipped = self.capture_filter.rejected_blur + self.capture_filter.rejected_duplicate
+        messagebox.showinfo(
+            "Captura Finalizada",
+            f"Se han guardado {self.capture_writer.written} imágenes para '{self.name_entry.get()}'.\n"
+            f"Descartadas por borrosas o repetidas: {skipped}.",
+        )
 
     # ----------------------------------------------------------- Train
     def _start_training(self):
@@ -360,189 +480,122 @@ class FacialRecognitionApp(ctk.CTk):
             messagebox.showwarning("Sin Datos", "No hay rostros capturados para entrenar.")
             return
 
-        self.state_mode = TRAINING
+        # Con la cámara en marcha se entrena sin cambiar de modo
+        live = self.state_mode != IDLE
+        self.training = True
+        if not live:
+            self.state_mode = TRAINING
         self._update_buttons()
         
         self.progress_bar.set(0)
         self.progress_bar.grid()
-        self._train_pulse()
 
-        threading.Thread(target=self._train_model, daemon=True).start()
+        threading.Thread(target=self._train_model, args=(live,), daemon=True).start()
 
-    def _train_pulse(self):
-        if self.state_mode != TRAINING:
-            return
-        cur = self.progress_bar.get()
-        nxt = cur + 0.02 if cur < 0.95 else 0.0
-        self.progress_bar.set(nxt)
-        self.after(50, self._train_pulse)
+    def _train_progress(self, done, total):
+        # Llamado desde los hilos de carga: la lectura ocupa el 90% de la
+        # barra, el resto corresponde al ajuste del modelo
+        self.after(0, self.progress_bar.set, 0.9 * done / total)
+
+    def _train_model(self, live):
+        from training import train_incremental
 
-    def _train_model(self):
         try:
-            ids = []
-            faces = []
-            label = 0
-            
-            # Obtener lista de carpetas válidas
-            people = sorted([p for p in os.listdir(DATA_DIR) if os.path.isdir(os.path.join(DATA_DIR, p))])
-            
-            if not people:
-                raise ValueError("Directorio Data vacío o sin carpetas válidas.")
-
-            for person_name in people:
-                person_path = os.path.join(DATA_DIR, person_name)
-                for filename in os.listdir(person_path):
-                    img_path = os.path.join(person_path, filename)
-                    try:
-                        img = cv.imread(img_path, 0)
-                        if img is not None:
-                            faces.append(img)
-                            ids.append(label)
-                    except Exception:
-                        pass
-                label += 1
-
-            if not faces:
-                raise ValueError("No se encontraron imágenes válidas para entrenar.")
-
-            recognizer = cv.face.EigenFaceRecognizer_create()
-            recognizer.train(faces, np.array(ids))
-            recognizer.write(MODEL_PATH)
-            self.after(0, self._on_train_done, None)
-            
+            # Incremental: solo se proyectan las personas nuevas sobre la base
+            # actual; si no es posible se reentrena todo automáticamente. Con
+            # la cámara en marcha se deja la mitad de los núcleos al vídeo.
+            workers = max(1, (os.cpu_count() or 2) // 2) if live else None
+            result = train_incremental(DATA_DIR, self.model_path, workers=workers, progress=self._train_progress,
+                                       metrics=METRICS, trainer=CONFIG.trainer,
+                                       components=CONFIG.pca_components, chunk_size=CONFIG.pca_chunk,
+                                       backend=CONFIG.backend)
+            # El modelo nuevo se carga aquí, fuera del hilo de Tk y sin parar
+            # el reconocimiento; la GUI solo lo intercambia
+            model = None
+            if result["mode"] != "unchanged" and self.state_mode == RECOGNIZE:
+                model = self._load_model()
+            self.after(0, self._on_train_done, None, result, model)
+
         except Exception as e:
             self.after(0, self._on_train_done, str(e))
 
-    def _on_train_done(self, error):
-        self.state_mode = IDLE
+    def _on_train_done(self, error, result=None, model=None):
+        self.training = False
+        if not error and result["mode"] != "unchanged":
+            # El modelo precargado en el arranque ya no es el actual
+            self.preloaded = None
+        if self.state_mode == TRAINING:
+            self.state_mode = IDLE
         self._update_buttons()
         self.progress_bar.grid_remove()
         if error:
             messagebox.showerror("Error de Entrenamiento", error)
+        elif model is not None and self.state_mode == RECOGNIZE and self.pipeline is not None:
+            # Cambio en caliente: el worker lo aplica entre dos frames
+            self.recognizer, self.label_names = model
+            self.pipeline.swap_model(self.recognizer, self.label_names)
+            self._set_status(f"MODELO ACTUALIZADO: {len(self.label_names)} PERSONAS")
+        elif result["mode"] == "unchanged":
+            messagebox.showinfo("Éxito", "El modelo ya estaba actualizado.")
+        elif result["mode"] == "incremental":
+            messagebox.showinfo("Éxito", f"Modelo actualizado con: {', '.join(result['added'])}.")
         else:
             messagebox.showinfo("Éxito", "Modelo entrenado correctamente.")
 
     # ----------------------------------------------------------- Detect
     def _start_detect(self):
+        from pipeline import FacePipeline
+
         if not self._open_camera():
             return
         self.state_mode = DETECT
         self._update_buttons()
-        self._detect_tick()
-
-    def _detect_tick(self):
-        if not self.running:
-            return
-        ret, frame = self.cap.read()
-        if not ret:
-            self._stop()
-            return
-
-        frame = cv.flip(frame, 1)
-        frame = imutils.resize(frame, width=800) # Un poco más resolución para display
-        gray = cv.cvtColor(frame, cv.COLOR_BGR2GRAY)
-        
-        # Detección
-        faces = self.face_cascade.detectMultiScale(gray, 1.3, 5)
-        
-        for (x, y, w, h) in faces:
-            # Diseño de caja más elegante
-            color = (0, 255, 0) # BGR
-            # Esquinas redondeadas simuladas (líneas cortas en esquinas)
-            l = 30 # longitud de esquina
-            t = 2 # grosor
-            
-            # Top-Left
-            cv.line(frame, (x, y), (x + l, y), color, t)
-            cv.line(frame, (x, y), (x, y + l), color, t)
-            # Top-Right
-            cv.line(frame, (x + w, y), (x + w - l, y), color, t)
-            cv.line(frame, (x + w, y), (x + w, y + l), color, t)
-            # Bottom-Left
-            cv.line(frame, (x, y + h), (x + l, y + h), color, t)
-            cv.line(frame, (x, y + h), (x, y + h - l), color, t)
-            # Bottom-Right
-            cv.line(frame, (x + w, y + h), (x + w - l, y + h), color, t)
-            cv.line(frame, (x + w, y + h), (x + w, y + h - l), color, t)
-
-        self._show_frame(frame)
-        self.after(30, self._detect_tick)
+        self.pipeline = FacePipeline(CONFIG, self.face_cascade, metrics=METRICS)
+        self._start_stream(self._process_frame)
+
+    def _process_frame(self, frame):
+        # Se ejecuta en el ProcessingWorker: no tocar widgets aquí.
+        # Detección (cada CONFIG.detect_every frames) + seguimiento y, en modo
+        # reconocer, predicción con caché por track
+        frame, _ = self.pipeline.process(frame)
+        if CONFIG.metrics_overlay:
+            draw_overlay(frame, METRICS)
+        return frame
 
     # --------------------------------------------------------- Recognize
     def _start_recognize(self):
-        if not os.path.isfile(MODEL_PATH):
-            messagebox.showwarning("Modelo Faltante", "No se encontró el archivo de entrenamiento.\nPor favor entrene el modelo primero.")
-            return
+        from modelfile import model_exists
+        from pipeline import FacePipeline
 
-        if not os.path.exists(DATA_DIR):
-            messagebox.showwarning("Datos Faltantes", "No existe el directorio de datos.")
+        if not model_exists(self.model_path):
+            messagebox.showwarning("Modelo Faltante", "No se encontró el archivo de entrenamiento.\nPor favor entrene el modelo primero.")
             return
 
-        # Cargar etiquetas y modelo
-        self.label_names = sorted(
-            [d for d in os.listdir(DATA_DIR) if os.path.isdir(os.path.join(DATA_DIR, d))]
-        )
+        # Modelo y etiquetas del prewarm si siguen al día; si no, se cargan ahora
         try:
-            self.recognizer = cv.face.EigenFaceRecognizer_create()
-            self.recognizer.read(MODEL_PATH)
+            self.recognizer, self.label_names = self.preloaded or self._load_model()
         except Exception as e:
             messagebox.showerror("Error al leer modelo", str(e))
             return
+        if not self.label_names:
+            messagebox.showwarning("Datos Faltantes", "No existe el directorio de datos.")
+            return
 
         if not self._open_camera():
             return
 
         self.state_mode = RECOGNIZE
         self._update_buttons()
-        self._recognize_tick()
-
-    def _recognize_tick(self):
-        if not self.running:
-            return
-        ret, frame = self.cap.read()
-        if not ret:
-            self._stop()
-            return
-        
-        frame = cv.flip(frame, 1)
-        frame = imutils.resize(frame, width=800)
-        gray = cv.cvtColor(frame, cv.COLOR_BGR2GRAY)
-        
-        faces = self.face_cascade.detectMultiScale(gray, 1.3, 5)
+        self.pipeline = FacePipeline(CONFIG, self.face_cascade, self.recognizer, self.label_names, METRICS)
+        self._start_stream(self._process_frame)
 
-        for (x, y, w, h) in faces:
-            roi = gray[y:y + h, x:x + w]
-            roi = cv.resize(roi, (160, 160), interpolation=cv.INTER_CUBIC)
-            
-            # Predicción
-            label_id, confidence = self.recognizer.predict(roi)
-            
-            # Lógica de confianza (EigenFaces: menor es mejor match, usualmente < 5000-8000)
-            # Ajustar umbral según necesidad
-            threshold = 8000 # Umbral empírico
-            
-            if confidence < threshold:
-                name = self.label_names[label_id] if label_id < len(self.label_names) else "Unknown"
-                color = (0, 255, 0)
-                status_text = f"{name}"
-            else:
-                name = "Desconocido"
-                color = (0, 0, 255) # Rojo
-                status_text = "Desconocido"
-            
-            # Dibujar caja
-            cv.rectangle(frame, (x, y), (x + w, y + h), color, 2)
-            
-            # Dibujar etiqueta con fondo
-            (text_w, text_h), _ = cv.getTextSize(status_text, cv.FONT_HERSHEY_SIMPLEX, 0.8, 2)
-            cv.rectangle(frame, (x, y - 30), (x + text_w, y), color, -1)
-            cv.putText(frame, status_text, (x, y - 6), cv.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
-            
-            # Info técnica (opcional)
-            # cv.putText(frame, f"Conf: {int(confidence)}", (x, y + h + 20), cv.FONT_HERSHEY_SIMPLEX, 0.6, color, 1)
+    def _load_model(self):
+        # Binario memory-mapped si existe: arranque casi inmediato. En Windows
+        # un fichero mapeado no se puede reemplazar, así que se lee a RAM para
+        # que un entrenamiento en segundo plano pueda reescribirlo.
+        from backends import load_model
 
-        self._show_frame(frame)
-        self.after(30, self._recognize_tick)
+        return load_model(CONFIG, self.model_path, DATA_DIR, mmap=os.name != "nt")
 
     # ------------------------------------------------------------- Stop
     def _stop(self):
@@ -550,11 +603,14 @@ class FacialRecognitionApp(ctk.CTk):
         self._clear_video()
         self.state_mode = IDLE
         self._update_buttons()
-        self.progress_bar.grid_remove()
+        if not self.training:
+            self.progress_bar.grid_remove()
 
     # --------------------------------------------------------------- Close
     def _on_close(self):
         self._release_camera()
+        for exporter in self.exporters:
+            exporter.close()
         self.destroy()
 
 if __name__ == "__main__":
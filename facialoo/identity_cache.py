@@ -0,0 +1,111 @@
+import time
+from collections import OrderedDict, deque
+
+import cv2 as cv
+import numpy as np
+
+# Lado de la miniatura usada como firma de apariencia del track
+SIGNATURE_SIDE = 16
+
+
+class _Entry:
+    def __init__(self, signature, now, window):
+        self.signature = signature
+        self.predicted_at = now
+        self.last_seen = now
+        self.votes = deque(maxlen=window)
+
+
+class TrackIdentityCache:
+    # Caché de identidad por track. Solo se vuelve a llamar a predict() si el
+    # track es nuevo, si su entrada caducó (`ttl`) o si su apariencia cambió
+    # (diferencia media de la miniatura > `change_threshold`). La identidad
+    # mostrada sale de una votación sobre las últimas `window` predicciones,
+    # así la etiqueta no parpadea con un solo frame dudoso. Expulsión LRU
+    # cuando se supera `capacity`.
+    def __init__(self, capacity=64, ttl=2.0, change_threshold=12.0, window=7, clock=time.monotonic):
+        self.capacity = capacity
+        self.ttl = ttl
+        self.change_threshold = change_threshold
+        self.window = window
+        self.clock = clock
+        self.predictions = 0
+        self.lookups = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def signature(roi):
+        return cv.resize(roi, (SIGNATURE_SIDE, SIGNATURE_SIDE), interpolation=cv.INTER_AREA).astype(np.int16)
+
+    def needs_predict(self, track_id, signature, now):
+        entry = self._entries.get(track_id)
+        if entry is None or now - entry.predicted_at > self.ttl:
+            return True
+        return float(np.mean(np.abs(signature - entry.signature))) > self.change_threshold
+
+    def update(self, track_id, signature, label_id, distance, now):
+        entry = self._entries.get(track_id)
+        if entry is None:
+            entry = self._entries[track_id] = _Entry(signature, now, self.window)
+        entry.signature = signature
+        entry.predicted_at = now
+        entry.votes.append((int(label_id), float(distance)))
+
+    def vote(self, track_id, threshold):
+        # -> (label_id | None, distancia suavizada)
+        entry = self._entries[track_id]
+        tally = {}
+        for label_id, distance in entry.votes:
+            key = label_id if distance < threshold else None
+            tally.setdefault(key, []).append(distance)
+        # Más votos gana; a igualdad, menor distancia media
+        winner, distances = min(tally.items(), key=lambda item: (-len(item[1]), np.mean(item[1])))
+        return winner, float(np.mean(distances))
+
+    def _touch(self, track_id, now):
+        entry = self._entries.get(track_id)
+        if entry is not None:
+            entry.last_seen = now
+            self._entries.move_to_end(track_id)
+
+    def expire(self, now=None):
+        now = self.clock() if now is None else now
+        stale = [tid for tid, e in self._entries.items() if now - e.last_seen > self.ttl]
+        for track_id in stale:
+            del self._entries[track_id]
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    def identify(self, engine, track_ids, rois, label_names, threshold):
+        # Igual que vision.identify_faces pero reutilizando la caché: solo se
+        # predicen (en lote) los tracks que lo necesitan.
+        now = self.clock()
+        self.lookups += len(track_ids)
+        signatures = [self.signature(roi) for roi in rois]
+        pending = [i for i, tid in enumerate(track_ids) if self.needs_predict(tid, signatures[i], now)]
+        if pending:
+            label_ids, distances = engine.predict_batch([rois[i] for i in pending])
+            self.predictions += len(pending)
+            for i, label_id, distance in zip(pending, label_ids, distances):
+                self.update(track_ids[i], signatures[i], label_id, distance, now)
+
+        results = []
+        for track_id in track_ids:
+            self._touch(track_id, now)
+            label_id, distance = self.vote(track_id, threshold)
+            if label_id is not None and 0 <= label_id < len(label_names):
+                results.append((label_names[label_id], distance))
+            else:
+                results.append((None, distance))
+        self.expire(now)
+        return results
+
+
+def new_identity_cache(config):
+    if not config.identity_cache:
+        return None
+    return TrackIdentityCache(config.identity_capacity, config.identity_ttl,
+                              config.identity_change, config.identity_window)
@@ -0,0 +1,128 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import urllib.request
+
+import cv2 as cv
+import numpy as np
+
+from sources import IMAGE_EXTENSIONS
+
+
+def load_payloads(paths, limit=64):
+    # JPEGs a enviar: ficheros sueltos o imágenes de directorios (Data/<persona>)
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.extend(os.path.join(root, n) for n in sorted(names) if n.lower().endswith(IMAGE_EXTENSIONS))
+        else:
+            files.append(path)
+    payloads = []
+    for path in files[:limit]:
+        with open(path, "rb") as f:
+            payloads.append(f.read())
+    return payloads
+
+
+def synthetic_payloads(count=16, seed=0):
+    # Recortes de ruido: sirven para medir throughput sin datos reales
+    rng = np.random.default_rng(seed)
+    return [cv.imencode(".jpg", rng.integers(0, 256, (160, 160), dtype=np.uint8))[1].tobytes()
+            for _ in range(count)]
+
+
+def _post(url, body):
+    request = urllib.request.Request(url, data=body, headers={"Content-Type": "image/jpeg"})
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return json.loads(response.read())
+
+
+def run_load(url, payloads, requests=500, concurrency=16):
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    counter = iter(range(requests))
+
+    def client():
+        while True:
+            with lock:
+                index = next(counter, None)
+            if index is None:
+                return
+            started = time.perf_counter()
+            try:
+                _post(url, payloads[index % len(payloads)])
+            except Exception as e:
+                with lock:
+                    errors.append(str(e))
+                continue
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    total = time.perf_counter() - started
+
+    samples = np.asarray(latencies or [0.0]) * 1000
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "concurrency": concurrency,
+        "rps": len(latencies) / total if total else 0.0,
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+        "first_error": errors[0] if errors else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prueba de carga del servicio de reconocimiento")
+    parser.add_argument("images", nargs="*", help="JPEGs o directorios a enviar (por defecto recortes sintéticos)")
+    parser.add_argument("--url", default="http://127.0.0.1:8750")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16],
+                        help="clientes simultáneos (varios valores = varias rondas)")
+    parser.add_argument("--crop", action="store_true", help="las imágenes ya son recortes de rostro")
+    parser.add_argument("--json", help="guardar resultados en este fichero")
+    args = parser.parse_args(argv)
+
+    payloads = load_payloads(args.images) if args.images else synthetic_payloads()
+    if not payloads:
+        print("No hay imágenes que enviar", file=sys.stderr)
+        return 2
+    # Los recortes sintéticos no pasan por el detector
+    crop = args.crop or not args.images
+    endpoint = args.url.rstrip("/") + "/recognize" + ("?crop=1" if crop else "")
+
+    results = []
+    for concurrency in args.concurrency:
+        stats = run_load(endpoint, payloads, args.requests, concurrency)
+        results.append(stats)
+        print(f"clientes: {concurrency:>3}  peticiones/s: {stats['rps']:.1f}  "
+              f"p50: {stats['p50_ms']:.2f}  p95: {stats['p95_ms']:.2f}  p99: {stats['p99_ms']:.2f} ms"
+              f"  errores: {stats['errors']}")
+        if stats["first_error"]:
+            print(f"    {stats['first_error']}", file=sys.stderr)
+    with urllib.request.urlopen(args.url.rstrip("/") + "/health", timeout=5) as response:
+        health = json.loads(response.read())
+    print(f"Servidor: {health['batches']} lotes, {health['mean_batch']:.1f} rostros por lote de media")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"rounds": results, "server": health}, f, indent=2)
+    return 1 if any(r["errors"] for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from facestore import PACK_NAME, FaceStore
+from modelfile import resolve_model_path
+from sources import IMAGE_EXTENSIONS
+
+# Manifiesto de entrenamiento junto al modelo: mapa etiqueta -> nombre,
+# tamaño, mtime y hash de cada fichero de Data/ usado y parámetros. La huella
+# del dataset (hash de todo ello) permite saltarse un entrenamiento cuando
+# nada ha cambiado. Los hashes se reutilizan si tamaño y mtime coinciden con
+# el manifiesto anterior, así que comprobar cuesta un stat() por fichero.
+MANIFEST_SUFFIX = ".manifest.json"
+VERSION = 1
+HASH_BLOCK = 1 << 20
+
+
+def manifest_path_for(model_path):
+    return os.path.splitext(model_path)[0] + MANIFEST_SUFFIX
+
+
+def _person_files(person_dir):
+    # Los mismos ficheros que lee load_dataset: el pack o los JPEG sueltos
+    if FaceStore.exists(person_dir):
+        return [PACK_NAME]
+    return sorted(f for f in os.listdir(person_dir) if f.lower().endswith(IMAGE_EXTENSIONS))
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def scan_dataset(data_dir, people, previous=None, workers=None):
+    # -> {"persona/fichero": {"size", "mtime_ns", "sha256"}}. Solo se leen
+    # los ficheros nuevos o cuyo tamaño/mtime no coincide con `previous`.
+    known = previous["files"] if previous else {}
+    files = {}
+    pending = []
+    for person in people:
+        person_dir = os.path.join(data_dir, person)
+        for name in _person_files(person_dir):
+            stat = os.stat(os.path.join(person_dir, name))
+            key = f"{person}/{name}"
+            entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+            old = known.get(key)
+            if old and old["size"] == entry["size"] and old["mtime_ns"] == entry["mtime_ns"]:
+                entry["sha256"] = old["sha256"]
+            else:
+                pending.append(key)
+            files[key] = entry
+    if pending:
+        # hashlib suelta el GIL con bloques grandes: los hilos escalan
+        with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            digests = pool.map(lambda key: _sha256(os.path.join(data_dir, key)), pending)
+            for key, digest in zip(pending, digests):
+                files[key]["sha256"] = digest
+    return files
+
+
+def dataset_fingerprint(files, people, params):
+    # Solo contenido, nombres y parámetros: tocar un fichero sin cambiarlo
+    # (mtime nuevo, mismo hash) no cambia la huella
+    content = {
+        "people": list(people),
+        "files": {key: entry["sha256"] for key, entry in files.items()},
+        "params": params,
+    }
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def person_hashes(files, person):
+    prefix = person + "/"
+    return {key: entry["sha256"] for key, entry in files.items() if key.startswith(prefix)}
+
+
+def _model_stamp(model_path):
+    path = resolve_model_path(model_path)
+    if not os.path.isfile(path):
+        return None
+    stat = os.stat(path)
+    return {"file": os.path.basename(path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def read_manifest(model_path):
+    # None si no existe, es de otra versión o no corresponde al modelo actual
+    # (reemplazado a mano o reescrito sin manifiesto)
+    path = manifest_path_for(model_path)
+    if not os.path.isfile(path):
+        return None
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != VERSION or manifest.get("model") != _model_stamp(model_path):
+        return None
+    return manifest
+
+
+def write_manifest(model_path, fingerprint, files, label_names, params):
+    # Después del modelo (el sello apunta al fichero ya escrito); atómico
+    manifest = {
+        "version": VERSION,
+        "fingerprint": fingerprint,
+        "params": params,
+        "label_names": list(label_names),
+        "model": _model_stamp(model_path),
+        "files": files,
+    }
+    path = manifest_path_for(model_path)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp_path, path)
+    return manifest
@@ -0,0 +1,253 @@
+import bisect
+import json
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# NumPy y OpenCV se importan al usarse: la GUI importa este módulo antes de
+# mostrar la ventana y no debe pagar su carga en el arranque
+
+# Límites (ms) de los buckets acumulados del histograma, al estilo Prometheus
+BUCKETS_MS = (0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000)
+# Muestras recientes por etapa para percentiles y ritmo
+DEFAULT_WINDOW = 512
+
+
+class _StageStats:
+    def __init__(self, window):
+        self.samples = deque(maxlen=window)  # (instante de fin, ms)
+        self.count = 0
+        self.total_ms = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+
+    def add(self, end, ms):
+        self.samples.append((end, ms))
+        self.count += 1
+        self.total_ms += ms
+        self.buckets[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+
+    def summary(self):
+        if not self.samples:
+            return {"count": self.count, "total_ms": self.total_ms}
+        import numpy as np
+
+        ends, values = zip(*self.samples)
+        values = np.asarray(values)
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        span = ends[-1] - ends[0]
+        return {
+            "count": self.count,
+            "total_ms": self.total_ms,
+            "mean_ms": float(values.mean()),
+            "p50_ms": float(p50),
+            "p95_ms": float(p95),
+            "p99_ms": float(p99),
+            "max_ms": float(values.max()),
+            "rate_hz": (len(values) - 1) / span if span > 0 else 0.0,
+            "buckets": list(self.buckets),
+        }
+
+
+class _Timer:
+    __slots__ = ("metrics", "stage", "started")
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        self.metrics.record(self.stage, end - self.started, end)
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Metrics:
+    # Tiempos por etapa del hot path (read, flip, resize, grayscale, detect,
+    # predict, draw, display; load/train/write al entrenar). Guarda una
+    # ventana móvil por etapa para percentiles y ritmo, y un histograma
+    # acumulado por buckets. Seguro entre hilos; desactivado no mide nada.
+    def __init__(self, window=DEFAULT_WINDOW, enabled=True):
+        self.window = window
+        self.enabled = enabled
+        self.started = time.time()
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def time(self, stage):
+        # with metrics.time("detect"): ...
+        return _Timer(self, stage) if self.enabled else _NULL_TIMER
+
+    def record(self, stage, seconds, end=None):
+        if not self.enabled:
+            return
+        end = time.perf_counter() if end is None else end
+        with self._lock:
+            stats = self._stages.get(stage)
+            if stats is None:
+                stats = self._stages[stage] = _StageStats(self.window)
+            stats.add(end, seconds * 1000)
+
+    def stage(self, name):
+        with self._lock:
+            stats = self._stages.get(name)
+            return stats.summary() if stats is not None else None
+
+    def snapshot(self):
+        with self._lock:
+            stages = {name: stats.summary() for name, stats in self._stages.items()}
+        return {"uptime_s": time.time() - self.started, "buckets_ms": list(BUCKETS_MS), "stages": stages}
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+
+    def export_json(self, path):
+        # Escritura atómica: quien lea el fichero nunca lo ve a medias
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp_path, path)
+
+    def prometheus(self):
+        # Formato de texto de Prometheus para el endpoint /metrics
+        lines = [
+            "# TYPE facialoo_stage_duration_ms histogram",
+        ]
+        snapshot = self.snapshot()
+        for name, stats in sorted(snapshot["stages"].items()):
+            if "buckets" not in stats:
+                continue
+            cumulative = 0
+            for bound, count in zip(BUCKETS_MS, stats["buckets"]):
+                cumulative += count
+                lines.append(f'facialoo_stage_duration_ms_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'facialoo_stage_duration_ms_bucket{{stage="{name}",le="+Inf"}} {stats["count"]}')
+            lines.append(f'facialoo_stage_duration_ms_sum{{stage="{name}"}} {stats["total_ms"]:.3f}')
+            lines.append(f'facialoo_stage_duration_ms_count{{stage="{name}"}} {stats["count"]}')
+        lines.append("# TYPE facialoo_stage_recent_ms gauge")
+        for name, stats in sorted(snapshot["stages"].items()):
+            for key in ("p50_ms", "p95_ms", "p99_ms"):
+                if key in stats:
+                    lines.append(f'facialoo_stage_recent_ms{{stage="{name}",quantile="{key[1:-3]}"}} {stats[key]:.3f}')
+        lines.append("# TYPE facialoo_stage_rate_hz gauge")
+        for name, stats in sorted(snapshot["stages"].items()):
+            if "rate_hz" in stats:
+                lines.append(f'facialoo_stage_rate_hz{{stage="{name}"}} {stats["rate_hz"]:.3f}')
+        return "\n".join(lines) + "\n"
+
+
+NULL_METRICS = Metrics(enabled=False)
+
+
+def draw_overlay(frame, metrics, stage="frame"):
+    # FPS y latencia de procesamiento (ventana reciente) en la esquina superior
+    import cv2 as cv
+
+    stats = metrics.stage(stage)
+    if not stats or "p50_ms" not in stats:
+        return frame
+    lines = [
+        f"FPS {stats['rate_hz']:.1f}",
+        f"p50 {stats['p50_ms']:.1f} ms  p95 {stats['p95_ms']:.1f} ms",
+    ]
+    detect = metrics.stage("detect")
+    if detect and "p50_ms" in detect:
+        lines.append(f"detect {detect['p50_ms']:.1f} ms")
+    cv.rectangle(frame, (5, 5), (260, 12 + 20 * len(lines)), (0, 0, 0), -1)
+    for i, text in enumerate(lines):
+        cv.putText(frame, text, (12, 24 + 20 * i), cv.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1, cv.LINE_AA)
+    return frame
+
+
+class MetricsServer(threading.Thread):
+    # Endpoint HTTP local: /metrics (Prometheus) y /stats.json (snapshot)
+    def __init__(self, metrics, port, host="127.0.0.1"):
+        super().__init__(daemon=True)
+        owner = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body, kind = owner.metrics.prometheus().encode(), "text/plain; version=0.0.4"
+                elif self.path == "/stats.json":
+                    body, kind = json.dumps(owner.metrics.snapshot()).encode(), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", kind)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.metrics = metrics
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.port = self.server.server_address[1]
+
+    def run(self):
+        self.server.serve_forever()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class MetricsExporter(threading.Thread):
+    # Vuelca el snapshot a un fichero JSON cada `interval` segundos
+    def __init__(self, metrics, path, interval=5.0):
+        super().__init__(daemon=True)
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self.error = None
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self._export()
+        self._export()
+
+    def _export(self):
+        try:
+            self.metrics.export_json(self.path)
+        except OSError as e:
+            self.error = e
+
+    def close(self):
+        self._stop_event.set()
+        self.join()
+
+
+def start_exporters(metrics, config):
+    # Arranca lo que pida la configuración (metrics_port / metrics_file)
+    started = []
+    if config.metrics_port:
+        server = MetricsServer(metrics, config.metrics_port)
+        server.start()
+        started.append(server)
+    if config.metrics_file:
+        exporter = MetricsExporter(metrics, config.metrics_file, config.metrics_interval)
+        exporter.start()
+        started.append(exporter)
+    return started
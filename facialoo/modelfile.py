@@ -0,0 +1,124 @@
+import argparse
+import json
+import os
+import struct
+import sys
+
+import numpy as np
+
+# Formato binario del modelo EigenFace:
+#   MAGIC (8 bytes) | longitud de cabecera (uint32 LE) | cabecera JSON
+#   | arrays crudos en C-order, cada uno alineado a ALIGN bytes.
+# La cabecera describe dtype, shape y offset de cada array para poder
+# abrirlos con np.memmap sin parsear ni copiar nada.
+MAGIC = b"FCLOOEF1"
+VERSION = 1
+ALIGN = 64
+BINARY_SUFFIX = ".bin"
+
+ARRAYS = (
+    ("mean", np.float32),
+    ("eigenvalues", np.float64),
+    ("eigenvectors", np.float32),
+    ("projections", np.float32),
+    ("projection_sq", np.float32),
+    ("labels", np.int32),
+)
+
+
+def binary_path_for(model_path):
+    return os.path.splitext(model_path)[0] + BINARY_SUFFIX
+
+
+def resolve_model_path(model_path):
+    # Preferir el binario si existe y no es más antiguo que el XML
+    binary_path = binary_path_for(model_path)
+    if os.path.isfile(binary_path):
+        if not os.path.isfile(model_path) or os.path.getmtime(binary_path) >= os.path.getmtime(model_path):
+            return binary_path
+    return model_path
+
+
+def model_exists(model_path):
+    return os.path.isfile(model_path) or os.path.isfile(binary_path_for(model_path))
+
+
+def _aligned(offset):
+    return (offset + ALIGN - 1) // ALIGN * ALIGN
+
+
+def write_binary(path, arrays, label_names=()):
+    arrays = {name: np.ascontiguousarray(arrays[name], dtype=dtype) for name, dtype in ARRAYS}
+    entries = {}
+    # Primero se calculan offsets relativos al inicio de la zona de datos
+    offset = 0
+    for name, _ in ARRAYS:
+        offset = _aligned(offset)
+        entries[name] = {"dtype": arrays[name].dtype.str, "shape": list(arrays[name].shape), "offset": offset}
+        offset += arrays[name].nbytes
+    header = {"version": VERSION, "arrays": entries, "label_names": list(label_names)}
+    header_bytes = json.dumps(header).encode("utf-8")
+    data_start = _aligned(len(MAGIC) + 4 + len(header_bytes))
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", len(header_bytes)))
+        f.write(header_bytes)
+        for name, _ in ARRAYS:
+            f.seek(data_start + entries[name]["offset"])
+            f.write(arrays[name].tobytes())
+    os.replace(tmp_path, path)
+
+
+def read_binary(path, mmap=True):
+    # Devuelve (arrays, nombres de etiquetas). Con mmap=True los arrays son
+    # memory-mapped de solo lectura; con False se leen a RAM (necesario si
+    # luego se va a sobrescribir el propio fichero, p. ej. en Windows).
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} no es un modelo binario de Facialoo")
+        (header_len,) = struct.unpack("<I", f.read(4))
+        header = json.loads(f.read(header_len).decode("utf-8"))
+    if header.get("version") != VERSION:
+        raise ValueError(f"Versión de modelo no soportada: {header.get('version')}")
+    data_start = _aligned(len(MAGIC) + 4 + header_len)
+    arrays = {}
+    for name, entry in header["arrays"].items():
+        shape = tuple(entry["shape"])
+        if 0 in shape:
+            arrays[name] = np.empty(shape, dtype=entry["dtype"])
+            continue
+        if mmap:
+            arrays[name] = np.memmap(path, dtype=entry["dtype"], mode="r",
+                                     offset=data_start + entry["offset"], shape=shape)
+        else:
+            arrays[name] = np.fromfile(path, dtype=entry["dtype"], count=int(np.prod(shape)),
+                                       offset=data_start + entry["offset"]).reshape(shape)
+    return arrays, header.get("label_names", [])
+
+
+def convert(xml_path, out_path=None):
+    from eigen import EigenFaceEngine
+
+    engine = EigenFaceEngine.load(xml_path, use_index=False)
+    out_path = out_path or binary_path_for(xml_path)
+    engine.save(out_path)
+    return out_path
+
+
+def main(argv=None):
+    from vision import MODEL_PATH
+
+    parser = argparse.ArgumentParser(description="Convierte el modelo XML de OpenCV al formato binario")
+    parser.add_argument("--xml", default=MODEL_PATH)
+    parser.add_argument("--out", default=None)
+    args = parser.parse_args(argv)
+
+    out_path = convert(args.xml, args.out)
+    print(f"Modelo binario guardado en {out_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
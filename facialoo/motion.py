@@ -0,0 +1,68 @@
+import time
+
+import cv2 as cv
+import numpy as np
+
+
+class MotionGate:
+    # Puerta barata delante del detector. Cada frame en gris se reduce a
+    # `width` píxeles de ancho, se suaviza y se compara con un fondo de media
+    # móvil (`alpha`): hay movimiento si más de `threshold` (fracción) de sus
+    # píxeles difieren en más de `delta` niveles de gris. Tras el último
+    # movimiento, o mientras haya rostros a la vista, la puerta sigue abierta
+    # `hold` segundos; cerrada, solo deja pasar un frame cada `heartbeat`
+    # segundos (latido) para encontrar a alguien que no se mueve.
+    def __init__(self, threshold=0.01, delta=20, hold=2.0, heartbeat=1.0, width=80, alpha=0.05,
+                 clock=time.monotonic):
+        self.threshold = threshold
+        self.delta = delta
+        self.hold = hold
+        self.heartbeat = heartbeat
+        self.width = width
+        self.alpha = alpha
+        self.clock = clock
+        self.background = None
+        self.motion = 0.0
+        self.open_until = None
+        self.last_pass = None
+        self.idle_frames = 0
+
+    def measure(self, gray):
+        # -> fracción de píxeles que cambian respecto al fondo
+        h, w = gray.shape[:2]
+        size = (self.width, max(1, round(h * self.width / w)))
+        small = cv.GaussianBlur(cv.resize(gray, size, interpolation=cv.INTER_AREA), (5, 5), 0)
+        if self.background is None or self.background.shape != small.shape:
+            # Sin fondo todavía: se toma este frame (y pasa como latido)
+            self.background = small.astype(np.float32)
+            return 0.0
+        diff = cv.absdiff(small, cv.convertScaleAbs(self.background))
+        cv.accumulateWeighted(small, self.background, self.alpha)
+        return np.count_nonzero(diff > self.delta) / diff.size
+
+    def keep_open(self, now=None):
+        # Rostros a la vista: no cerrar aunque estén quietos
+        now = self.clock() if now is None else now
+        self.open_until = now + self.hold
+
+    def is_open(self, now=None):
+        now = self.clock() if now is None else now
+        return self.open_until is not None and now < self.open_until
+
+    def should_process(self, gray):
+        now = self.clock()
+        self.motion = self.measure(gray)
+        if self.motion >= self.threshold:
+            self.keep_open(now)
+        if self.is_open(now) or self.last_pass is None or now - self.last_pass >= self.heartbeat:
+            self.last_pass = now
+            return True
+        self.idle_frames += 1
+        return False
+
+
+def new_motion_gate(config):
+    if not config.motion_gate:
+        return None
+    return MotionGate(config.motion_threshold, config.motion_delta, config.motion_hold,
+                      config.motion_heartbeat, config.motion_width)
@@ -0,0 +1,452 @@
+import argparse
+import json
+import multiprocessing as mp
+import queue
+import sys
+import time
+from multiprocessing import shared_memory
+
+import cv2 as cv
+import numpy as np
+
+from backends import load_model, model_path_for
+from config import load_config
+from eigen import EigenFaceEngine
+from modelfile import ALIGN, ARRAYS, model_exists
+from pipeline import FacePipeline
+from sources import open_source
+from vision import DATA_DIR
+
+RING_SLOTS = 4
+
+# Estado de la fuente en la cabecera del anillo
+OPEN, CLOSED, FAILED = 0, 1, -1
+
+
+class SharedFrameRing:
+    # Anillo de frames en memoria compartida: el proceso de captura escribe y
+    # el de reconocimiento lee siempre el más reciente (los atrasados se
+    # pisan). Cabecera int64:
+    #   [último seq, estado, seq por slot..., alto..., ancho..., ts_ns...]
+    # Cada slot se marca con seq=-1 mientras se escribe y el lector vuelve a
+    # comprobar el seq tras copiar, así no hace falta ningún lock.
+    def __init__(self, shm, slots, height, width, owner=False):
+        self.shm = shm
+        self.slots = slots
+        self.height = height
+        self.width = width
+        self.owner = owner
+        header_bytes = (2 + 4 * slots) * 8
+        self._header = np.ndarray((2 + 4 * slots,), dtype=np.int64, buffer=shm.buf)
+        self._slot_seq = self._header[2:2 + slots]
+        self._slot_h = self._header[2 + slots:2 + 2 * slots]
+        self._slot_w = self._header[2 + 2 * slots:2 + 3 * slots]
+        self._slot_ts = self._header[2 + 3 * slots:]
+        self._frames = np.ndarray((slots, height, width, 3), dtype=np.uint8,
+                                  buffer=shm.buf, offset=_aligned(header_bytes))
+
+    @staticmethod
+    def _size(slots, height, width):
+        return _aligned((2 + 4 * slots) * 8) + slots * height * width * 3
+
+    @classmethod
+    def create(cls, slots=RING_SLOTS, height=480, width=640):
+        shm = shared_memory.SharedMemory(create=True, size=cls._size(slots, height, width))
+        ring = cls(shm, slots, height, width, owner=True)
+        ring._header[:] = 0
+        ring._slot_seq[:] = -1
+        return ring
+
+    @classmethod
+    def attach(cls, spec):
+        name, slots, height, width = spec
+        return cls(shared_memory.SharedMemory(name=name), slots, height, width)
+
+    @property
+    def spec(self):
+        return (self.shm.name, self.slots, self.height, self.width)
+
+    @property
+    def seq(self):
+        return int(self._header[0])
+
+    @property
+    def state(self):
+        return int(self._header[1])
+
+    def fit(self, frame):
+        # Reduce el frame (sin deformarlo) para que quepa en un slot
+        h, w = frame.shape[:2]
+        scale = min(self.width / w, self.height / h)
+        if scale < 1.0:
+            size = (max(1, int(w * scale)), max(1, int(h * scale)))
+            frame = cv.resize(frame, size, interpolation=cv.INTER_AREA)
+        return frame
+
+    def put(self, frame, ts_ns=None):
+        frame = self.fit(frame)
+        h, w = frame.shape[:2]
+        seq = self.seq + 1
+        slot = seq % self.slots
+        self._slot_seq[slot] = -1
+        self._frames[slot, :h, :w] = frame
+        self._slot_h[slot] = h
+        self._slot_w[slot] = w
+        self._slot_ts[slot] = time.monotonic_ns() if ts_ns is None else ts_ns
+        self._slot_seq[slot] = seq
+        self._header[0] = seq
+        return seq
+
+    def latest(self, after_seq=0):
+        # -> (seq, ts_ns, copia del frame) o None si no hay nada más nuevo
+        # que `after_seq` (o el slot se estaba sobrescribiendo; reintentar)
+        seq = self.seq
+        if seq <= after_seq:
+            return None
+        slot = seq % self.slots
+        if self._slot_seq[slot] != seq:
+            return None
+        h, w, ts_ns = int(self._slot_h[slot]), int(self._slot_w[slot]), int(self._slot_ts[slot])
+        frame = self._frames[slot, :h, :w].copy()
+        if self._slot_seq[slot] != seq:
+            return None
+        return seq, ts_ns, frame
+
+    def close(self, state=CLOSED):
+        self._header[1] = state
+
+    def release(self):
+        # Las vistas NumPy deben soltarse antes de cerrar el segmento
+        self._header = self._slot_seq = self._slot_h = self._slot_w = self._slot_ts = self._frames = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class SharedModel:
+    # Copia única de los arrays del modelo en memoria compartida. El proceso
+    # padre carga el modelo una vez; cada worker construye su EigenFaceEngine
+    # sobre vistas de solo lectura, sin volver a leer ni copiar la galería.
+    def __init__(self, shm, layout, label_names, owner=False):
+        self.shm = shm
+        self.layout = layout
+        self.label_names = list(label_names)
+        self.owner = owner
+
+    @classmethod
+    def from_engine(cls, engine):
+        sources = {
+            "mean": engine.mean,
+            "eigenvalues": engine.eigenvalues,
+            "eigenvectors": engine.eigenvectors,
+            "projections": engine.projections,
+            "projection_sq": engine._projection_sq,
+            "labels": engine.labels,
+        }
+        layout = []
+        offset = 0
+        for name, dtype in ARRAYS:
+            array = np.ascontiguousarray(sources[name], dtype=dtype)
+            offset = _aligned(offset)
+            layout.append((name, array.dtype.str, array.shape, offset))
+            offset += array.nbytes
+        shm = shared_memory.SharedMemory(create=True, size=max(1, offset))
+        for name, dtype, shape, offset in layout:
+            view = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+            view[...] = sources[name]
+            del view
+        return cls(shm, layout, engine.label_names, owner=True)
+
+    @classmethod
+    def attach(cls, spec):
+        name, layout, label_names = spec
+        return cls(shared_memory.SharedMemory(name=name), layout, label_names)
+
+    @property
+    def spec(self):
+        return (self.shm.name, self.layout, self.label_names)
+
+    def engine(self, index=None, exact=False):
+        arrays = {}
+        for name, dtype, shape, offset in self.layout:
+            view = np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=offset)
+            view.flags.writeable = False
+            arrays[name] = view
+        return EigenFaceEngine(
+            arrays["mean"],
+            arrays["eigenvectors"],
+            arrays["projections"],
+            arrays["labels"],
+            eigenvalues=arrays["eigenvalues"],
+            label_names=self.label_names,
+            index=index,
+            exact=exact,
+            projection_sq=arrays["projection_sq"],
+        )
+
+    def release(self):
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _aligned(offset):
+    return (offset + ALIGN - 1) // ALIGN * ALIGN
+
+
+def slot_height(spec, width, data_dir=DATA_DIR):
+    # Alto de slot para la fuente: el de su primer frame reducido al ancho
+    # del slot (el pipeline trabaja a display_width de ancho), así caben
+    # también fuentes verticales o cuadradas. None si no abre o no da frames.
+    with open_source(spec, data_dir=data_dir) as source:
+        if not source.isOpened():
+            return None
+        ret, frame = source.read()
+    if not ret:
+        return None
+    h, w = frame.shape[:2]
+    return max(1, -(-h * min(width, w) // w))
+
+
+def _capture_main(spec, ring_spec, data_dir, fps, ready, stop):
+    # Proceso de captura: lee la fuente y publica frames en el anillo. Espera
+    # a que el worker esté listo para no vaciar ficheros cortos en balde.
+    ring = SharedFrameRing.attach(ring_spec)
+    state = CLOSED
+    try:
+        with open_source(spec, fps=fps, data_dir=data_dir) as source:
+            if not source.isOpened():
+                state = FAILED
+                return
+            while not ready.wait(0.1):
+                if stop.is_set():
+                    return
+            while not stop.is_set():
+                ret, frame = source.read()
+                if not ret:
+                    break
+                ring.put(frame)
+    except Exception:
+        state = FAILED
+        raise
+    finally:
+        ring.close(state)
+        ring.release()
+
+
+def _recognize_main(stream_id, spec, ring_spec, model_spec, index, config, results, ready, stop):
+    # Proceso de reconocimiento: toma el frame más reciente del anillo, pasa
+    # el FacePipeline (sin dibujar) y envía solo los resultados al padre
+    ring = SharedFrameRing.attach(ring_spec)
+    model = SharedModel.attach(model_spec) if model_spec is not None else None
+    frames = dropped = 0
+    error = None
+    try:
+        engine = model.engine(index, config.exact_search) if model is not None else None
+        label_names = model.label_names if model is not None else ()
+        pipeline = FacePipeline(config, engine=engine, label_names=label_names)
+        ready.set()
+        last = 0
+        while not stop.is_set():
+            item = ring.latest(last)
+            if item is None:
+                if ring.state == FAILED:
+                    error = f"No se pudo abrir la fuente: {spec}"
+                    break
+                if ring.state == CLOSED and ring.seq == last:
+                    break
+                time.sleep(0.002)
+                continue
+            seq, ts_ns, frame = item
+            dropped += seq - last - 1
+            last = seq
+            _, faces = pipeline.process(frame, draw=False)
+            frames += 1
+            results.put({
+                "stream": stream_id,
+                "source": spec,
+                "seq": seq,
+                "latency_ms": (time.monotonic_ns() - ts_ns) / 1e6,
+                "faces": faces,
+            })
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    finally:
+        ready.set()
+        results.put({"stream": stream_id, "source": spec, "done": True,
+                     "frames": frames, "dropped": dropped, "error": error})
+        # El engine tiene vistas sobre el segmento: soltarlas antes de cerrarlo
+        pipeline = engine = None
+        if model is not None:
+            model.release()
+        ring.release()
+
+
+class MultiStreamRunner:
+    # Un proceso de captura y otro de reconocimiento por fuente, frames por
+    # memoria compartida y el modelo cargado una sola vez. El padre agrega los
+    # resultados de todos los streams con `results()`.
+    def __init__(self, sources, config, model_path=None, data_dir=DATA_DIR,
+                 recognize=True, fps=None, slots=RING_SLOTS, max_height=None):
+        self.sources = list(sources)
+        self.config = config
+        self.model_path = model_path or model_path_for(config.backend)
+        self.data_dir = data_dir
+        self.recognize = recognize
+        self.fps = fps
+        self.slots = slots
+        # Alto máximo de los slots; None: se mide en el primer frame de
+        # cada fuente al arrancar (slot_height)
+        self.max_height = max_height
+        self.stats = {}
+        self._rings = []
+        self._model = None
+        self._processes = []
+        self._events = []
+        # spawn en todas las plataformas: los hijos no heredan estado de Tk/cv
+        self._ctx = mp.get_context("spawn")
+        self._stop = self._ctx.Event()
+        self._results = self._ctx.Queue()
+
+    def start(self):
+        model_spec, index = None, None
+        if self.recognize and model_exists(self.model_path):
+            engine, label_names = load_model(self.config, self.model_path, self.data_dir)
+            # Solo los modelos de proyección (eigen, fisher) son arrays que se
+            # pueden compartir; LBPH vive dentro de cv.face
+            if not isinstance(engine, EigenFaceEngine):
+                raise ValueError(f"multistream no admite el backend {self.config.backend}")
+            engine.label_names = label_names
+            self._model = SharedModel.from_engine(engine)
+            model_spec, index = self._model.spec, engine.index
+            del engine
+
+        for stream_id, spec in enumerate(self.sources):
+            width = self.config.display_width
+            # Si la fuente no abre, el proceso de captura informará del fallo
+            height = self.max_height or slot_height(spec, width, self.data_dir) or width
+            ring = SharedFrameRing.create(self.slots, height, width)
+            self._rings.append(ring)
+            self.stats[stream_id] = {"source": spec, "frames": 0, "faces": 0, "dropped": 0,
+                                     "latencies": [], "error": None, "done": False}
+            # Process.start() suelta sus argumentos: guardar la referencia
+            # para que el semáforo siga vivo hasta que el hijo lo abra
+            ready = self._ctx.Event()
+            self._events.append(ready)
+            self._processes.append(self._ctx.Process(
+                target=_recognize_main, daemon=True,
+                args=(stream_id, spec, ring.spec, model_spec, index, self.config, self._results, ready, self._stop)))
+            self._processes.append(self._ctx.Process(
+                target=_capture_main, daemon=True,
+                args=(spec, ring.spec, self.data_dir, self.fps, ready, self._stop)))
+        self._started = time.perf_counter()
+        for process in self._processes:
+            process.start()
+        return self
+
+    def results(self, duration=None):
+        # Generador de resultados por frame de todos los streams; termina cuando
+        # todas las fuentes acaban o se agota `duration` (segundos)
+        deadline = None if duration is None else time.perf_counter() + duration
+        while not all(s["done"] for s in self.stats.values()):
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            try:
+                result = self._results.get(timeout=0.1)
+            except queue.Empty:
+                if not any(p.is_alive() for p in self._processes):
+                    break
+                continue
+            stats = self.stats[result["stream"]]
+            if result.get("done"):
+                stats.update(done=True, dropped=result["dropped"], error=result["error"])
+                continue
+            stats["frames"] += 1
+            stats["faces"] += len(result["faces"])
+            stats["latencies"].append(result["latency_ms"])
+            yield result
+
+    def summary(self):
+        elapsed = time.perf_counter() - self._started
+        summary = []
+        for stream_id, stats in self.stats.items():
+            latencies = np.asarray(stats["latencies"]) if stats["latencies"] else np.zeros(1)
+            p50, p95 = np.percentile(latencies, [50, 95])
+            summary.append({
+                "stream": stream_id,
+                "source": stats["source"],
+                "frames": stats["frames"],
+                "faces": stats["faces"],
+                "dropped": stats["dropped"],
+                "fps": stats["frames"] / elapsed if elapsed else 0.0,
+                "p50_ms": float(p50),
+                "p95_ms": float(p95),
+                "error": stats["error"],
+            })
+        return summary
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        # Vaciar la cola para que los hijos puedan terminar de escribir en ella
+        for _ in self.results(duration=timeout):
+            pass
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        for ring in self._rings:
+            ring.release()
+        self._rings = []
+        if self._model is not None:
+            self._model.release()
+            self._model = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reconocimiento sobre varias fuentes en paralelo")
+    parser.add_argument("sources", nargs="+", help="vídeo, directorio, índice de webcam o synthetic[:WxH[:N]]")
+    parser.add_argument("--model", default=None, help="por defecto el del backend configurado")
+    parser.add_argument("--data", default=DATA_DIR)
+    parser.add_argument("--fps", type=float, default=None, help="ritmo de lectura de ficheros y directorios")
+    parser.add_argument("--seconds", type=float, default=None, help="parar tras estos segundos")
+    parser.add_argument("--detect-only", action="store_true", help="no cargar el modelo")
+    parser.add_argument("--jsonl", help="escribir cada resultado como una línea JSON en este fichero")
+    parser.add_argument("--max-height", type=int, default=None,
+                        help="alto máximo de frame compartido (por defecto se mide en el primer frame de cada fuente)")
+    args = parser.parse_args(argv)
+
+    config = load_config()
+    out = open(args.jsonl, "w") if args.jsonl else None
+    try:
+        with MultiStreamRunner(args.sources, config, args.model, args.data,
+                               recognize=not args.detect_only, fps=args.fps, max_height=args.max_height) as runner:
+            for result in runner.results(args.seconds):
+                if out is not None:
+                    out.write(json.dumps(result) + "\n")
+            summary = runner.summary()
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    finally:
+        if out is not None:
+            out.close()
+
+    failed = False
+    for stream in summary:
+        print(f"[{stream['stream']}] {stream['source']}  frames: {stream['frames']}  rostros: {stream['faces']}"
+              f"  descartados: {stream['dropped']}  FPS: {stream['fps']:.1f}"
+              f"  latencia p50/p95: {stream['p50_ms']:.1f}/{stream['p95_ms']:.1f} ms")
+        if stream["error"]:
+            print(f"    error: {stream['error']}", file=sys.stderr)
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
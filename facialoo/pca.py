@@ -0,0 +1,115 @@
+import numpy as np
+
+# Entrenador EigenFace en NumPy con memoria acotada. Los rostros llegan como
+# uint8 (memmap del FaceStore o el buffer de load_dataset) y solo se pasan a
+# float32 de `chunk_size` en `chunk_size`; nunca existe la matriz completa
+# de datos en float. Se conservan `components` componentes.
+DEFAULT_COMPONENTS = 100
+DEFAULT_CHUNK = 512
+# Hasta este número de muestras se usa el truco de la matriz de Gram (exacto);
+# por encima, SVD aleatorizada en streaming
+GRAM_MAX_SAMPLES = 4096
+
+
+def _blocks(faces, chunk_size, mean=None):
+    # -> (inicio, bloque float32 (n, d) centrado si se pasa `mean`)
+    for start in range(0, len(faces), chunk_size):
+        part = faces[start:start + chunk_size]
+        block = np.stack(part).reshape(len(part), -1).astype(np.float32)
+        if mean is not None:
+            block -= mean
+        yield start, block
+
+
+def mean_face(faces, chunk_size=DEFAULT_CHUNK):
+    total = None
+    for _, block in _blocks(faces, chunk_size):
+        partial = block.sum(axis=0, dtype=np.float64)
+        total = partial if total is None else total + partial
+    return (total / len(faces)).astype(np.float32)
+
+
+def _gram_basis(faces, mean, components, chunk_size):
+    # Truco de Gram: con N muestras << d píxeles, los vectores propios de
+    # Xc·Xcᵀ (N×N) dan los de Xcᵀ·Xc mediante W = Xcᵀ·U / sqrt(λ). La Gram se
+    # rellena por pares de bloques para no tener Xc entero en memoria.
+    n = len(faces)
+    gram = np.empty((n, n), dtype=np.float64)
+    for i, block_i in _blocks(faces, chunk_size, mean):
+        rows = slice(i, i + len(block_i))
+        for j, block_j in _blocks(faces[:i + len(block_i)], chunk_size, mean):
+            cols = slice(j, j + len(block_j))
+            gram[rows, cols] = block_i @ block_j.T
+            gram[cols, rows] = gram[rows, cols].T
+    values, vectors = np.linalg.eigh(gram)
+    del gram
+    order = np.argsort(values)[::-1][:components]
+    values = np.clip(values[order], 0, None)
+    vectors = vectors[:, order]
+    # Fuera componentes nulos (muestras repetidas o N-1 > rango)
+    keep = values > values[0] * 1e-10
+    values, vectors = values[keep], vectors[:, keep]
+
+    basis = np.zeros((len(mean), len(values)), dtype=np.float64)
+    for start, block in _blocks(faces, chunk_size, mean):
+        basis += block.T @ vectors[start:start + len(block)]
+    basis /= np.sqrt(values)
+    return values, basis
+
+
+def _randomized_basis(faces, mean, components, chunk_size, oversample=10, power_iters=2, seed=0):
+    # Range finder aleatorizado (Halko et al.) sobre la covarianza sin
+    # formarla: cada pasada acumula Xcᵀ·(Xc·Q) bloque a bloque, con memoria
+    # d×(k+p). Las iteraciones de potencia afinan el subespacio.
+    rng = np.random.default_rng(seed)
+    width = min(components + oversample, len(faces), len(mean))
+    basis = rng.standard_normal((len(mean), width)).astype(np.float32)
+    for _ in range(power_iters + 1):
+        basis, _ = np.linalg.qr(basis)
+        sketch = np.zeros_like(basis)
+        for _, block in _blocks(faces, chunk_size, mean):
+            sketch += block.T @ (block @ basis)
+        basis = sketch
+    basis, _ = np.linalg.qr(basis)
+
+    # Problema pequeño (k+p)×(k+p): Qᵀ·Xcᵀ·Xc·Q
+    small = np.zeros((width, width), dtype=np.float64)
+    for _, block in _blocks(faces, chunk_size, mean):
+        reduced = block @ basis
+        small += reduced.T.astype(np.float64) @ reduced
+    values, vectors = np.linalg.eigh(small)
+    order = np.argsort(values)[::-1][:components]
+    return np.clip(values[order], 0, None), basis.astype(np.float64) @ vectors[:, order]
+
+
+def train_pca(faces, labels, components=DEFAULT_COMPONENTS, chunk_size=DEFAULT_CHUNK, method="auto"):
+    # -> dict con mean, eigenvalues, eigenvectors (d×k), projections (N×k)
+    # y labels, listo para EigenFaceEngine. `method`: "gram", "randomized" o
+    # "auto" (Gram si N <= GRAM_MAX_SAMPLES).
+    if not len(faces):
+        raise ValueError("No hay rostros para entrenar.")
+    components = min(components or len(faces), len(faces) - 1 or 1)
+    if method == "auto":
+        method = "gram" if len(faces) <= GRAM_MAX_SAMPLES else "randomized"
+    if method not in ("gram", "randomized"):
+        raise ValueError(f"Método desconocido: {method}")
+
+    mean = mean_face(faces, chunk_size)
+    if method == "gram":
+        values, basis = _gram_basis(faces, mean, components, chunk_size)
+    else:
+        values, basis = _randomized_basis(faces, mean, components, chunk_size)
+    eigenvectors = basis.astype(np.float32)
+
+    projections = np.empty((len(faces), eigenvectors.shape[1]), dtype=np.float32)
+    for start, block in _blocks(faces, chunk_size, mean):
+        projections[start:start + len(block)] = block @ eigenvectors
+    return {
+        "mean": mean,
+        # Igual que cv.face: valores propios de la covarianza (Xcᵀ·Xc / N)
+        "eigenvalues": values / len(faces),
+        "eigenvectors": eigenvectors,
+        "projections": projections,
+        "labels": np.asarray(labels, dtype=np.int32),
+        "method": method,
+    }
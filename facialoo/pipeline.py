@@ -0,0 +1,104 @@
+import threading
+
+from detector import AdaptiveDetector
+from identity_cache import new_identity_cache
+from metrics import NULL_METRICS
+from motion import new_motion_gate
+from tracker import FaceTracker
+from vision import (
+    crop_face,
+    draw_corners,
+    draw_identity,
+    identify_faces,
+    load_cascade,
+    prepare_frame,
+)
+
+
+class FacePipeline:
+    # Lógica de detectar/reconocer sin dependencias de la GUI: la usan la
+    # ventana, el benchmark y los procesos de multistream. Sin `engine` solo
+    # detecta y sigue rostros. Con `metrics` se cronometra cada etapa.
+    def __init__(self, config, cascade=None, engine=None, label_names=(), metrics=NULL_METRICS):
+        self.config = config
+        self.metrics = metrics
+        self.cascade = cascade if cascade is not None else load_cascade()
+        self.detector = AdaptiveDetector(self.cascade, config)
+        self.tracker = FaceTracker(self.detector, detect_every=config.detect_every)
+        self.engine = engine
+        self.label_names = list(label_names)
+        self.identity_cache = new_identity_cache(config) if engine is not None else None
+        self.motion = new_motion_gate(config)
+        self.predictions = 0
+        # Modelo pendiente de swap_model(); se aplica al empezar el siguiente frame
+        self._pending_model = None
+        self._swap_lock = threading.Lock()
+
+    def swap_model(self, engine, label_names):
+        # Cambio de modelo en caliente, seguro desde otro hilo: motor y nombres
+        # se publican juntos en una sola asignación y el hilo que procesa los
+        # toma entre dos frames, así que ningún frame mezcla modelo y etiquetas.
+        with self._swap_lock:
+            self._pending_model = (engine, list(label_names))
+
+    def _apply_pending_model(self):
+        with self._swap_lock:
+            pending, self._pending_model = self._pending_model, None
+        self.engine, self.label_names = pending
+        # Las identidades en caché son ids del modelo anterior
+        self.identity_cache = new_identity_cache(self.config) if self.engine is not None else None
+
+    def process(self, frame, draw=True, flip=True):
+        # -> (frame de trabajo, [{"track", "box", "label", "distance"}])
+        with self.metrics.time("frame"):
+            return self._process(frame, draw, flip)
+
+    def _process(self, frame, draw, flip):
+        if self._pending_model is not None:
+            self._apply_pending_model()
+        metrics = self.metrics
+        frame, gray = prepare_frame(frame, self.config.display_width, flip, metrics)
+        if self.motion is not None:
+            with metrics.time("motion"):
+                active = self.motion.should_process(gray)
+            if not active:
+                # Escena quieta: ni cascade ni predict. El siguiente frame que
+                # pase (movimiento o latido) detecta desde cero
+                self.tracker.reset()
+                return frame, []
+        with metrics.time("detect"):
+            tracks = self.tracker.update(gray)
+        if not tracks:
+            return frame, []
+        if self.motion is not None:
+            self.motion.keep_open()
+
+        boxes = [track.box for track in tracks]
+        if self.engine is None:
+            if draw:
+                with metrics.time("draw"):
+                    for box in boxes:
+                        draw_corners(frame, box)
+            return frame, [{"track": t.id, "box": list(t.box), "label": None, "distance": None} for t in tracks]
+
+        # Predicción en lote (umbral del backend: config.recognition_threshold);
+        # con caché solo se predicen los tracks nuevos, caducados o que cambiaron
+        threshold = self.config.recognition_threshold
+        with metrics.time("predict"):
+            rois = [crop_face(gray, box) for box in boxes]
+            if self.identity_cache is not None:
+                before = self.identity_cache.predictions
+                identities = self.identity_cache.identify(
+                    self.engine, [track.id for track in tracks], rois, self.label_names, threshold)
+                self.predictions += self.identity_cache.predictions - before
+            else:
+                identities = identify_faces(self.engine, rois, self.label_names, threshold)
+                self.predictions += len(rois)
+
+        if draw:
+            with metrics.time("draw"):
+                for track, (name, _) in zip(tracks, identities):
+                    draw_identity(frame, track.box, name)
+        results = [{"track": track.id, "box": list(track.box), "label": name, "distance": float(distance)}
+                   for track, (name, distance) in zip(tracks, identities)]
+        return frame, results
@@ -1,11 +1,22 @@
 import cv2 as cv
+import sys
 
-ruidos = cv.CascadeClassifier('haarcascade_frontalface_default.xml')
-camara = cv.VideoCapture(0)
+from config import load_config
+from detector import AdaptiveDetector
+from sources import open_source
+from vision import load_cascade
+
+config = load_config()
+
+ruidos = AdaptiveDetector(load_cascade(), config)
+# Fuente opcional: índice de webcam, vídeo, directorio o "synthetic"
+camara = open_source(sys.argv[1] if len(sys.argv) > 1 else config.source)
 while True:
-    _, captura = camara.read()
+    respuesta, captura = camara.read()
+    if respuesta == False:
+        break
     grises = cv.cvtColor(captura, cv.COLOR_BGR2GRAY)
-    cara = ruidos.detectMultiScale(grises, 1.3, 5)
+    cara = ruidos(grises)
     for (x, y, e1, e2) in cara:
         cv.rectangle(captura, (x, y), (x+e1, y+e2), (0, 255, 0), 2)
     cv.imshow('Resultado rostro', captura)
@@ -1,29 +1,37 @@
 import cv2 as cv
-import os
+import sys
 import imutils
 
+from backends import load_model
+from config import load_config
+from detector import AdaptiveDetector
+from sources import open_source
+from vision import load_cascade
+
+config = load_config()
+
 data = 'Data'
-lista_data = os.listdir(data)
-entrenamiento_EigenFaceRecognizer = cv.face.EigenFaceRecognizer_create()
-entrenamiento_EigenFaceRecognizer.read('EntrenamientoEigenFaceRecognizer.xml')
-ruidos = cv.CascadeClassifier('haarcascade_frontalface_default.xml')
-camara = cv.VideoCapture(0)
+# Modelo del backend configurado (eigen, fisher o lbph) y nombres de cada etiqueta
+reconocedor, lista_data = load_model(config, data_dir=data)
+ruidos = AdaptiveDetector(load_cascade(), config)
+# Fuente opcional: índice de webcam, vídeo, directorio o "synthetic"
+camara = open_source(sys.argv[1] if len(sys.argv) > 1 else config.source)
 while True:
     respuesta, captura = camara.read()
     if respuesta == False:
         break
-    captura = imutils.resize(captura, width=640)
+    captura = imutils.resize(captura, width=config.capture_width)
     grises = cv.cvtColor(captura, cv.COLOR_BGR2GRAY)
     id_captura = grises.copy()
-    cara = ruidos.detectMultiScale(grises, 1.3, 5)
+    cara = ruidos(grises)
     for (x, y, e1, e2) in cara:
         rostro_capturado = id_captura[y:y+e2, x:x+e1]
         rostro_capturado = cv.resize(
             rostro_capturado, (160, 160), interpolation=cv.INTER_CUBIC)
-        resultado = entrenamiento_EigenFaceRecognizer.predict(rostro_capturado)
+        resultado = reconocedor.predict(rostro_capturado)
         cv.putText(captura, '{}'.format(resultado), (x, y-5),
                    1, 1.3, (0, 255, 0), 1, cv.LINE_AA)
-        if resultado[1] < 8000:
+        if resultado[1] < config.recognition_threshold:
             cv.putText(captura, '{}'.format(
                 lista_data[resultado[0]]), (x, y-20), 2, 1.1, (0, 255, 0), 1, cv.LINE_AA)
             cv.rectangle(captura, (x, y), (x+e1, y+e2), (255, 0, 0), 2)
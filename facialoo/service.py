@@ -0,0 +1,278 @@
+import argparse
+import json
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import cv2 as cv
+import numpy as np
+
+from config import load_config
+from backends import load_model, model_path_for
+from modelfile import model_exists
+from vision import CASCADE_PATH, DATA_DIR, FACE_SIZE, crop_face, load_cascade
+
+# Tamaño máximo aceptado por petición (una foto de cámara de sobra)
+MAX_BODY_BYTES = 16 * 1024 * 1024
+
+
+class MicroBatcher:
+    # Agrupa peticiones concurrentes: cada worker toma la primera pendiente y
+    # espera como mucho `max_wait_ms` a que lleguen más, hasta `max_batch`
+    # rostros, y resuelve todas con una sola proyección y búsqueda. La
+    # multiplicación de NumPy suelta el GIL, así que varios workers en hilos
+    # aprovechan varios núcleos.
+    def __init__(self, engine, max_batch=32, max_wait_ms=5.0, workers=2):
+        self.engine = engine
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.workers = workers
+        self.batches = 0
+        self.faces = 0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._threads = [threading.Thread(target=self._run, daemon=True) for _ in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, rois):
+        # -> Future con (label_ids, distances) para los `rois` de la petición
+        future = Future()
+        if len(rois) == 0:
+            future.set_result((np.empty(0, dtype=np.int32), np.empty(0)))
+        else:
+            self._queue.put((rois, future))
+        return future
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        size = len(first[0])
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                # Reenviar la señal de parada al resto de workers
+                self._queue.put(None)
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            faces = [roi for rois, _ in batch for roi in rois]
+            try:
+                label_ids, distances = self.engine.predict_batch(faces)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            with self._lock:
+                self.batches += 1
+                self.faces += len(faces)
+            start = 0
+            for rois, future in batch:
+                end = start + len(rois)
+                future.set_result((label_ids[start:end], distances[start:end]))
+                start = end
+
+    def close(self):
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+
+
+class RecognitionService:
+    # Modelo cargado una vez; detecta rostros en imágenes completas o acepta
+    # recortes ya hechos y delega la predicción en el MicroBatcher.
+    def __init__(self, engine, label_names, config, max_batch=32, max_wait_ms=5.0, workers=2):
+        self.engine = engine
+        self.label_names = list(label_names)
+        self.config = config
+        self.batcher = MicroBatcher(engine, max_batch, max_wait_ms, workers)
+        self.requests = 0
+        # CascadeClassifier no es seguro entre hilos: uno por hilo del servidor
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _cascade(self):
+        cascade = getattr(self._local, "cascade", None)
+        if cascade is None:
+            cascade = self._local.cascade = load_cascade(CASCADE_PATH)
+        return cascade
+
+    def detect(self, gray):
+        cfg = self.config
+        return self._cascade().detectMultiScale(gray, cfg.scale_factor, cfg.min_neighbors,
+                                                minSize=(cfg.min_size, cfg.min_size))
+
+    def recognize(self, data, crop=False):
+        gray = cv.imdecode(np.frombuffer(data, dtype=np.uint8), cv.IMREAD_GRAYSCALE)
+        if gray is None:
+            raise ValueError("No se pudo decodificar la imagen")
+        if crop:
+            boxes = [None]
+            rois = [cv.resize(gray, FACE_SIZE, interpolation=cv.INTER_CUBIC)]
+        else:
+            boxes = [list(map(int, box)) for box in self.detect(gray)]
+            rois = [crop_face(gray, box) for box in boxes]
+        label_ids, distances = self.batcher.submit(rois).result()
+        with self._lock:
+            self.requests += 1
+        faces = []
+        for box, label_id, distance in zip(boxes, label_ids, distances):
+            known = distance < self.config.recognition_threshold and 0 <= label_id < len(self.label_names)
+            faces.append({
+                "box": box,
+                "label": self.label_names[label_id] if known else None,
+                # inf: ningún shard respondió a tiempo (galería por shards)
+                "distance": float(distance) if np.isfinite(distance) else None,
+            })
+        return {"faces": faces}
+
+    def health(self):
+        batches = self.batcher.batches
+        health = {
+            "status": "ok",
+            "people": len(self.label_names),
+            "requests": self.requests,
+            "batches": batches,
+            "mean_batch": self.batcher.faces / batches if batches else 0.0,
+        }
+        if hasattr(self.engine, "partial"):
+            # Rostros resueltos sin respuesta de todos los shards
+            health["partial_faces"] = self.engine.partial
+        return health
+
+    def close(self):
+        self.batcher.close()
+        if hasattr(self.engine, "close"):
+            self.engine.close()
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # La cola de listen por defecto (5) corta conexiones con muchos clientes
+    request_queue_size = 128
+
+
+def make_server(service, port, host="127.0.0.1"):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _reply(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if urlparse(self.path).path == "/health":
+                self._reply(200, service.health())
+            else:
+                self._reply(404, {"error": "no encontrado"})
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            if url.path != "/recognize":
+                self._reply(404, {"error": "no encontrado"})
+                return
+            length = int(self.headers.get("Content-Length") or 0)
+            if not 0 < length <= MAX_BODY_BYTES:
+                self._reply(413 if length else 400, {"error": "cuerpo vacío o demasiado grande"})
+                return
+            data = self.rfile.read(length)
+            crop = parse_qs(url.query).get("crop", ["0"])[0] in ("1", "true")
+            try:
+                self._reply(200, service.recognize(data, crop))
+            except ValueError as e:
+                self._reply(400, {"error": str(e)})
+            except Exception as e:
+                self._reply(500, {"error": f"{type(e).__name__}: {e}"})
+
+        def log_message(self, *args):
+            pass
+
+    return _Server((host, port), Handler)
+
+
+def load_service(config, model_path=None, data_dir=DATA_DIR, max_batch=None, max_wait_ms=None, workers=None,
+                 router_path=None, shards=None):
+    if shards:
+        # Galería repartida: el servicio proyecta y hace scatter-gather a los shards
+        from shards import ShardedGallery
+
+        engine = ShardedGallery.load(router_path, shards, config.shard_top_k, config.shard_deadline_ms)
+        engine.check()
+        label_names = engine.label_names
+    else:
+        model_path = model_path or model_path_for(config.backend)
+        if not model_exists(model_path):
+            raise FileNotFoundError(f"No se encontró el modelo: {model_path}")
+        engine, label_names = load_model(config, model_path, data_dir)
+    return RecognitionService(
+        engine, label_names, config,
+        max_batch or config.service_max_batch,
+        config.service_max_wait_ms if max_wait_ms is None else max_wait_ms,
+        workers or config.service_workers,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servicio HTTP local de reconocimiento")
+    parser.add_argument("--model", default=None, help="por defecto el del backend configurado")
+    parser.add_argument("--data", default=DATA_DIR)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=None)
+    parser.add_argument("--max-batch", type=int, default=None, help="rostros máximos por lote")
+    parser.add_argument("--max-wait-ms", type=float, default=None, help="espera máxima para completar un lote")
+    parser.add_argument("--workers", type=int, default=None, help="hilos que resuelven lotes")
+    parser.add_argument("--router", help="router.npz de una galería por shards (shards.py split)")
+    parser.add_argument("--shards", help="direcciones host:puerto de los shards, en orden y separadas por comas")
+    args = parser.parse_args(argv)
+    if bool(args.router) != bool(args.shards):
+        parser.error("--router y --shards van juntos")
+
+    config = load_config()
+    try:
+        service = load_service(config, args.model, args.data, args.max_batch, args.max_wait_ms, args.workers,
+                               args.router, args.shards.split(",") if args.shards else None)
+    except (FileNotFoundError, ConnectionError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 2
+    port = config.service_port if args.port is None else args.port
+    server = make_server(service, port, args.host)
+    print(f"Escuchando en http://{args.host}:{server.server_address[1]}  "
+          f"(lote {service.batcher.max_batch}, espera {service.batcher.max_wait * 1000:.1f} ms, "
+          f"{service.batcher.workers} workers)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,504 @@
+import argparse
+import dataclasses
+import json
+import os
+import socket
+import socketserver
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from backends import BACKENDS, load_model
+from config import load_config
+from eigen import EigenFaceEngine, project_faces
+from vision import DATA_DIR
+
+# Galería EigenFace repartida por identidad entre procesos (o máquinas). La
+# base PCA (media y autovectores) es común: el router proyecta cada rostro
+# una sola vez y envía la proyección a todos los shards (scatter); cada shard
+# devuelve sus k mejores identidades y el router las fusiona (gather) con lo
+# que haya llegado antes del plazo. En disco:
+#   <dir>/router.npz       media, autovectores, nombres, id de la partición
+#   <dir>/shard-000.npz    proyecciones, ||p||^2 y etiquetas de sus personas
+ROUTER_NAME = "router.npz"
+SHARD_PATTERN = "shard-{:03d}.npz"
+DEFAULT_TOP_K = 5
+DEFAULT_DEADLINE_MS = 50.0
+# Mensaje: longitud de la cabecera JSON y de los datos binarios (uint32 LE),
+# cabecera y datos crudos (arrays C-order cuyo dtype y forma fija el protocolo)
+FRAME = struct.Struct("<II")
+READY_PREFIX = "SHARD LISTENING "
+
+
+# ------------------------------------------------------------------ partición
+def shard_of(name, label, shards):
+    # Estable entre reentrenamientos: una persona cae siempre en el mismo
+    # shard aunque cambie su etiqueta. Sin nombres, por etiqueta.
+    if name:
+        return zlib.crc32(name.encode("utf-8")) % shards
+    return label % shards
+
+
+def split_model(engine, label_names, shards, out_dir):
+    # Escribe el router y `shards` ficheros de galería en `out_dir`
+    if not isinstance(engine, EigenFaceEngine):
+        raise ValueError("La galería por shards necesita un modelo EigenFaces o FisherFaces.")
+    os.makedirs(out_dir, exist_ok=True)
+    names = list(label_names)
+    labels = engine.labels
+    owner = np.array([shard_of(names[l] if l < len(names) else "", int(l), shards) for l in labels], dtype=np.int64)
+    partition_id = uuid.uuid4().hex
+    projection_sq = np.einsum("ij,ij->i", engine.projections, engine.projections)
+    for shard in range(shards):
+        # Proyecciones agrupadas por etiqueta: cada persona es un tramo contiguo
+        members = np.flatnonzero(owner == shard)
+        members = members[np.argsort(labels[members], kind="stable")]
+        _save_npz(os.path.join(out_dir, SHARD_PATTERN.format(shard)),
+                  projections=np.asarray(engine.projections[members], dtype=np.float32),
+                  projection_sq=np.asarray(projection_sq[members], dtype=np.float32),
+                  labels=labels[members], shard=shard, partition_id=partition_id,
+                  components=engine.num_components)
+    _save_npz(os.path.join(out_dir, ROUTER_NAME), mean=engine.mean, eigenvectors=engine.eigenvectors,
+              label_names=np.array(names, dtype=str), shards=shards, partition_id=partition_id)
+    return [os.path.join(out_dir, SHARD_PATTERN.format(shard)) for shard in range(shards)]
+
+
+def _save_npz(path, **arrays):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+
+
+# ---------------------------------------------------------------- protocolo
+def send_message(sock, header, data=b""):
+    head = json.dumps(header).encode("utf-8")
+    sock.sendall(FRAME.pack(len(head), len(data)) + head + data)
+
+
+def _recv_exact(sock, size):
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        n = sock.recv_into(view[received:])
+        if not n:
+            raise ConnectionError("Conexión cerrada por el otro extremo")
+        received += n
+    return buffer
+
+
+def recv_message(sock):
+    head_size, data_size = FRAME.unpack(_recv_exact(sock, FRAME.size))
+    header = json.loads(_recv_exact(sock, head_size))
+    return header, _recv_exact(sock, data_size)
+
+
+def parse_address(address):
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+# -------------------------------------------------------------------- shard
+class GalleryShard:
+    # Parte de la galería: k mejores identidades (distancia al rostro más
+    # cercano de cada una) para cada proyección de consulta
+    def __init__(self, projections, labels, projection_sq=None, shard=0, partition_id="", components=None):
+        self.projections = np.asarray(projections, dtype=np.float32)
+        self.labels = np.asarray(labels, dtype=np.int32).ravel()
+        if projection_sq is None:
+            projection_sq = np.einsum("ij,ij->i", self.projections, self.projections)
+        self._projection_sq = np.asarray(projection_sq, dtype=np.float32)
+        self.shard = shard
+        self.partition_id = partition_id
+        self.components = components if components is not None else self.projections.shape[1]
+        # Inicio de cada persona en las proyecciones (ordenadas por etiqueta)
+        if len(self.labels):
+            self._starts = np.flatnonzero(np.r_[True, self.labels[1:] != self.labels[:-1]])
+        else:
+            self._starts = np.empty(0, dtype=np.int64)
+        self._ends = np.r_[self._starts[1:], len(self.labels)].astype(np.int64)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["projections"], data["labels"], data["projection_sq"], int(data["shard"]),
+                       str(data["partition_id"]), int(data["components"]))
+
+    @property
+    def people(self):
+        return len(self._starts)
+
+    def search(self, queries, k):
+        # -> (etiquetas (F, k), distancias (F, k)); huecos con -1 / inf
+        queries = np.asarray(queries, dtype=np.float32)
+        labels = np.full((len(queries), k), -1, dtype=np.int32)
+        distances = np.full((len(queries), k), np.inf)
+        if not self.people or not len(queries):
+            return labels, distances
+        query_sq = np.einsum("ij,ij->i", queries, queries)
+        d2 = query_sq[:, None] + self._projection_sq[None, :] - 2.0 * (queries @ self.projections.T)
+        per_person = np.minimum.reduceat(d2, self._starts, axis=1)
+        top = min(k, self.people)
+        candidates = np.argpartition(per_person, top - 1, axis=1)[:, :top]
+        for i, query in enumerate(queries):
+            # Distancia exacta (float64) de los candidatos, como EigenFaceEngine
+            exact = np.empty(top)
+            for j, person in enumerate(candidates[i]):
+                diff = self.projections[self._starts[person]:self._ends[person]].astype(np.float64) - query
+                exact[j] = np.sqrt(np.einsum("ij,ij->i", diff, diff).min())
+            order = np.argsort(exact)
+            labels[i, :top] = self.labels[self._starts[candidates[i][order]]]
+            distances[i, :top] = exact[order]
+        return labels, distances
+
+    def info(self):
+        return {"shard": self.shard, "partition_id": self.partition_id, "people": self.people,
+                "projections": len(self.labels), "components": self.components}
+
+
+class _ShardServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 128
+
+
+def make_shard_server(shard, port=0, host="127.0.0.1", delay_ms=0.0):
+    # Una conexión por cliente del router, con peticiones en serie sobre ella.
+    # `delay_ms` simula un host lento o lejano (pruebas del plazo).
+    class Handler(socketserver.BaseRequestHandler):
+        def handle(self):
+            self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            while True:
+                try:
+                    header, data = recv_message(self.request)
+                except (ConnectionError, OSError):
+                    return
+                if header.get("op") == "info":
+                    send_message(self.request, shard.info())
+                    continue
+                queries = np.frombuffer(data, dtype=np.float32).reshape(header["count"], shard.components)
+                labels, distances = shard.search(queries, header["k"])
+                if delay_ms:
+                    time.sleep(delay_ms / 1000.0)
+                send_message(self.request, {"count": len(labels), "k": header["k"]},
+                             labels.tobytes() + distances.tobytes())
+
+    return _ShardServer((host, port), Handler)
+
+
+# ------------------------------------------------------------------- router
+class ShardClient:
+    # Conexiones reutilizables a un shard. Una respuesta que no llega a tiempo
+    # deja su conexión desincronizada: se cierra y la siguiente abre otra.
+    def __init__(self, address):
+        self.address = parse_address(address) if isinstance(address, str) else tuple(address)
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _connection(self, timeout):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        sock = socket.create_connection(self.address, timeout=timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock
+
+    def request(self, header, data=b"", deadline=None):
+        # -> (cabecera, datos) o None si no respondió antes de `deadline`
+        remaining = None if deadline is None else deadline - time.perf_counter()
+        if remaining is not None and remaining <= 0:
+            return None
+        sock = None
+        try:
+            sock = self._connection(remaining)
+            sock.settimeout(remaining)
+            send_message(sock, header, data)
+            reply = recv_message(sock)
+        except (OSError, ValueError):
+            if sock is not None:
+                sock.close()
+            return None
+        with self._lock:
+            self._idle.append(sock)
+        return reply
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for sock in idle:
+            sock.close()
+
+
+class ShardedGallery:
+    # Misma interfaz de inferencia que EigenFaceEngine (predict_batch,
+    # nearest, label_names): sirve al FacePipeline y al servicio HTTP. Un
+    # shard que no responde en `deadline_ms` se omite: sus personas no
+    # compiten en esa consulta (se contabiliza en `partial`).
+    def __init__(self, mean, eigenvectors, label_names, addresses, k=DEFAULT_TOP_K,
+                 deadline_ms=DEFAULT_DEADLINE_MS, partition_id=""):
+        self.mean = np.asarray(mean, dtype=np.float32).ravel()
+        self.eigenvectors = np.asarray(eigenvectors, dtype=np.float32)
+        self.label_names = list(label_names)
+        self.clients = [ShardClient(address) for address in addresses]
+        self.k = k
+        self.deadline = deadline_ms / 1000.0
+        self.partition_id = partition_id
+        self.queries = 0
+        self.partial = 0
+        self._stats_lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max(1, len(self.clients)))
+
+    @classmethod
+    def load(cls, router_path, addresses, k=DEFAULT_TOP_K, deadline_ms=DEFAULT_DEADLINE_MS):
+        with np.load(router_path) as data:
+            if len(addresses) != int(data["shards"]):
+                raise ValueError(f"La partición tiene {int(data['shards'])} shards y se indicaron {len(addresses)}.")
+            return cls(data["mean"], data["eigenvectors"], [str(n) for n in data["label_names"]], addresses,
+                       k, deadline_ms, str(data["partition_id"]))
+
+    @property
+    def num_components(self):
+        return self.eigenvectors.shape[1]
+
+    def check(self, timeout=5.0):
+        # Todos los shards responden y son de esta partición -> [info]
+        deadline = time.perf_counter() + timeout
+        infos = []
+        for client in self.clients:
+            reply = client.request({"op": "info"}, deadline=deadline)
+            if reply is None:
+                raise ConnectionError(f"El shard {client.address[0]}:{client.address[1]} no responde.")
+            info = reply[0]
+            if info["partition_id"] != self.partition_id or info["components"] != self.num_components:
+                raise ValueError(f"El shard {client.address[0]}:{client.address[1]} es de otra partición.")
+            infos.append(info)
+        return infos
+
+    def project(self, faces):
+        return project_faces(faces, self.mean, self.eigenvectors)
+
+    def _ask(self, client, payload, count, k, deadline):
+        reply = client.request({"op": "search", "count": count, "k": k}, payload, deadline)
+        if reply is None:
+            return None
+        header, data = reply
+        size = header["count"] * header["k"]
+        labels = np.frombuffer(data, dtype=np.int32, count=size).reshape(header["count"], header["k"])
+        distances = np.frombuffer(data, dtype=np.float64, offset=size * 4).reshape(header["count"], header["k"])
+        return labels, distances
+
+    def search(self, queries, k=None):
+        # -> (etiquetas (F, k), distancias (F, k), shards que respondieron)
+        k = k or self.k
+        queries = np.ascontiguousarray(queries, dtype=np.float32)
+        deadline = time.perf_counter() + self.deadline
+        payload = queries.tobytes()
+        futures = [self._pool.submit(self._ask, client, payload, len(queries), k, deadline)
+                   for client in self.clients]
+        replies = [r for r in (f.result() for f in futures) if r is not None]
+        with self._stats_lock:
+            self.queries += len(queries)
+            if len(replies) < len(self.clients):
+                self.partial += len(queries)
+        if not replies:
+            return (np.full((len(queries), k), -1, dtype=np.int32),
+                    np.full((len(queries), k), np.inf), 0)
+        # Las identidades no se repiten entre shards: basta ordenar la unión
+        labels = np.concatenate([r[0] for r in replies], axis=1)
+        distances = np.concatenate([r[1] for r in replies], axis=1)
+        order = np.argsort(distances, axis=1, kind="stable")[:, :k]
+        return (np.take_along_axis(labels, order, axis=1), np.take_along_axis(distances, order, axis=1),
+                len(replies))
+
+    def nearest(self, queries, exact=None):
+        labels, distances, _ = self.search(queries)
+        return labels[:, 0], distances[:, 0]
+
+    def predict_batch(self, faces):
+        if len(faces) == 0:
+            return np.empty(0, dtype=np.int32), np.empty(0)
+        return self.nearest(self.project(faces))
+
+    def predict(self, face):
+        labels, distances = self.predict_batch([face])
+        return int(labels[0]), float(distances[0])
+
+    def close(self):
+        self._pool.shutdown(wait=False)
+        for client in self.clients:
+            client.close()
+
+
+# ------------------------------------------------------------ harness local
+def start_local_shards(shard_paths, delays_ms=None):
+    # Un proceso `shards.py serve` por shard en puertos libres -> (procesos, direcciones)
+    processes, addresses = [], []
+    try:
+        for i, path in enumerate(shard_paths):
+            command = [sys.executable, os.path.abspath(__file__), "serve", path, "--port", "0"]
+            if delays_ms and delays_ms[i]:
+                command += ["--delay-ms", str(delays_ms[i])]
+            process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True,
+                                       cwd=os.path.dirname(os.path.abspath(__file__)))
+            processes.append(process)
+            line = process.stdout.readline()
+            if not line.startswith(READY_PREFIX):
+                raise RuntimeError(f"El shard {path} no arrancó")
+            addresses.append(line[len(READY_PREFIX):].strip())
+    except Exception:
+        stop_local_shards(processes)
+        raise
+    return processes, addresses
+
+
+def stop_local_shards(processes):
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        process.wait(timeout=5)
+        process.stdout.close()
+
+
+def _query_faces(data_dir, engine, count, seed):
+    # Rostros de Data/ si hay; si no, ruido (solo sirve para medir latencia)
+    from training import list_people, load_dataset
+
+    rng = np.random.default_rng(seed)
+    if os.path.isdir(data_dir) and list_people(data_dir):
+        faces, _, _ = load_dataset(data_dir)
+        if faces:
+            picks = rng.choice(len(faces), size=min(count, len(faces)), replace=False)
+            return [faces[i] for i in picks]
+    side = int(np.sqrt(engine.eigenvectors.shape[0]))
+    return list(rng.integers(0, 256, (count, side, side), dtype=np.uint8))
+
+
+def run_local(config, model_path, shards, data_dir=DATA_DIR, queries=256, batch=16, k=DEFAULT_TOP_K,
+              deadline_ms=DEFAULT_DEADLINE_MS, slow_ms=0.0, seed=0):
+    # Parte el modelo, levanta cada shard en su proceso local y compara el
+    # scatter-gather con la búsqueda exacta del modelo completo
+    engine, label_names = load_model(config, model_path, data_dir)
+    faces = _query_faces(data_dir, engine, queries, seed)
+    with tempfile.TemporaryDirectory() as directory:
+        paths = split_model(engine, label_names, shards, directory)
+        delays = [0.0] * (shards - 1) + [slow_ms]
+        processes, addresses = start_local_shards(paths, delays)
+        gallery = None
+        try:
+            gallery = ShardedGallery.load(os.path.join(directory, ROUTER_NAME), addresses, k, deadline_ms)
+            infos = gallery.check()
+            expected_labels, _ = engine.nearest(engine.project(faces), exact=True)
+            latencies, got = [], []
+            for start in range(0, len(faces), batch):
+                chunk = faces[start:start + batch]
+                started = time.perf_counter()
+                labels, _ = gallery.predict_batch(chunk)
+                latencies.append(time.perf_counter() - started)
+                got.append(labels)
+            got = np.concatenate(got)
+        finally:
+            if gallery is not None:
+                gallery.close()
+            stop_local_shards(processes)
+    latencies = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        "shards": [{"address": a, "people": i["people"], "projections": i["projections"]}
+                   for a, i in zip(addresses, infos)],
+        "queries": len(faces),
+        "batch": batch,
+        "k": k,
+        "deadline_ms": deadline_ms,
+        "agreement": float((got == expected_labels).mean()),
+        "partial_queries": gallery.partial,
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+    }
+
+
+# ---------------------------------------------------------------------- CLI
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Galería EigenFace repartida en shards (scatter-gather)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    split = sub.add_parser("split", help="partir el modelo en router + shards")
+    split.add_argument("--model", default=None, help="por defecto el del backend configurado")
+    split.add_argument("--backend", choices=list(BACKENDS), default=None)
+    split.add_argument("--data", default=DATA_DIR)
+    split.add_argument("--shards", type=int, required=True)
+    split.add_argument("--out", required=True, help="directorio de salida")
+
+    serve = sub.add_parser("serve", help="servir un shard por TCP")
+    serve.add_argument("shard", help="fichero shard-NNN.npz")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=0, help="0 = puerto libre (se imprime al arrancar)")
+    serve.add_argument("--delay-ms", type=float, default=0.0, help="retraso artificial por respuesta")
+
+    local = sub.add_parser("local", help="harness: todos los shards como procesos locales")
+    local.add_argument("--model", default=None, help="por defecto el del backend configurado")
+    local.add_argument("--backend", choices=list(BACKENDS), default=None)
+    local.add_argument("--data", default=DATA_DIR)
+    local.add_argument("--shards", type=int, default=4)
+    local.add_argument("--queries", type=int, default=256)
+    local.add_argument("--batch", type=int, default=16, help="rostros por consulta")
+    local.add_argument("--k", type=int, default=None, help="candidatos por shard")
+    local.add_argument("--deadline-ms", type=float, default=None)
+    local.add_argument("--slow-ms", type=float, default=0.0, help="retraso artificial del último shard")
+    local.add_argument("--json", help="guardar resultados en este fichero")
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        shard = GalleryShard.load(args.shard)
+        server = make_shard_server(shard, args.port, args.host, args.delay_ms)
+        host, port = server.server_address[:2]
+        print(f"{READY_PREFIX}{host}:{port}", flush=True)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+        return 0
+
+    config = load_config()
+    if args.backend:
+        config = dataclasses.replace(config, backend=args.backend)
+    try:
+        if args.command == "split":
+            engine, label_names = load_model(config, args.model, args.data)
+            paths = split_model(engine, label_names, args.shards, args.out)
+            print(f"Router y {len(paths)} shards escritos en {args.out}")
+            return 0
+        report = run_local(config, args.model, args.shards, args.data, args.queries, args.batch,
+                           args.k or config.shard_top_k,
+                           config.shard_deadline_ms if args.deadline_ms is None else args.deadline_ms,
+                           args.slow_ms)
+    except (OSError, ValueError, RuntimeError) as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    for i, shard in enumerate(report["shards"]):
+        print(f"  shard {i}  {shard['address']:<21} personas: {shard['people']:>5}  proyecciones: {shard['projections']}")
+    print(f"Consultas: {report['queries']} en lotes de {report['batch']}  k: {report['k']}  "
+          f"plazo: {report['deadline_ms']:.0f} ms")
+    print(f"Coincidencia con el modelo completo: {report['agreement'] * 100:.1f}%  "
+          f"consultas parciales (algún shard fuera de plazo): {report['partial_queries']}")
+    print(f"Latencia por lote ms  p50: {report['p50_ms']:.2f}  p95: {report['p95_ms']:.2f}  p99: {report['p99_ms']:.2f}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
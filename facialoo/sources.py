@@ -0,0 +1,175 @@
+import cv2 as cv
+import os
+import time
+
+import numpy as np
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+class FrameSource:
+    # Misma interfaz que cv.VideoCapture (read/isOpened/release) para que el
+    # resto del código funcione igual con una webcam o con grabaciones.
+    fps = None
+    _last = None
+
+    def read(self):
+        raise NotImplementedError
+
+    def _pace(self):
+        # Ritmo de reproducción opcional (simular una cámara real)
+        if self.fps:
+            now = time.perf_counter()
+            if self._last is not None:
+                wait = 1.0 / self.fps - (now - self._last)
+                if wait > 0:
+                    time.sleep(wait)
+            self._last = time.perf_counter()
+
+    def isOpened(self):
+        return True
+
+    def release(self):
+        pass
+
+    def __iter__(self):
+        while True:
+            ret, frame = self.read()
+            if not ret:
+                return
+            yield frame
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class _CaptureSource(FrameSource):
+    def __init__(self, target, fps=None):
+        self.cap = cv.VideoCapture(target)
+        self.fps = fps
+
+    def read(self):
+        self._pace()
+        return self.cap.read()
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def release(self):
+        self.cap.release()
+
+
+class WebcamSource(_CaptureSource):
+    def __init__(self, index=0):
+        super().__init__(index)
+
+
+class VideoFileSource(_CaptureSource):
+    # También acepta URLs (rtsp://, http://) que entienda OpenCV
+    def __init__(self, path, fps=None):
+        super().__init__(path, fps)
+        self.path = path
+
+
+class ImageDirSource(FrameSource):
+    def __init__(self, path, fps=None):
+        self.path = path
+        self.fps = fps
+        self.files = sorted(
+            os.path.join(path, f) for f in os.listdir(path)
+            if f.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        self._pos = 0
+
+    def isOpened(self):
+        return bool(self.files)
+
+    def read(self):
+        while self._pos < len(self.files):
+            self._pace()
+            frame = cv.imread(self.files[self._pos])
+            self._pos += 1
+            if frame is not None:
+                return True, frame
+        return False, None
+
+
+class SyntheticSource(FrameSource):
+    # Genera frames deterministas para medir throughput sin cámara. Si se
+    # pasan rostros (imágenes en gris) se pegan moviéndose por la escena. Con
+    # `idle` la escena está vacía y solo cambia el ruido del sensor.
+    def __init__(self, width=640, height=480, count=300, faces=None, seed=0, fps=None, idle=False):
+        self.width = width
+        self.height = height
+        self.count = count
+        self.faces = [cv.cvtColor(f, cv.COLOR_GRAY2BGR) if f.ndim == 2 else f for f in (faces or [])]
+        rng = np.random.default_rng(seed)
+        self.background = rng.integers(0, 64, (height, width, 3), dtype=np.uint8)
+        self.fps = fps
+        self.idle = idle
+        self._rng = rng
+        self._pos = 0
+
+    def read(self):
+        if self.count is not None and self._pos >= self.count:
+            return False, None
+        self._pace()
+        frame = self.background.copy()
+        t = self._pos
+        if self.idle:
+            noise = self._rng.integers(0, 4, frame.shape, dtype=np.uint8)
+            cv.add(frame, noise, dst=frame)
+        elif self.faces:
+            face = self.faces[t % len(self.faces)]
+            fh, fw = face.shape[:2]
+            x = int((self.width - fw) * (0.5 + 0.4 * np.sin(t / 15.0)))
+            y = int((self.height - fh) * (0.5 + 0.4 * np.cos(t / 20.0)))
+            frame[y:y + fh, x:x + fw] = face
+        else:
+            cx = int(self.width * (0.5 + 0.3 * np.sin(t / 15.0)))
+            cy = int(self.height * (0.5 + 0.3 * np.cos(t / 20.0)))
+            cv.ellipse(frame, (cx, cy), (60, 80), 0, 0, 360, (200, 200, 200), -1)
+        self._pos += 1
+        return True, frame
+
+
+def load_synthetic_faces(data_dir, limit=16):
+    # Toma unas pocas imágenes de Data/ para poblar la escena sintética
+    faces = []
+    if not os.path.isdir(data_dir):
+        return faces
+    for person in sorted(os.listdir(data_dir)):
+        person_path = os.path.join(data_dir, person)
+        if not os.path.isdir(person_path):
+            continue
+        for filename in sorted(os.listdir(person_path)):
+            img = cv.imread(os.path.join(person_path, filename), 0)
+            if img is not None:
+                faces.append(img)
+            if len(faces) >= limit:
+                return faces
+    return faces
+
+
+def open_source(spec, fps=None, data_dir=None):
+    # spec: índice de webcam ("0"), directorio de imágenes, fichero/URL de
+    # vídeo o "synthetic[:ANCHOxALTO[:FRAMES]]" ("synthetic-idle" para una
+    # escena vacía, sin movimiento).
+    if isinstance(spec, int) or (isinstance(spec, str) and spec.isdigit()):
+        return WebcamSource(int(spec))
+    if spec.startswith("synthetic"):
+        parts = spec.split(":")
+        width, height, count = 640, 480, 300
+        if len(parts) > 1 and parts[1]:
+            width, height = (int(v) for v in parts[1].lower().split("x"))
+        if len(parts) > 2 and parts[2]:
+            count = int(parts[2])
+        idle = parts[0] == "synthetic-idle"
+        faces = load_synthetic_faces(data_dir) if data_dir and not idle else None
+        return SyntheticSource(width, height, count, faces=faces, fps=fps, idle=idle)
+    if os.path.isdir(spec):
+        return ImageDirSource(spec, fps=fps)
+    return VideoFileSource(spec, fps=fps)
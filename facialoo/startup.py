@@ -0,0 +1,182 @@
+import argparse
+import importlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+from time import perf_counter
+
+from config import BASE_DIR, load_config
+from metrics import NULL_METRICS
+
+# Arranque en dos fases: la ventana se muestra solo con Tk, customtkinter y
+# la configuración; OpenCV, NumPy, el cascade, el modelo y los nombres se
+# cargan después en un hilo de fondo (prewarm) mientras la GUI indica que aún
+# no está lista.
+RUNTIME_MODULES = (
+    "cv2", "numpy", "vision", "display", "stream", "pipeline",
+    "capture_writer", "facestore", "backends", "training",
+)
+# Igual que vision.DATA_DIR, sin importar OpenCV para calcularlo
+DATA_DIR = os.path.join(BASE_DIR, "Data")
+DEFAULT_RUNS = 5
+
+
+def import_runtime(metrics=NULL_METRICS):
+    # Importarlos en el hilo de fondo deja sys.modules listo: los import
+    # locales de la GUI pasan a ser una consulta a un diccionario
+    with metrics.time("startup_import"):
+        for name in RUNTIME_MODULES:
+            importlib.import_module(name)
+
+
+def load_vision(metrics=NULL_METRICS):
+    # -> cascade Haar; basta para capturar y detectar
+    import_runtime(metrics)
+    from vision import CASCADE_PATH, load_cascade
+
+    with metrics.time("startup_cascade"):
+        return load_cascade(CASCADE_PATH)
+
+
+def load_recognition(config, model_path=None, data_dir=DATA_DIR, mmap=True, metrics=NULL_METRICS):
+    # -> (modelo, nombres) del backend configurado, o None si aún no hay
+    # modelo entrenado
+    from backends import load_model, model_path_for
+    from modelfile import model_exists
+
+    model_path = model_path or model_path_for(config.backend)
+    if not model_exists(model_path):
+        return None
+    with metrics.time("startup_model"):
+        return load_model(config, model_path, data_dir, mmap=mmap)
+
+
+# ---------------------------------------------------------------- benchmark
+def _child(args):
+    # Un arranque completo en este proceso (recién creado): importar la GUI,
+    # prewarm y procesar el primer frame. Tiempos acumulados desde el inicio.
+    started = perf_counter()
+    report = {}
+    try:
+        importlib.import_module("gui")
+        report["ui_import_s"] = perf_counter() - started
+    except ImportError as e:
+        # Sin customtkinter (servidores de CI) se mide el resto igualmente
+        report["ui_import_error"] = str(e)
+    mark = perf_counter()
+    import_runtime()
+    report["runtime_import_s"] = perf_counter() - mark
+
+    from pipeline import FacePipeline
+    from sources import open_source
+    from vision import CASCADE_PATH, load_cascade
+
+    config = load_config()
+    mark = perf_counter()
+    cascade = load_cascade(CASCADE_PATH)
+    report["cascade_s"] = perf_counter() - mark
+    mark = perf_counter()
+    loaded = None if args.detect_only else load_recognition(config, args.model, args.data)
+    report["model_s"] = perf_counter() - mark
+    report["recognize"] = loaded is not None
+    report["ready_s"] = perf_counter() - started
+
+    engine, label_names = loaded or (None, [])
+    pipeline = FacePipeline(config, cascade, engine, label_names)
+    with open_source(args.source, data_dir=args.data) as source:
+        if not source.isOpened():
+            raise OSError(f"No se pudo abrir la fuente: {args.source}")
+        ret, frame = source.read()
+        if not ret:
+            raise OSError(f"La fuente no devolvió ningún frame: {args.source}")
+        pipeline.process(frame)
+    report["first_frame_s"] = perf_counter() - started
+    print(json.dumps(report))
+
+
+def run_startup(source="synthetic", model_path=None, data_dir=DATA_DIR, runs=DEFAULT_RUNS, detect_only=False):
+    # Cada medida en un intérprete nuevo: dentro del mismo proceso los
+    # módulos ya estarían importados. `process_s` incluye el arranque de
+    # Python; la caché de disco del sistema no se vacía (arranque en
+    # caliente del SO, en frío de la aplicación).
+    command = [sys.executable, os.path.abspath(__file__), "--child", "--source", source, "--data", data_dir]
+    if model_path:
+        command += ["--model", model_path]
+    if detect_only:
+        command.append("--detect-only")
+    samples = []
+    for _ in range(runs):
+        started = perf_counter()
+        result = subprocess.run(command, capture_output=True, text=True, cwd=BASE_DIR)
+        elapsed = perf_counter() - started
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "error")
+        sample = json.loads(result.stdout.strip().splitlines()[-1])
+        sample["process_s"] = elapsed
+        samples.append(sample)
+    return samples
+
+
+def summarize(samples):
+    keys = [k for k in ("ui_import_s", "runtime_import_s", "cascade_s", "model_s", "ready_s",
+                        "first_frame_s", "process_s") if all(k in s for s in samples)]
+    summary = {k: {"median": statistics.median(s[k] for s in samples), "max": max(s[k] for s in samples)}
+               for k in keys}
+    summary["runs"] = len(samples)
+    summary["recognize"] = samples[0]["recognize"]
+    if "ui_import_error" in samples[0]:
+        summary["ui_import_error"] = samples[0]["ui_import_error"]
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de arranque: importación y tiempo hasta el primer frame")
+    parser.add_argument("--source", default="synthetic", help="vídeo, directorio, índice de webcam o synthetic[:WxH[:N]]")
+    parser.add_argument("--model", default=None, help="por defecto el del backend configurado")
+    parser.add_argument("--data", default=DATA_DIR)
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS, help="arranques medidos (un proceso cada uno)")
+    parser.add_argument("--detect-only", action="store_true", help="no cargar el modelo")
+    parser.add_argument("--json", help="guardar resultados en este fichero")
+    parser.add_argument("--max-first-frame", type=float, help="falla (exit 1) si la mediana supera estos segundos")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        _child(args)
+        return 0
+
+    try:
+        summary = summarize(run_startup(args.source, args.model, args.data, args.runs, args.detect_only))
+    except (OSError, RuntimeError) as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    print(f"Arranques: {summary['runs']}  Modo: {'reconocer' if summary['recognize'] else 'detectar'}")
+    labels = {
+        "ui_import_s": "importar GUI (ventana visible)",
+        "runtime_import_s": "importar OpenCV/NumPy/módulos",
+        "cascade_s": "cargar cascade",
+        "model_s": "cargar modelo y nombres",
+        "ready_s": "listo (acumulado)",
+        "first_frame_s": "primer frame procesado (acumulado)",
+        "process_s": "proceso completo (con intérprete)",
+    }
+    for key, label in labels.items():
+        if key in summary:
+            print(f"  {label:<38} {summary[key]['median'] * 1000:>8.1f} ms  (máx {summary[key]['max'] * 1000:.1f})")
+    if "ui_import_error" in summary:
+        print(f"  GUI no importable aquí: {summary['ui_import_error']}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+    if args.max_first_frame is not None and summary["first_frame_s"]["median"] > args.max_first_frame:
+        print(f"FALLO: primer frame {summary['first_frame_s']['median']:.3f} s > {args.max_first_frame} s")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
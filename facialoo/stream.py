@@ -0,0 +1,152 @@
+import threading
+import time
+from collections import deque
+
+from metrics import NULL_METRICS
+
+
+class FrameRing:
+    # Buffer circular pequeño: al llenarse descarta el frame más antiguo,
+    # de modo que el consumidor siempre trabaja con la imagen más reciente.
+    def __init__(self, capacity=2):
+        self._frames = deque(maxlen=capacity)
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._closed = False
+        self.dropped = 0
+
+    def put(self, frame):
+        with self._cond:
+            if self._closed:
+                return
+            if len(self._frames) == self._frames.maxlen:
+                self.dropped += 1
+            self._seq += 1
+            self._frames.append((self._seq, time.perf_counter(), frame))
+            self._cond.notify_all()
+
+    def latest(self, timeout=None):
+        # Devuelve (seq, timestamp, frame) del frame más nuevo y descarta el
+        # resto, que ya está obsoleto. None si expira el timeout o se cerró.
+        with self._cond:
+            self._cond.wait_for(lambda: self._frames or self._closed, timeout)
+            if not self._frames:
+                return None
+            item = self._frames[-1]
+            self.dropped += len(self._frames) - 1
+            self._frames.clear()
+            return item
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+
+class CaptureThread(threading.Thread):
+    # Lee de la cámara a su propio ritmo y deja los frames en el ring.
+    # Cuando la fuente se agota (o falla) cierra el ring.
+    def __init__(self, cap, ring, metrics=NULL_METRICS):
+        super().__init__(daemon=True)
+        self.cap = cap
+        self.ring = ring
+        self.metrics = metrics
+        self._stop_event = threading.Event()
+
+    def run(self):
+        try:
+            while not self._stop_event.is_set():
+                with self.metrics.time("read"):
+                    ret, frame = self.cap.read()
+                if not ret:
+                    break
+                self.ring.put(frame)
+        finally:
+            self.ring.close()
+
+    def stop(self):
+        self._stop_event.set()
+
+
+class ProcessingWorker(threading.Thread):
+    # Toma siempre el frame más reciente, lo procesa con `process` y publica
+    # el resultado. Los resultados no consumidos se sobrescriben.
+    def __init__(self, ring, process, scheduler=None):
+        super().__init__(daemon=True)
+        self.ring = ring
+        self.process = process
+        self.scheduler = scheduler
+        self.error = None
+        self._result = None
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            item = self.ring.latest(timeout=0.5)
+            if item is None:
+                if self.ring.closed:
+                    break
+                continue
+            _, captured_at, frame = item
+            started = time.perf_counter()
+            try:
+                result = self.process(frame)
+            except Exception as e:
+                self.error = e
+                break
+            finished = time.perf_counter()
+            if self.scheduler is not None:
+                self.scheduler.observe(finished - started, finished - captured_at)
+            with self._lock:
+                self._result = result
+
+    def take_result(self):
+        with self._lock:
+            result, self._result = self._result, None
+        return result
+
+    def stop(self):
+        self._stop_event.set()
+
+
+class AdaptiveScheduler:
+    # Sustituye al `after(30, ...)` fijo: el intervalo de refresco de la UI se
+    # ajusta al ritmo real al que el worker produce resultados. Se consulta a
+    # mitad de intervalo para que el retraso extra de visualización quede
+    # acotado sin despertar al hilo de Tk más de lo necesario.
+    def __init__(self, min_delay_ms=5, max_delay_ms=100, alpha=0.2):
+        self.min_delay_ms = min_delay_ms
+        self.max_delay_ms = max_delay_ms
+        self.alpha = alpha
+        self.process_ms = None
+        self.latency_ms = None
+        self.interval_ms = None
+        self._last_result = None
+        self._lock = threading.Lock()
+
+    def _ema(self, current, value):
+        if current is None:
+            return value
+        return current + self.alpha * (value - current)
+
+    def observe(self, process_s, latency_s):
+        now = time.perf_counter()
+        with self._lock:
+            self.process_ms = self._ema(self.process_ms, process_s * 1000)
+            self.latency_ms = self._ema(self.latency_ms, latency_s * 1000)
+            if self._last_result is not None:
+                interval = (now - self._last_result) * 1000
+                self.interval_ms = self._ema(self.interval_ms, interval)
+            self._last_result = now
+
+    def next_delay(self):
+        with self._lock:
+            interval = self.interval_ms if self.interval_ms is not None else self.process_ms
+        if interval is None:
+            return self.min_delay_ms
+        return int(min(self.max_delay_ms, max(self.min_delay_ms, interval / 2)))
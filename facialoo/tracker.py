@@ -0,0 +1,139 @@
+import cv2 as cv
+
+import numpy as np
+
+# Lado del template reducido: el matching se hace a baja resolución para que
+# su coste no dependa del tamaño del rostro en pantalla
+TEMPLATE_SIDE = 32
+
+
+class Track:
+    def __init__(self, track_id, box):
+        self.id = track_id
+        self.box = tuple(int(v) for v in box)
+        self.score = 1.0
+        self.misses = 0
+        self.hits = 1
+        self.scale = 1.0
+        self.template = None
+
+
+def _iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = ix * iy
+    union = aw * ah + bw * bh - inter
+    return inter / union if union else 0.0
+
+
+class FaceTracker:
+    # Detectar y luego seguir: el cascade (`detect(gray) -> boxes`) solo se
+    # ejecuta cada `detect_every` frames o cuando algún track pierde
+    # confianza. Entre detecciones cada caja se propaga con template matching
+    # en una ventana de búsqueda alrededor de su última posición. Un track que
+    # no se vuelve a detectar se oculta; se conserva `max_misses` detecciones
+    # solo para recuperar su id si el rostro reaparece en el mismo sitio.
+    def __init__(self, detect, detect_every=5, min_score=0.6, search_margin=0.5,
+                 match_iou=0.3, max_misses=2):
+        if detect_every < 1:
+            raise ValueError(f"detect_every debe ser >= 1 (recibido {detect_every})")
+        self.detect = detect
+        self.detect_every = detect_every
+        self.min_score = min_score
+        self.search_margin = search_margin
+        self.match_iou = match_iou
+        self.max_misses = max_misses
+        self.tracks = []
+        self.frame_index = 0
+        self.detections = 0
+        self._next_id = 0
+        self._force_detect = True
+
+    def update(self, gray):
+        if self._force_detect or self.frame_index % self.detect_every == 0:
+            self._detect(gray)
+        else:
+            self._propagate(gray)
+        self.frame_index += 1
+        return [t for t in self.tracks if t.misses == 0]
+
+    def reset(self):
+        self.tracks = []
+        self._force_detect = True
+
+    def _set_template(self, track, gray):
+        x, y, w, h = track.box
+        track.scale = TEMPLATE_SIDE / max(w, h)
+        patch = gray[y:y + h, x:x + w]
+        size = (max(1, round(w * track.scale)), max(1, round(h * track.scale)))
+        track.template = cv.resize(patch, size, interpolation=cv.INTER_AREA)
+
+    def _detect(self, gray):
+        self.detections += 1
+        self._force_detect = False
+        boxes = [tuple(int(v) for v in b) for b in self.detect(gray)]
+
+        # Emparejar detecciones con tracks existentes (greedy por IoU) para
+        # conservar su id entre detecciones
+        pairs = sorted(
+            ((_iou(t.box, b), ti, bi) for ti, t in enumerate(self.tracks) for bi, b in enumerate(boxes)),
+            reverse=True,
+        )
+        used_tracks, used_boxes = set(), set()
+        for iou, ti, bi in pairs:
+            if iou < self.match_iou:
+                break
+            if ti in used_tracks or bi in used_boxes:
+                continue
+            used_tracks.add(ti)
+            used_boxes.add(bi)
+            track = self.tracks[ti]
+            track.box = boxes[bi]
+            track.score = 1.0
+            track.misses = 0
+            track.hits += 1
+            self._set_template(track, gray)
+
+        survivors = []
+        for ti, track in enumerate(self.tracks):
+            if ti not in used_tracks:
+                track.misses += 1
+                if track.misses > self.max_misses:
+                    continue
+            survivors.append(track)
+        for bi, box in enumerate(boxes):
+            if bi not in used_boxes:
+                track = Track(self._next_id, box)
+                self._next_id += 1
+                self._set_template(track, gray)
+                survivors.append(track)
+        self.tracks = survivors
+
+    def _propagate(self, gray):
+        frame_h, frame_w = gray.shape[:2]
+        for track in self.tracks:
+            if track.misses:
+                # Oculto: su caja queda donde se vio por última vez
+                continue
+            x, y, w, h = track.box
+            mx, my = int(w * self.search_margin), int(h * self.search_margin)
+            x0, y0 = max(0, x - mx), max(0, y - my)
+            x1, y1 = min(frame_w, x + w + mx), min(frame_h, y + h + my)
+            window = cv.resize(gray[y0:y1, x0:x1], None, fx=track.scale, fy=track.scale,
+                               interpolation=cv.INTER_AREA)
+            th, tw = track.template.shape[:2]
+            if window.shape[0] < th or window.shape[1] < tw:
+                track.score = 0.0
+                self._force_detect = True
+                continue
+            result = cv.matchTemplate(window, track.template, cv.TM_CCOEFF_NORMED)
+            _, score, _, (bx, by) = cv.minMaxLoc(result)
+            track.score = float(score) if np.isfinite(score) else 0.0
+            nx = int(round(x0 + bx / track.scale))
+            ny = int(round(y0 + by / track.scale))
+            track.box = (min(max(0, nx), frame_w - w), min(max(0, ny), frame_h - h), w, h)
+            if track.score < self.min_score:
+                # Confianza baja: la próxima iteración vuelve a detectar
+                self._force_detect = True
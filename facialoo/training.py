@@ -0,0 +1,242 @@
+import cv2 as cv
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from backends import get_backend
+from eigen import EigenFaceEngine
+from facestore import FaceStore
+from manifest import dataset_fingerprint, person_hashes, read_manifest, scan_dataset, write_manifest
+from metrics import NULL_METRICS
+from pca import DEFAULT_CHUNK, DEFAULT_COMPONENTS
+from modelfile import model_exists, resolve_model_path
+from sources import IMAGE_EXTENSIONS
+from vision import FACE_SIZE
+
+# Fracción máxima de la energía de las imágenes nuevas que puede quedar fuera
+# de la base actual antes de forzar un reentrenamiento completo
+DRIFT_THRESHOLD = 0.35
+
+
+def list_people(data_dir):
+    return sorted(p for p in os.listdir(data_dir) if os.path.isdir(os.path.join(data_dir, p)))
+
+
+def list_images(person_dir):
+    return sorted(f for f in os.listdir(person_dir) if f.lower().endswith(IMAGE_EXTENSIONS))
+
+
+def count_samples(person_dir):
+    if FaceStore.exists(person_dir):
+        return FaceStore(person_dir).count
+    return len(list_images(person_dir))
+
+
+def _decode_into(path, slot):
+    # Decodifica directamente en el hueco del array preasignado. OpenCV
+    # suelta el GIL durante imread/resize, así que los hilos escalan.
+    img = cv.imread(path, cv.IMREAD_GRAYSCALE)
+    if img is None:
+        return False
+    if img.shape != slot.shape:
+        cv.resize(img, (slot.shape[1], slot.shape[0]), dst=slot, interpolation=cv.INTER_CUBIC)
+    else:
+        slot[...] = img
+    return True
+
+
+def load_dataset(data_dir, people=None, workers=None, progress=None):
+    # Devuelve (rostros, ids, nombres); el id es la posición en `people`.
+    # Las personas con almacén empaquetado se usan memory-mapped (sin copia);
+    # los JPEG sueltos se decodifican en paralelo sobre un array contiguo
+    # preasignado. `progress(hechas, total)` se llama desde los hilos.
+    if people is None:
+        people = list_people(data_dir)
+
+    parts = []
+    jpeg_paths = []
+    for label, person_name in enumerate(people):
+        person_dir = os.path.join(data_dir, person_name)
+        if FaceStore.exists(person_dir):
+            parts.append((label, FaceStore(person_dir).load()))
+        else:
+            paths = [os.path.join(person_dir, f) for f in list_images(person_dir)]
+            parts.append((label, (len(jpeg_paths), len(jpeg_paths) + len(paths))))
+            jpeg_paths.extend(paths)
+
+    packed_total = sum(len(p) for _, p in parts if not isinstance(p, tuple))
+    total = packed_total + len(jpeg_paths)
+    buffer = np.empty((len(jpeg_paths), FACE_SIZE[1], FACE_SIZE[0]), dtype=np.uint8)
+    valid = np.zeros(len(jpeg_paths), dtype=bool)
+
+    done = [packed_total]
+    lock = threading.Lock()
+    step = max(1, total // 100)
+
+    def load(i):
+        valid[i] = _decode_into(jpeg_paths[i], buffer[i])
+        if progress is not None:
+            with lock:
+                done[0] += 1
+                if done[0] % step == 0 or done[0] == total:
+                    progress(done[0], total)
+
+    if progress is not None and packed_total:
+        progress(packed_total, total)
+    if jpeg_paths:
+        with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            list(pool.map(load, range(len(jpeg_paths))))
+
+    faces = []
+    ids = []
+    for label, part in parts:
+        if isinstance(part, tuple):
+            start, end = part
+            person_faces = [buffer[i] for i in range(start, end) if valid[i]]
+        else:
+            person_faces = list(part)
+        faces.extend(person_faces)
+        ids.extend([label] * len(person_faces))
+    return faces, ids, people
+
+
+def _training_params(backend, trainer, components):
+    # Parámetros que cambian el modelo resultante (forman parte de la huella)
+    params = {"backend": backend}
+    if backend == "eigen":
+        params["trainer"] = trainer
+        if trainer == "numpy":
+            params["components"] = components
+    return params
+
+
+def _scan(data_dir, people, params, previous=None, workers=None):
+    # -> (ficheros, huella) del dataset actual
+    files = scan_dataset(data_dir, people, previous, workers)
+    return files, dataset_fingerprint(files, people, params)
+
+
+def train_full(data_dir, model_path, workers=None, progress=None, metrics=NULL_METRICS,
+               trainer="opencv", components=DEFAULT_COMPONENTS, chunk_size=DEFAULT_CHUNK, backend="eigen",
+               scan=None):
+    # `scan`: (ficheros, huella) si ya los calculó train_incremental
+    recognizer = get_backend(backend, trainer, components, chunk_size)
+    people = list_people(data_dir)
+    if not people:
+        raise ValueError("Directorio Data vacío o sin carpetas válidas.")
+    params = _training_params(backend, trainer, components)
+    if scan is None:
+        # La huella se toma antes de leer: si Data/ cambia durante el
+        # entrenamiento, el siguiente no coincidirá y volverá a entrenar
+        scan = _scan(data_dir, people, params, read_manifest(model_path), workers)
+
+    with metrics.time("load"):
+        faces, ids, people = load_dataset(data_dir, people, workers, progress)
+    if not faces:
+        raise ValueError("No se encontraron imágenes válidas para entrenar.")
+
+    with metrics.time("train"):
+        # El mapa etiqueta -> nombre viaja dentro del modelo
+        model = recognizer.train(faces, ids, people)
+    with metrics.time("write"):
+        # Escrituras con temporal + rename: quien tenga el modelo abierto
+        # (reconocimiento en marcha) nunca lo ve a medias
+        recognizer.save(model, model_path)
+        write_manifest(model_path, scan[1], scan[0], people, params)
+    return {"mode": "full", "people": people, "added": people, "images": len(faces)}
+
+
+def _new_people(data_dir, known, labels, previous=None, files=None):
+    # Personas nuevas si el único cambio respecto al modelo son altas; None si
+    # hay bajas, imágenes nuevas o modificadas de alguien ya entrenado o el
+    # modelo no guarda nombres. Con manifiesto se compara el contenido de
+    # cada fichero; sin él (modelos antiguos), solo el número de muestras.
+    people = list_people(data_dir)
+    if not known or any(name not in people for name in known):
+        return None
+    if previous is not None:
+        if any(person_hashes(previous["files"], name) != person_hashes(files, name) for name in known):
+            return None
+    else:
+        counts = np.bincount(labels, minlength=len(known))
+        for label, name in enumerate(known):
+            if count_samples(os.path.join(data_dir, name)) != counts[label]:
+                return None
+    return [p for p in people if p not in known]
+
+
+def train_incremental(data_dir, model_path, drift_threshold=DRIFT_THRESHOLD, workers=None, progress=None,
+                      metrics=NULL_METRICS, trainer="opencv", components=DEFAULT_COMPONENTS,
+                      chunk_size=DEFAULT_CHUNK, backend="eigen"):
+    # Añade solo a las personas nuevas: EigenFaces las proyecta sobre la base
+    # existente y los backends con update() (LBPH) las añaden al modelo.
+    # Cualquier cambio que no sea un alta o una deriva excesiva -> completo.
+    # Si la huella del dataset coincide con la del manifiesto, no hace nada.
+    recognizer = get_backend(backend, trainer, components, chunk_size)
+    people = list_people(data_dir)
+    params = _training_params(backend, trainer, components)
+    previous = read_manifest(model_path)
+    files, fingerprint = scan = _scan(data_dir, people, params, previous, workers)
+    if previous is not None and previous["fingerprint"] == fingerprint:
+        return {"mode": "unchanged", "people": previous["label_names"], "added": [], "images": 0}
+
+    def full():
+        return train_full(data_dir, model_path, workers, progress, metrics, trainer, components, chunk_size,
+                          backend, scan)
+
+    eigen = backend == "eigen"
+    if not model_exists(model_path) or not (eigen or recognizer.supports_update):
+        return full()
+    if previous is not None and previous["params"] != params:
+        return full()
+
+    # Sin mmap: el propio fichero del modelo se va a reescribir
+    if eigen:
+        engine = EigenFaceEngine.load(resolve_model_path(model_path), use_index=False, mmap=False)
+    else:
+        engine = recognizer.load(model_path, mmap=False)
+    known = engine.label_names
+    new_people = _new_people(data_dir, known, engine.labels, previous, files)
+    if new_people is None:
+        return full()
+    if not new_people:
+        # Modelo sin manifiesto pero al día: se registra para la próxima vez
+        write_manifest(model_path, fingerprint, files, known, params)
+        return {"mode": "unchanged", "people": known, "added": [], "images": 0}
+
+    with metrics.time("load"):
+        faces, ids, _ = load_dataset(data_dir, new_people, workers, progress)
+    if not faces:
+        write_manifest(model_path, fingerprint, files, known, params)
+        return {"mode": "unchanged", "people": known, "added": [], "images": 0}
+    ids = np.asarray(ids) + len(known)
+
+    if not eigen:
+        with metrics.time("train"):
+            recognizer.update(engine, faces, ids, known + new_people)
+        with metrics.time("write"):
+            recognizer.save(engine, model_path)
+            write_manifest(model_path, fingerprint, files, engine.label_names, params)
+        return {"mode": "incremental", "people": engine.label_names, "added": new_people, "images": len(faces)}
+
+    with metrics.time("train"):
+        centered = np.asarray(faces, dtype=np.float32).reshape(len(faces), -1) - engine.mean
+        projections = centered @ engine.eigenvectors
+        # Deriva: energía de las imágenes nuevas que la base actual no explica
+        energy = float(np.einsum("ij,ij->", centered, centered))
+        captured = float(np.einsum("ij,ij->", projections, projections))
+    drift = 1.0 - captured / energy if energy > 0 else 0.0
+    if drift > drift_threshold:
+        result = full()
+        result["drift"] = drift
+        return result
+
+    engine.add_samples(projections, ids)
+    engine.label_names = known + new_people
+    with metrics.time("write"):
+        recognizer.save(engine, model_path)
+        write_manifest(model_path, fingerprint, files, engine.label_names, params)
+    return {"mode": "incremental", "people": engine.label_names, "added": new_people,
+            "images": len(faces), "drift": drift}
@@ -0,0 +1,91 @@
+import cv2 as cv
+import os
+
+import imutils
+
+from metrics import NULL_METRICS
+
+# --- Rutas basadas en la ubicación de este archivo ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "Data")
+MODEL_PATH = os.path.join(BASE_DIR, "EntrenamientoEigenFaceRecognizer.xml")
+
+# Haarcascade portátil (incluido con opencv)
+CASCADE_PATH = cv.data.haarcascades + "haarcascade_frontalface_default.xml"
+
+FACE_SIZE = (160, 160)
+
+UNKNOWN_NAME = "Desconocido"
+
+# Etapas del pipeline compartidas por la GUI, los scripts y el benchmark
+
+
+def load_cascade(path=CASCADE_PATH):
+    return cv.CascadeClassifier(path)
+
+
+def prepare_frame(frame, width, flip=True, metrics=NULL_METRICS):
+    if flip:
+        with metrics.time("flip"):
+            frame = cv.flip(frame, 1)
+    with metrics.time("resize"):
+        frame = imutils.resize(frame, width=width)
+    with metrics.time("grayscale"):
+        gray = cv.cvtColor(frame, cv.COLOR_BGR2GRAY)
+    return frame, gray
+
+
+def crop_face(gray, box):
+    x, y, w, h = box
+    roi = gray[y:y + h, x:x + w]
+    return cv.resize(roi, FACE_SIZE, interpolation=cv.INTER_CUBIC)
+
+
+def identify_faces(engine, rois, label_names, threshold):
+    # Predicción en lote de todos los rostros del frame -> [(nombre|None, distancia)].
+    # En todos los backends menor distancia es mejor match (umbral en
+    # VisionConfig.recognition_threshold, en la escala del backend)
+    label_ids, distances = engine.predict_batch(rois)
+    results = []
+    for label_id, distance in zip(label_ids, distances):
+        if distance < threshold and 0 <= label_id < len(label_names):
+            results.append((label_names[label_id], distance))
+        else:
+            results.append((None, distance))
+    return results
+
+
+def draw_corners(frame, box, color=(0, 255, 0), length=30, thickness=2):
+    # Esquinas redondeadas simuladas (líneas cortas en esquinas)
+    x, y, w, h = box
+    l, t = length, thickness
+    # Top-Left
+    cv.line(frame, (x, y), (x + l, y), color, t)
+    cv.line(frame, (x, y), (x, y + l), color, t)
+    # Top-Right
+    cv.line(frame, (x + w, y), (x + w - l, y), color, t)
+    cv.line(frame, (x + w, y), (x + w, y + l), color, t)
+    # Bottom-Left
+    cv.line(frame, (x, y + h), (x + l, y + h), color, t)
+    cv.line(frame, (x, y + h), (x, y + h - l), color, t)
+    # Bottom-Right
+    cv.line(frame, (x + w, y + h), (x + w - l, y + h), color, t)
+    cv.line(frame, (x + w, y + h), (x + w, y + h - l), color, t)
+
+
+def draw_identity(frame, box, name):
+    x, y, w, h = box
+    if name is not None:
+        color = (0, 255, 0)
+        status_text = f"{name}"
+    else:
+        color = (0, 0, 255)  # Rojo
+        status_text = UNKNOWN_NAME
+
+    # Dibujar caja
+    cv.rectangle(frame, (x, y), (x + w, y + h), color, 2)
+
+    # Dibujar etiqueta con fondo
+    (text_w, text_h), _ = cv.getTextSize(status_text, cv.FONT_HERSHEY_SIMPLEX, 0.8, 2)
+    cv.rectangle(frame, (x, y - 30), (x + text_w, y), color, -1)
+    cv.putText(frame, status_text, (x, y - 6), cv.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)